@@ -10,7 +10,12 @@
         "web",
     ],
     "data": [
+        "security/ir.model.access.csv",
         "views/report_invoice_custom.xml",
+        "views/report_render_metric_views.xml",
+        "data/render_metric_data.xml",
+        "data/debug_capture_data.xml",
+        "views/encoding_repair_views.xml",
     ],
     "installable": True,
     "application": False,
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Comando ``odoo-bin blink_encoding_repair``: escanea (y con ``--repair``
+repara) el texto con doble codificación UTF-8 guardado en la base.
+
+    odoo-bin blink_encoding_repair -c odoo.conf -d base            # solo reporte
+    odoo-bin blink_encoding_repair -c odoo.conf -d base --repair   # reparar
+"""
+import argparse
+import sys
+
+import odoo
+from odoo.cli import Command
+from odoo.tools import config
+
+
+class BlinkEncodingRepair(Command):
+    """Escanea/repara texto con doble codificación UTF-8 (mojibake)"""
+    name = 'blink_encoding_repair'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{sys.argv[0].split("/")[-1]} {self.name}',
+            description=self.__doc__.strip(),
+        )
+        parser.add_argument('-d', '--database', dest='db_name', required=True)
+        parser.add_argument('--repair', action='store_true',
+                            help='reparar (por defecto solo se reporta)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='registros por transacción al reparar')
+        args, odoo_args = parser.parse_known_args(cmdargs)
+        config.parse_config(odoo_args + ['-d', args.db_name])
+
+        registry = odoo.modules.registry.Registry(args.db_name)
+        with registry.cursor() as cr:
+            env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+            wizard = env['blink.encoding.repair']
+            total = 0
+            for model_name, field_name in wizard._get_repair_targets():
+                line = wizard._scan_target(model_name, field_name)
+                if not line:
+                    continue
+                total += line['record_count']
+                print(f"{model_name}.{field_name}: {line['record_count']} registros")
+                print(f"    antes:    {line['sample_before']!r}")
+                print(f"    después:  {line['sample_after']!r}")
+            print(f"Total: {total} registros afectados")
+
+            if args.repair and total:
+                results = wizard._repair_all(batch_size=max(args.batch_size, 1))
+                for (model_name, field_name), count in results.items():
+                    print(f"{model_name}.{field_name}: {count} secuencias reparadas")
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+from markupsafe import Markup
+
+from odoo import http
+from odoo.http import request, content_disposition
+
+from ..tools import debug_capture
+
+
+class DebugCaptureController(http.Controller):
+
+    @http.route('/blink_invoice_layout/debug_capture', type='http', auth='user')
+    def debug_capture_list(self, **kwargs):
+        """Lista las capturas de HTML de facturas guardadas en este worker."""
+        if not request.env.user.has_group('base.group_system'):
+            return request.not_found()
+
+        rows = []
+        for capture in debug_capture.list_captures(request.env.cr.dbname):
+            rows.append(Markup(
+                '<tr><td><a href="/blink_invoice_layout/debug_capture/%s">%s</a></td>'
+                '<td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>'
+            ) % (
+                capture.key, capture.key,
+                datetime.fromtimestamp(capture.timestamp).strftime('%Y-%m-%d %H:%M:%S'),
+                capture.report_name,
+                ', '.join(str(res_id) for res_id in capture.res_ids),
+                f"{capture.size}{' (truncado)' if capture.truncated else ''}",
+            ))
+
+        body = Markup(
+            '<html><head><meta charset="utf-8"/><title>Capturas HTML de facturas</title></head><body>'
+            '<h3>Capturas HTML de facturas</h3>'
+            '<p>Se muestran solo las capturas del worker que atiende este request.</p>'
+            '<table border="1" cellpadding="4">'
+            '<tr><th>Captura</th><th>Fecha</th><th>Reporte</th><th>IDs</th><th>Bytes</th></tr>'
+            '%s</table></body></html>'
+        ) % (Markup('').join(rows) or Markup('<tr><td colspan="5">Sin capturas</td></tr>'))
+        return request.make_response(str(body), headers=[('Content-Type', 'text/html; charset=utf-8')])
+
+    @http.route('/blink_invoice_layout/debug_capture/<string:key>', type='http', auth='user')
+    def debug_capture_download(self, key, **kwargs):
+        """Descarga una captura como archivo .html."""
+        if not request.env.user.has_group('base.group_system'):
+            return request.not_found()
+
+        capture = debug_capture.get_capture(request.env.cr.dbname, key)
+        if not capture:
+            return request.not_found()
+
+        filename = f"{capture.report_name}-{capture.key}.html"
+        return request.make_response(capture.content, headers=[
+            ('Content-Type', 'text/html; charset=utf-8'),
+            ('Content-Disposition', content_disposition(filename)),
+        ])
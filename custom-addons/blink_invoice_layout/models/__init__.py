@@ -1,2 +1,4 @@
 # -*- coding: utf-8 -*-
 from . import ir_actions_report
+from . import report_render_metric
+from . import encoding_repair
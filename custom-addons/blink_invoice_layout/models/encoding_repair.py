@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+from ..tools import encoding_repair
+from .ir_actions_report import RENDER_MOJIBAKE_REPAIR_PARAM
+
+_logger = logging.getLogger(__name__)
+
+# Columnas de texto plano (no traducibles) donde suele aparecer doble codificación
+PLAIN_TEXT_TARGETS = [
+    ('res.partner', 'name'),
+    ('res.partner', 'street'),
+    ('res.partner', 'street2'),
+    ('res.partner', 'city'),
+]
+DEFAULT_BATCH_SIZE = 500
+
+
+class EncodingRepair(models.TransientModel):
+    _name = 'blink.encoding.repair'
+    _description = 'Reparación de texto con doble codificación UTF-8'
+
+    state = fields.Selection(
+        selection=[('draft', 'Sin escanear'), ('scanned', 'Escaneado'), ('repaired', 'Reparado')],
+        default='draft', required=True)
+    batch_size = fields.Integer(string='Registros por transacción', default=DEFAULT_BATCH_SIZE)
+    line_ids = fields.One2many('blink.encoding.repair.line', 'wizard_id', string='Resultados')
+    total_records = fields.Integer(string='Registros afectados', compute='_compute_totals')
+    total_repaired = fields.Integer(string='Secuencias reparadas', compute='_compute_totals')
+    render_repair_enabled = fields.Boolean(
+        string='Corrección en cada render', compute='_compute_render_repair_enabled')
+
+    @api.depends('line_ids.record_count', 'line_ids.repaired_count')
+    def _compute_totals(self):
+        for wizard in self:
+            wizard.total_records = sum(wizard.line_ids.mapped('record_count'))
+            wizard.total_repaired = sum(wizard.line_ids.mapped('repaired_count'))
+
+    def _compute_render_repair_enabled(self):
+        enabled = self.env['ir.config_parameter'].sudo().get_param(RENDER_MOJIBAKE_REPAIR_PARAM, '1') != '0'
+        for wizard in self:
+            wizard.render_repair_enabled = enabled
+
+    @api.model
+    def _get_repair_targets(self):
+        """
+        (modelo, campo) a revisar: arch de vistas, etiquetas y ayudas de
+        campos, todo campo traducible almacenado (columnas JSONB) y algunos
+        datos de contactos.
+        """
+        targets = [('ir.ui.view', 'arch_db'), ('ir.model.fields', 'field_description'), ('ir.model.fields', 'help')]
+        for model_name in sorted(self.env.registry):
+            model = self.env[model_name]
+            if model._abstract or model._transient or not model._auto:
+                continue
+            for field_name, field in model._fields.items():
+                if field.translate and field.store and field.column_type:
+                    targets.append((model_name, field_name))
+        targets += PLAIN_TEXT_TARGETS
+        return [target for index, target in enumerate(targets)
+                if target not in targets[:index] and target[1] in self.env[target[0]]._fields]
+
+    @api.model
+    def _find_affected_ids(self, model_name, field_name):
+        """IDs con doble codificación, detectada en PostgreSQL sin traer los textos."""
+        model = self.env[model_name]
+        self.env.flush_all()
+        self.env.cr.execute(SQL(
+            "SELECT id FROM %s WHERE %s::text ~ %s ORDER BY id",
+            SQL.identifier(model._table),
+            SQL.identifier(field_name),
+            encoding_repair.DOUBLE_ENCODED_PATTERN,
+        ))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _scan_target(self, model_name, field_name):
+        ids = self._find_affected_ids(model_name, field_name)
+        if not ids:
+            return None
+        model = self.env[model_name]
+        self.env.cr.execute(SQL(
+            "SELECT %s::text FROM %s WHERE id = %s",
+            SQL.identifier(field_name), SQL.identifier(model._table), ids[0],
+        ))
+        example = self.env.cr.fetchone()[0] or ''
+        before = encoding_repair.sample(example)
+        return {
+            'model': model_name,
+            'field_name': field_name,
+            'record_count': len(ids),
+            'sample_before': before,
+            'sample_after': encoding_repair.repair_text(before)[0],
+        }
+
+    def action_scan(self):
+        self.ensure_one()
+        self.line_ids.unlink()
+        lines = []
+        for model_name, field_name in self._get_repair_targets():
+            values = self._scan_target(model_name, field_name)
+            if values:
+                lines.append((0, 0, values))
+        self.write({'line_ids': lines, 'state': 'scanned'})
+        return self._reopen()
+
+    @api.model
+    def _repair_target(self, model_name, field_name, batch_size=DEFAULT_BATCH_SIZE, commit=True):
+        """
+        Repara un (modelo, campo) por lotes de ``batch_size`` registros. Con
+        ``commit`` cada lote es su propia transacción. Devuelve la cantidad
+        de secuencias reparadas.
+        """
+        model = self.env[model_name]
+        field = model._fields[field_name]
+        is_jsonb = bool(field.translate)
+        ids = self._find_affected_ids(model_name, field_name)
+        repaired = 0
+        for start in range(0, len(ids), batch_size):
+            batch = tuple(ids[start:start + batch_size])
+            self.env.cr.execute(SQL(
+                "SELECT id, %s FROM %s WHERE id IN %s",
+                SQL.identifier(field_name), SQL.identifier(model._table), batch,
+            ))
+            for record_id, value in self.env.cr.fetchall():
+                if is_jsonb:
+                    new_value, count = {}, 0
+                    for lang, text in (value or {}).items():
+                        new_value[lang], lang_count = encoding_repair.repair_text(text)
+                        count += lang_count
+                    new_value = json.dumps(new_value)
+                    cast = SQL('%s::jsonb', new_value)
+                else:
+                    new_value, count = encoding_repair.repair_text(value)
+                    cast = SQL('%s', new_value)
+                if not count:
+                    continue
+                # Los modelos con _log_access = False no tienen write_date
+                write_date = SQL(", write_date = now() at time zone 'UTC'") if model._log_access else SQL()
+                self.env.cr.execute(SQL(
+                    "UPDATE %s SET %s = %s%s WHERE id = %s",
+                    SQL.identifier(model._table), SQL.identifier(field_name), cast, write_date, record_id,
+                ))
+                repaired += count
+            if commit:
+                self.env.cr.commit()
+            _logger.info("Reparación de codificación %s.%s: %d/%d registros",
+                         model_name, field_name, min(start + batch_size, len(ids)), len(ids))
+        return repaired
+
+    @api.model
+    def _repair_all(self, batch_size=DEFAULT_BATCH_SIZE, commit=True):
+        """Repara todos los destinos; devuelve {(modelo, campo): secuencias reparadas}."""
+        results = {}
+        for model_name, field_name in self._get_repair_targets():
+            if self._find_affected_ids(model_name, field_name):
+                results[(model_name, field_name)] = self._repair_target(
+                    model_name, field_name, batch_size=batch_size, commit=commit)
+        self.env.invalidate_all()
+        self.env.registry.clear_all_caches()
+        return results
+
+    def action_repair(self):
+        self.ensure_one()
+        for line in self.line_ids:
+            line.repaired_count = self._repair_target(
+                line.model, line.field_name, batch_size=max(self.batch_size, 1))
+        self.env.invalidate_all()
+        self.env.registry.clear_all_caches()
+        self.state = 'repaired'
+        return self._reopen()
+
+    def action_disable_render_repair(self):
+        self.env['ir.config_parameter'].sudo().set_param(RENDER_MOJIBAKE_REPAIR_PARAM, '0')
+        return self._reopen()
+
+    def action_enable_render_repair(self):
+        self.env['ir.config_parameter'].sudo().set_param(RENDER_MOJIBAKE_REPAIR_PARAM, '1')
+        return self._reopen()
+
+    def _reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class EncodingRepairLine(models.TransientModel):
+    _name = 'blink.encoding.repair.line'
+    _description = 'Resultado de escaneo de doble codificación'
+
+    wizard_id = fields.Many2one('blink.encoding.repair', required=True, ondelete='cascade')
+    model = fields.Char(string='Modelo', required=True)
+    field_name = fields.Char(string='Campo', required=True)
+    record_count = fields.Integer(string='Registros')
+    repaired_count = fields.Integer(string='Secuencias reparadas')
+    sample_before = fields.Char(string='Ejemplo')
+    sample_after = fields.Char(string='Reparado')
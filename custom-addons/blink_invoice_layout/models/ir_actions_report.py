@@ -1,155 +1,311 @@
 # -*- coding: utf-8 -*-
-from odoo import models, api
-import re
+from odoo import models, api, SUPERUSER_ID
+from odoo.tools import config
+import io
+import os
+import random
+import time
 import logging
 
+from ..tools import debug_capture, pdf_cache, render_metrics
+from ..tools.html_postprocess import postprocess_html
+
 _logger = logging.getLogger(__name__)
 
+# Reportes de factura cuyo HTML necesita el post-procesamiento para wkhtmltopdf
+POSTPROCESS_REPORTS = frozenset({
+    'account.report_invoice',
+    'account.report_invoice_with_payments',
+    'l10n_ar_invoice_thermal_qr.report_invoice_thermal_80mm',
+    'l10n_ar_thermal_ticket.report_ticket_80mm',
+})
+
+# '0' deshabilita la corrección de doble codificación en cada render (una vez
+# reparados los datos con Ajustes > Técnico > Reparar codificación)
+RENDER_MOJIBAKE_REPAIR_PARAM = 'blink_invoice_layout.render_mojibake_repair'
+
+# Parámetros de sistema (por base de datos) de la captura de debug
+DEBUG_CAPTURE_RATE_PARAM = 'blink_invoice_layout.debug_capture_rate'
+DEBUG_CAPTURE_SIZE_PARAM = 'blink_invoice_layout.debug_capture_size'
+DEBUG_CAPTURE_MAX_BYTES_PARAM = 'blink_invoice_layout.debug_capture_max_bytes'
+DEFAULT_DEBUG_CAPTURE_SIZE = 10
+DEFAULT_DEBUG_CAPTURE_MAX_BYTES = 2 * 1024 * 1024
+
+# Reportes cuyo PDF se cachea en el filestore para facturas publicadas con CAE
+PDF_CACHE_REPORTS = frozenset({
+    'account.report_invoice',
+    'l10n_ar_invoice_thermal_qr.report_invoice_thermal_80mm',
+    'l10n_ar_thermal_ticket.report_ticket_80mm',
+})
+# Tamaño máximo del cache de PDFs en MB (0 deshabilita el cache)
+PDF_CACHE_MAX_MB_PARAM = 'blink_invoice_layout.pdf_cache_max_mb'
+DEFAULT_PDF_CACHE_MAX_MB = 512
+
+# Cada cuántos segundos un worker vuelca sus histogramas de tiempos de render
+METRICS_FLUSH_INTERVAL = 300
+
 
 class IrActionsReport(models.Model):
     _inherit = 'ir.actions.report'
 
+    @api.model
+    def _get_blink_postprocess_reports(self):
+        """
+        Nombres técnicos (report_name) de los reportes que pasan por el
+        pipeline de post-procesamiento. Extender para agregar reportes.
+        """
+        return POSTPROCESS_REPORTS
+
+    def _blink_postprocess_skip(self):
+        """Etapas del pipeline deshabilitadas por parámetro de sistema."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        if ICP.get_param(RENDER_MOJIBAKE_REPAIR_PARAM, '1') == '0':
+            return ('repair_mojibake',)
+        return ()
+
+    def _blink_report_name(self, report_ref):
+        """report_name de ``report_ref`` si es un reporte de factura instrumentado, si no None."""
+        if not report_ref:
+            return None
+        report_name = self._get_report(report_ref).report_name
+        return report_name if report_name in self._get_blink_postprocess_reports() else None
+
+    def _blink_record_timing(self, report_name, stage, elapsed):
+        render_metrics.record(self.env.cr.dbname, report_name, self.env.company.id, stage, elapsed)
+
     def _render_qweb_html(self, report_ref, res_ids=None, data=None):
         """
-        Intercepta el HTML para asegurar UTF-8 correcto y corregir doble codificación
+        Intercepta el HTML de los reportes de factura para asegurar UTF-8
+        correcto y corregir doble codificación (ver tools/html_postprocess.py)
         """
+        report_name = self._blink_report_name(report_ref)
+
+        start = time.perf_counter()
         # Llamar al método padre
         if res_ids is None:
             result = super()._render_qweb_html(report_ref, data=data)
         else:
             result = super()._render_qweb_html(report_ref, res_ids, data=data)
 
-        if result and len(result) > 0:
-            html_content = result[0]
-            was_bytes = isinstance(html_content, bytes)
-
-            # Decodificar si es bytes
-            if was_bytes:
-                try:
-                    html_content = html_content.decode('utf-8')
-                except UnicodeDecodeError:
-                    # Si falla, intentar con latin-1
-                    try:
-                        html_content = html_content.decode('latin-1')
-                    except:
-                        html_content = html_content.decode('utf-8', errors='ignore')
-
-            # Log para debug - buscar palabra Condición
-            if 'Condici' in html_content or 'IVA' in html_content:
-                # Buscar el fragmento que contiene "Condición"
-                import re
-                matches = re.findall(r'.{0,30}Condici.{0,30}', html_content)
-                if matches:
-                    _logger.warning("=== ANTES DE CORRECCIONES ===")
-                    for match in matches[:3]:  # Solo primeros 3 matches
-                        _logger.warning(f"Texto encontrado: {repr(match)}")
-                        _logger.warning(f"Bytes: {[hex(ord(c)) for c in match]}")
-
-            # Corregir doble codificacion usando secuencias de escape
-            corrections = {
-                # Vocales con tilde minusculas
-                '\xc3\xb3': chr(0xF3),  # o con tilde
-                '\xc3\xa1': chr(0xE1),  # a con tilde
-                '\xc3\xa9': chr(0xE9),  # e con tilde
-                '\xc3\xad': chr(0xED),  # i con tilde
-                '\xc3\xba': chr(0xFA),  # u con tilde
-                '\xc3\xb1': chr(0xF1),  # n con tilde
-                # Vocales con tilde mayusculas
-                '\xc3\x93': chr(0xD3),  # O con tilde
-                '\xc3\x81': chr(0xC1),  # A con tilde
-                '\xc3\x89': chr(0xC9),  # E con tilde
-                '\xc3\x8d': chr(0xCD),  # I con tilde
-                '\xc3\x9a': chr(0xDA),  # U con tilde
-                '\xc3\x91': chr(0xD1),  # N con tilde
-                # Caracteres problematicos
-                '\xc2': '',  # Eliminar este caracter
-            }
-
-            corrections_applied = 0
-            for bad, good in corrections.items():
-                count = html_content.count(bad)
-                if count > 0:
-                    _logger.warning(f"Reemplazando {repr(bad)} -> {repr(good)} ({count} veces)")
-                    html_content = html_content.replace(bad, good)
-                    corrections_applied += count
-
-            _logger.warning(f"Total de correcciones aplicadas: {corrections_applied}")
-
-            # NO convertir a entidades HTML, dejar caracteres UTF-8 nativos
-            _logger.warning("Manteniendo caracteres UTF-8 nativos (sin entidades HTML)")
-
-            # Log después de todas las correcciones
-            if 'Condici' in html_content or 'IVA' in html_content:
-                matches = re.findall(r'.{0,30}Condici.{0,30}', html_content)
-                if matches:
-                    _logger.warning("=== DESPUÉS DE CORRECCIONES ===")
-                    for match in matches[:3]:
-                        _logger.warning(f"Texto final: {repr(match)}")
-
-            # Asegurar charset UTF-8 en el head
-            if '<meta charset' not in html_content.lower():
-                html_content = html_content.replace(
-                    '<head>',
-                    '<head>\n    <meta charset="UTF-8">\n    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">',
-                    1
-                )
-            else:
-                # Reemplazar cualquier charset existente por UTF-8
-                html_content = re.sub(
-                    r'<meta\s+charset=["\']?[^"\'>]+["\']?\s*/?>',
-                    '<meta charset="UTF-8">',
-                    html_content,
-                    flags=re.IGNORECASE,
-                    count=1
-                )
-
-            # Agregar encoding explícito en el tag html si no existe
-            if '<html' in html_content and 'lang=' not in html_content[:500]:
-                html_content = re.sub(
-                    r'<html([^>]*)>',
-                    r'<html\1 lang="es" xml:lang="es">',
-                    html_content,
-                    count=1,
-                    flags=re.IGNORECASE
-                )
-
-
-            # Convertir caracteres con acento a entidades HTML NUMERICAS
-            # wkhtmltopdf no respeta UTF-8 correctamente, pero sí las entidades numéricas
-            import html
-            # Convertir todos los caracteres > 127 a entidades numéricas
-            html_content_entities = ''
-            for char in html_content:
-                if ord(char) > 127:
-                    html_content_entities += f'&#{ord(char)};'
-                else:
-                    html_content_entities += char
-
-            _logger.warning(f"Convertidos {sum(1 for c in html_content if ord(c) > 127)} caracteres especiales a entidades numéricas")
-            html_content_utf8 = html_content_entities
-
-            # Guardar HTML temporalmente para debug DESPUÉS de normalización
-            try:
-                import tempfile
-                import os
-                temp_dir = tempfile.gettempdir()
-                temp_file = os.path.join(temp_dir, 'odoo_invoice_debug_utf8.html')
-                with open(temp_file, 'w', encoding='utf-8') as f:
-                    f.write(html_content_utf8 if isinstance(html_content_utf8, str) else html_content_utf8.decode('utf-8'))
-                _logger.warning(f"HTML UTF-8 guardado en: {temp_file}")
-            except Exception as e:
-                _logger.warning(f"Error guardando HTML debug: {e}")
-
-            # Convertir de vuelta a bytes si era bytes originalmente
-            if was_bytes:
-                # IMPORTANTE: Usar ASCII encoding para que las entidades numéricas
-                # se mantengan como texto literal (ej: &#243; no se convierte a ó)
-                html_content_utf8 = html_content_utf8.encode('ascii', errors='xmlcharrefreplace')
-                _logger.warning("HTML convertido a bytes ASCII con entidades preservadas")
-            else:
-                _logger.warning("HTML mantenido como string con entidades numéricas")
-
-            result = (html_content_utf8, result[1])
+        if not report_name or not result or not result[0]:
+            return result
+
+        qweb_done = time.perf_counter()
+        html_content = postprocess_html(result[0], skip=self._blink_postprocess_skip())
+        postprocess_done = time.perf_counter()
+        self._blink_record_timing(report_name, 'qweb', qweb_done - start)
+        self._blink_record_timing(report_name, 'postprocess', postprocess_done - qweb_done)
+
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("Render HTML %s %s: qweb %.1f ms, post-procesamiento %.1f ms, %d bytes",
+                          report_name, res_ids, (qweb_done - start) * 1000,
+                          (postprocess_done - qweb_done) * 1000, len(html_content))
+
+        self._blink_debug_capture(report_name, res_ids, html_content)
+        # La vista HTML (portal, vista previa) no pasa por _render_qweb_pdf
+        self._blink_flush_render_metrics()
+
+        return (html_content, result[1])
+
+    def _run_wkhtmltopdf(self, bodies, report_ref=False, *args, **kwargs):
+        report_name = self._blink_report_name(report_ref)
+        if not report_name:
+            return super()._run_wkhtmltopdf(bodies, report_ref, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super()._run_wkhtmltopdf(bodies, report_ref, *args, **kwargs)
+        finally:
+            self._blink_record_timing(report_name, 'wkhtmltopdf', time.perf_counter() - start)
+
+    @api.model
+    def _render_qweb_pdf_prepare_streams(self, report_ref, data, res_ids=None):
+        start = time.perf_counter()
+        try:
+            return self._blink_prepare_streams_cached(report_ref, data, res_ids)
+        finally:
+            render_metrics.set_prepare_elapsed(time.perf_counter() - start)
+
+    @api.model
+    def _get_blink_pdf_cache_reports(self):
+        """Nombres técnicos de los reportes cuyo PDF se cachea. Extender para agregar reportes."""
+        return PDF_CACHE_REPORTS
+
+    def _blink_pdf_cache_dir(self):
+        return os.path.join(config.filestore(self.env.cr.dbname), pdf_cache.CACHE_DIRNAME)
+
+    def _blink_pdf_cache_max_bytes(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        return int(self._blink_float_param(ICP, PDF_CACHE_MAX_MB_PARAM, DEFAULT_PDF_CACHE_MAX_MB) * 1024 * 1024)
+
+    def _blink_pdf_cache_template_version(self, report):
+        """
+        Versión de las plantillas: cualquier cambio en una vista QWeb (incluida
+        la actualización de un módulo), en el reporte o en su paperformat
+        cambia las claves y deja las entradas viejas para el LRU.
+        """
+        self.env.cr.execute("SELECT max(write_date) FROM ir_ui_view WHERE type = 'qweb'")
+        views_version = self.env.cr.fetchone()[0]
+        return (views_version, report.write_date, report.get_paperformat().write_date)
 
+    def _blink_pdf_cache_eligible(self, move):
+        """Solo facturas publicadas y, con facturación electrónica instalada, con CAE."""
+        if move.state != 'posted':
+            return False
+        return 'afip_auth_code' not in move._fields or bool(move.afip_auth_code)
+
+    def _blink_pdf_cache_variant(self, move):
+        """Las facturas del POS se enrutan al reporte térmico (l10n_ar_invoice_thermal_qr)."""
+        return 'is_pos_origin' in move._fields and move.is_pos_origin
+
+    def _blink_pdf_cache_key(self, report, template_version, move):
+        company = move.company_id
+        layout = company.document_layout_id if 'document_layout_id' in company._fields else None
+        return pdf_cache.make_key(
+            report.report_name,
+            move.id,
+            move.write_date,
+            self._blink_pdf_cache_variant(move),
+            company.id,
+            company.write_date,
+            company.base_layout if 'base_layout' in company._fields else '',
+            layout.id if layout else '',
+            layout.write_date if layout else '',
+            template_version,
+            self.env.lang,
+            move.partner_id.lang,
+        )
+
+    def _blink_prepare_streams_cached(self, report_ref, data, res_ids):
+        """
+        Sirve desde el cache del filestore los PDFs de facturas publicadas y
+        renderiza solo las que faltan, guardándolas para la próxima vez. El
+        resultado respeta el orden de ``res_ids``.
+        """
+        report = self._get_report(report_ref)
+        if (not res_ids
+                or report.report_name not in self._get_blink_pdf_cache_reports()
+                or report.model != 'account.move'
+                or (data and set(data) - {'report_type', 'context'})
+                or len(set(res_ids)) != len(res_ids)
+                or self.env.context.get('blink_pdf_cache_skip')):
+            return super()._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=res_ids)
+
+        max_bytes = self._blink_pdf_cache_max_bytes()
+        if max_bytes <= 0:
+            return super()._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=res_ids)
+
+        cache_dir = self._blink_pdf_cache_dir()
+        template_version = self._blink_pdf_cache_template_version(report)
+        moves = self.env['account.move'].browse(res_ids)
+        keys = {
+            move.id: self._blink_pdf_cache_key(report, template_version, move)
+            for move in moves if self._blink_pdf_cache_eligible(move)
+        }
+        cached = {}
+        for res_id, key in keys.items():
+            content = pdf_cache.get(cache_dir, key)
+            if content is not None:
+                cached[res_id] = content
+
+        missing_ids = [res_id for res_id in res_ids if res_id not in cached]
+        streams = {}
+        if missing_ids:
+            streams = super()._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=missing_ids)
+            if any(res_id not in missing_ids for res_id in streams):
+                # El PDF no se pudo separar por factura: no se puede intercalar con el cache
+                if not cached:
+                    return streams
+                for entry in streams.values():
+                    if entry.get('stream'):
+                        entry['stream'].close()
+                return super()._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=res_ids)
+
+            # El enrutamiento térmico/A4 es por factura: cada PDF se cachea con su variante
+            stored = False
+            for res_id in missing_ids:
+                entry = streams.get(res_id)
+                if res_id in keys and entry and entry.get('stream'):
+                    pdf_cache.put(cache_dir, keys[res_id], entry['stream'].getvalue())
+                    stored = True
+            if stored:
+                pdf_cache.evict(cache_dir, max_bytes)
+
+        if cached:
+            _logger.debug("Cache de PDFs %s: %d de %d facturas servidas desde cache",
+                          report.report_name, len(cached), len(res_ids))
+
+        result = {}
+        for res_id in res_ids:
+            if res_id in cached:
+                result[res_id] = {'stream': io.BytesIO(cached[res_id]), 'attachment': None}
+            elif res_id in streams:
+                result[res_id] = streams[res_id]
+        return result
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        """
+        Mide el tiempo total del PDF y, por diferencia con la preparación de
+        streams (QWeb + wkhtmltopdf), el merge final de los PDFs.
+        """
+        report_name = self._blink_report_name(report_ref)
+        if not report_name:
+            return super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+
+        render_metrics.pop_prepare_elapsed()
+        start = time.perf_counter()
+        result = super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+        total = time.perf_counter() - start
+        self._blink_record_timing(report_name, 'total', total)
+        self._blink_record_timing(report_name, 'pdf_merge', max(total - render_metrics.pop_prepare_elapsed(), 0.0))
+        self._blink_flush_render_metrics()
         return result
 
+    def _blink_flush_render_metrics(self, force=False):
+        """
+        Vuelca los histogramas del worker a blink.report.render.metric cada
+        METRICS_FLUSH_INTERVAL segundos, en un cursor propio para no depender
+        del commit/rollback del request que imprime.
+        """
+        dbname = self.env.cr.dbname
+        if not force and not render_metrics.should_flush(dbname, METRICS_FLUSH_INTERVAL):
+            return
+        histograms = render_metrics.drain(dbname)
+        if not histograms:
+            return
+        try:
+            with self.env.registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                env['blink.report.render.metric']._merge_histograms(histograms)
+        except Exception:
+            _logger.warning("No se pudieron volcar las métricas de render, se reintenta luego", exc_info=True)
+            render_metrics.restore(dbname, histograms)
+
+    def _blink_debug_capture(self, report_name, res_ids, html_content):
+        """
+        Guarda el HTML renderizado en el ring buffer del worker si la captura
+        está habilitada (``debug_capture_rate`` > 0) y la muestra lo elige.
+        Deshabilitada por defecto: sin parámetro no hay captura ni I/O.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        rate = self._blink_float_param(ICP, DEBUG_CAPTURE_RATE_PARAM, 0.0)
+        if rate <= 0 or random.random() >= rate:
+            return
+
+        ring_size = int(self._blink_float_param(ICP, DEBUG_CAPTURE_SIZE_PARAM, DEFAULT_DEBUG_CAPTURE_SIZE))
+        max_bytes = int(self._blink_float_param(ICP, DEBUG_CAPTURE_MAX_BYTES_PARAM, DEFAULT_DEBUG_CAPTURE_MAX_BYTES))
+        if ring_size <= 0 or max_bytes <= 0:
+            return
+
+        capture = debug_capture.add_capture(
+            self.env.cr.dbname, report_name, res_ids, html_content, ring_size, max_bytes)
+        _logger.info("Captura de debug %s: %s %s (%d bytes%s)",
+                     capture.key, report_name, list(capture.res_ids), capture.size,
+                     ', truncado' if capture.truncated else '')
+
+    @api.model
+    def _blink_float_param(self, ICP, key, default):
+        try:
+            return float(ICP.get_param(key, default) or default)
+        except (TypeError, ValueError):
+            _logger.warning("Parámetro de sistema %s inválido, usando %s", key, default)
+            return default
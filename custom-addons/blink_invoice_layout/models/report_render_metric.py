@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import json
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+from ..tools import render_metrics
+
+
+class ReportRenderMetric(models.Model):
+    _name = 'blink.report.render.metric'
+    _description = 'Métrica diaria de tiempos de render de reportes'
+    _order = 'date desc, report_name, company_id, stage'
+    _rec_name = 'report_name'
+
+    date = fields.Date(string='Fecha', required=True, index=True)
+    report_name = fields.Char(string='Reporte', required=True, index=True)
+    # NOT NULL: con NULL la restricción unique no detecta filas repetidas
+    company_id = fields.Many2one('res.company', string='Compañía', required=True, index=True,
+                                 ondelete='cascade', default=lambda self: self.env.company)
+    stage = fields.Selection(
+        selection=[
+            ('qweb', 'Render QWeb'),
+            ('postprocess', 'Post-procesamiento HTML'),
+            ('wkhtmltopdf', 'wkhtmltopdf'),
+            ('pdf_merge', 'Merge PDF'),
+            ('total', 'Total PDF'),
+        ],
+        string='Etapa', required=True)
+    count = fields.Integer(string='Renders')
+    total_ms = fields.Float(string='Tiempo total (ms)')
+    max_ms = fields.Float(string='Máximo (ms)', aggregator='max')
+    p50_ms = fields.Float(string='p50 (ms)', aggregator=False)
+    p95_ms = fields.Float(string='p95 (ms)', aggregator=False)
+    buckets = fields.Char(
+        string='Buckets',
+        help='Conteos por bucket del histograma (JSON), límites en '
+             'tools/render_metrics.BUCKET_BOUNDS_MS')
+
+    _sql_constraints = [
+        ('metric_unique', 'unique(date, report_name, company_id, stage)',
+         'Ya existe una métrica para ese día, reporte, compañía y etapa.'),
+    ]
+
+    @api.model
+    def _merge_histograms(self, histograms):
+        """
+        Suma los histogramas de un worker (ver tools/render_metrics.drain) a
+        las filas del día, recalculando p50/p95 sobre los buckets combinados.
+        Varios workers y el cron vuelcan a la vez: la fila se crea con
+        INSERT ... ON CONFLICT y se bloquea (FOR UPDATE) mientras se suma.
+        """
+        today = fields.Date.context_today(self)
+        self.flush_model()
+        for (report_name, company_id, stage), histogram in histograms.items():
+            key = SQL("date = %s AND report_name = %s AND company_id = %s AND stage = %s",
+                      today, report_name, company_id, stage)
+            self.env.cr.execute(SQL("""
+                INSERT INTO %(table)s (date, report_name, company_id, stage, count, total_ms, max_ms,
+                                       p50_ms, p95_ms, create_uid, create_date, write_uid, write_date)
+                VALUES (%(date)s, %(report_name)s, %(company_id)s, %(stage)s, 0, 0, 0, 0, 0,
+                        %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC')
+                ON CONFLICT (date, report_name, company_id, stage) DO NOTHING
+            """, table=SQL.identifier(self._table), date=today, report_name=report_name,
+                company_id=company_id, stage=stage, uid=self.env.uid))
+            self.env.cr.execute(SQL(
+                "SELECT id, count, total_ms, max_ms, buckets FROM %s WHERE %s FOR UPDATE",
+                SQL.identifier(self._table), key))
+            metric_id, count, total_ms, max_ms, stored_buckets = self.env.cr.fetchone()
+
+            buckets = histogram.buckets
+            if stored_buckets:
+                buckets = [a + b for a, b in zip(json.loads(stored_buckets), buckets)]
+            max_ms = max(max_ms or 0.0, histogram.max_ms)
+            self.env.cr.execute(SQL("""
+                UPDATE %(table)s
+                   SET count = %(count)s, total_ms = %(total_ms)s, max_ms = %(max_ms)s,
+                       p50_ms = %(p50_ms)s, p95_ms = %(p95_ms)s, buckets = %(buckets)s,
+                       write_uid = %(uid)s, write_date = now() at time zone 'UTC'
+                 WHERE id = %(id)s
+            """, table=SQL.identifier(self._table), id=metric_id, uid=self.env.uid,
+                count=(count or 0) + histogram.count,
+                total_ms=(total_ms or 0.0) + histogram.total_ms,
+                max_ms=max_ms,
+                p50_ms=render_metrics.percentile(buckets, 0.50, max_ms),
+                p95_ms=render_metrics.percentile(buckets, 0.95, max_ms),
+                buckets=json.dumps(buckets)))
+        self.invalidate_model()
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import test_encoding_repair
+from . import test_report_render_metric
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import BaseCase, tagged
+
+from odoo.addons.blink_invoice_layout.tools import encoding_repair
+
+
+def double_encode(text, codec='latin-1'):
+    """``text`` guardado como UTF-8 y leído como ``codec``."""
+    return text.encode('utf-8').decode(codec)
+
+
+@tagged('post_install', '-at_install')
+class TestEncodingRepair(BaseCase):
+
+    def test_clean_text_is_unchanged(self):
+        for text in (
+            'PERÚ\xa0S.A.',
+            'Ó¿Qué?',
+            'CAFÉ¡hola!',
+            'ÁREA\xa0Nº\xa01 – AÑO 2026',
+            '¿Señal? ¡Ñandú!',
+            'SÃO PAULO',
+            '<p>Dirección: Av. Córdoba 1234, 2º piso</p>',
+        ):
+            with self.subTest(text=text):
+                self.assertFalse(encoding_repair.has_double_encoding(text))
+                self.assertEqual(encoding_repair.repair_text(text), (text, 0))
+
+    def test_repairs_latin1_mojibake(self):
+        text = 'Facturación electrónica Nº 1 - ¿Señor PÉREZ?\xa0Sí'
+        broken = double_encode(text)
+        self.assertTrue(encoding_repair.has_double_encoding(broken))
+        self.assertEqual(encoding_repair.repair_text(broken), (text, 8))
+
+    def test_repairs_cp1252_mojibake(self):
+        # En cp1252 'Ó' (C3 93) se lee como 'Ã“' y 'Ñ' (C3 91) como 'Ã‘'
+        text = 'ÓPTICA ESPAÑA'
+        self.assertEqual(encoding_repair.repair_text(double_encode(text, 'cp1252')), (text, 2))
+
+    def test_mixed_text(self):
+        text = 'PERÚ\xa0S.A. - ' + double_encode('Pérez') + ' ¡hola!'
+        self.assertEqual(encoding_repair.repair_text(text), ('PERÚ\xa0S.A. - Pérez ¡hola!', 1))
+
+    def test_sample(self):
+        broken = 'x' * 50 + double_encode('ó') + 'y' * 50
+        self.assertEqual(encoding_repair.sample(broken, width=3), 'xxx' + double_encode('ó') + 'yyy')
+        self.assertEqual(encoding_repair.sample('CAFÉ¡hola!'), '')
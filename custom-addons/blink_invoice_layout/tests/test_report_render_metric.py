@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import json
+
+from odoo.tests.common import TransactionCase, tagged
+
+from odoo.addons.blink_invoice_layout.tools import render_metrics
+
+
+def histogram(*samples_ms):
+    result = render_metrics.Histogram()
+    for elapsed_ms in samples_ms:
+        result.add(elapsed_ms)
+    return result
+
+
+@tagged('post_install', '-at_install')
+class TestReportRenderMetric(TransactionCase):
+
+    def test_flushes_merge_into_one_row(self):
+        Metric = self.env['blink.report.render.metric']
+        key = ('account.report_invoice', self.env.company.id, 'total')
+        Metric._merge_histograms({key: histogram(20, 40)})
+        Metric._merge_histograms({key: histogram(3000)})
+
+        metric = Metric.search([('report_name', '=', key[0]), ('company_id', '=', key[1]),
+                                ('stage', '=', 'total')])
+        self.assertEqual(len(metric), 1)
+        self.assertEqual(metric.count, 3)
+        self.assertEqual(metric.total_ms, 3060)
+        self.assertEqual(metric.max_ms, 3000)
+        self.assertEqual(sum(json.loads(metric.buckets)), 3)
+        self.assertGreater(metric.p95_ms, 2500)
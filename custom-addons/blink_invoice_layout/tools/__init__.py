@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import html_postprocess
+from . import encoding_repair
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Captura de HTML de reportes para debug, en memoria del worker.
+
+Cada base de datos tiene su propio ring buffer (deque con maxlen) con las
+últimas N capturas. Nada se escribe a disco: la descarga se hace desde la
+ruta /blink_invoice_layout/debug_capture del worker que hizo la captura.
+"""
+import itertools
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+Capture = namedtuple('Capture', [
+    'key',          # '<pid>-<secuencia>', identifica la captura dentro del worker
+    'timestamp',
+    'report_name',
+    'res_ids',
+    'size',         # tamaño original en bytes (antes de truncar)
+    'truncated',
+    'content',      # bytes
+])
+
+_lock = threading.Lock()
+_buffers = {}  # dbname -> deque de Capture
+_sequence = itertools.count(1)
+
+
+def add_capture(dbname, report_name, res_ids, content, ring_size, max_bytes):
+    """Agrega una captura al ring buffer de ``dbname`` y la devuelve."""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    size = len(content)
+    truncated = size > max_bytes
+    if truncated:
+        content = content[:max_bytes]
+
+    capture = Capture(
+        key=f'{os.getpid()}-{next(_sequence)}',
+        timestamp=time.time(),
+        report_name=report_name,
+        res_ids=tuple(res_ids or ()),
+        size=size,
+        truncated=truncated,
+        content=content,
+    )
+    with _lock:
+        buffer = _buffers.get(dbname)
+        if buffer is None or buffer.maxlen != ring_size:
+            buffer = _buffers[dbname] = deque(buffer or (), maxlen=ring_size)
+        buffer.append(capture)
+    return capture
+
+
+def list_captures(dbname):
+    """Capturas de ``dbname`` en este worker, de la más reciente a la más antigua."""
+    with _lock:
+        return list(reversed(_buffers.get(dbname, ())))
+
+
+def get_capture(dbname, key):
+    """Devuelve la captura ``key`` de ``dbname`` o None si no está en este worker."""
+    with _lock:
+        for capture in _buffers.get(dbname, ()):
+            if capture.key == key:
+                return capture
+    return None
+
+
+def clear_captures(dbname):
+    with _lock:
+        _buffers.pop(dbname, None)
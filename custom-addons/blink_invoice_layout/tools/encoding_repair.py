@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Detección y reparación de texto UTF-8 doblemente codificado ("mojibake").
+
+Un carácter como 'ó' guardado como UTF-8 (bytes C3 B3) y luego leído como
+latin-1 o cp1252 queda como 'Ã³'. Solo se reparan los pares que produce un
+carácter de Latin-1 (U+00A0-U+00FF, donde están las letras acentuadas, ñ,
+¿, ¡, º, ª y el espacio duro): 'Â' seguido de A0-BF o 'Ã' seguido de 80-BF,
+con el segundo carácter leído como latin-1 o cp1252. Texto correcto como
+'PERÚ\\xa0S.A.' o 'CAFÉ¡hola!' no contiene esos pares y queda intacto. El
+mismo patrón sirve como regex de Python y de PostgreSQL (``~``), así la
+detección se hace en la base sin traer filas.
+"""
+import re
+
+
+def _continuation_chars(first, last):
+    """Caracteres que representan los bytes ``first``-``last`` leídos como latin-1 o cp1252."""
+    chars = set()
+    for byte in range(first, last + 1):
+        chars.add(chr(byte))
+        try:
+            chars.add(bytes([byte]).decode('cp1252'))
+        except UnicodeDecodeError:
+            pass
+    return ''.join(sorted(chars))
+
+
+# 'Â' + A0-BF -> U+00A0-U+00BF; 'Ã' + 80-BF -> U+00C0-U+00FF
+DOUBLE_ENCODED_PATTERN = (
+    f'Â[{_continuation_chars(0xa0, 0xbf)}]'
+    f'|Ã[{_continuation_chars(0x80, 0xbf)}]'
+)
+_DOUBLE_ENCODED_RE = re.compile(DOUBLE_ENCODED_PATTERN)
+
+
+def has_double_encoding(text):
+    """True si ``text`` contiene al menos una secuencia doblemente codificada."""
+    return bool(text) and _DOUBLE_ENCODED_RE.search(text) is not None
+
+
+def _to_byte(char):
+    return char.encode('latin-1') if ord(char) < 256 else char.encode('cp1252')
+
+
+def _fix_sequence(match):
+    sequence = match.group()
+    try:
+        fixed = b''.join(_to_byte(char) for char in sequence).decode('utf-8')
+    except UnicodeError:
+        return sequence
+    # Solo cuenta como mojibake si vuelve a un carácter de Latin-1
+    return fixed if len(fixed) == 1 and '\xa0' <= fixed <= '\xff' else sequence
+
+
+def repair_text(text):
+    """Devuelve (texto reparado, cantidad de secuencias reparadas)."""
+    if not text:
+        return text, 0
+    count = 0
+
+    def fix(match):
+        nonlocal count
+        fixed = _fix_sequence(match)
+        count += fixed != match.group()
+        return fixed
+
+    return _DOUBLE_ENCODED_RE.sub(fix, text), count
+
+
+def sample(text, width=30):
+    """Fragmento alrededor de la primera secuencia doblemente codificada, para el reporte."""
+    match = _DOUBLE_ENCODED_RE.search(text or '')
+    if not match:
+        return ''
+    return text[max(match.start() - width, 0):match.end() + width]
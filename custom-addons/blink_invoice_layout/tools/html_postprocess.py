@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline de post-procesamiento del HTML de facturas antes de wkhtmltopdf.
+
+Cada etapa recibe el HTML como str y devuelve el HTML transformado. Las etapas
+se registran con ``register_stage`` y se ejecutan en orden de secuencia; la
+codificación final a entidades numéricas la hace ``postprocess_html`` en una
+sola pasada del codec ASCII (``xmlcharrefreplace``), sin concatenar caracteres
+uno por uno.
+"""
+import re
+from operator import itemgetter
+
+# Secuencias UTF-8 leídas como latin-1 (doble codificación) -> carácter correcto
+MOJIBAKE_MAP = {
+    # Vocales con tilde minúsculas
+    '\xc3\xb3': '\xf3',  # ó
+    '\xc3\xa1': '\xe1',  # á
+    '\xc3\xa9': '\xe9',  # é
+    '\xc3\xad': '\xed',  # í
+    '\xc3\xba': '\xfa',  # ú
+    '\xc3\xb1': '\xf1',  # ñ
+    # Vocales con tilde mayúsculas
+    '\xc3\x93': '\xd3',  # Ó
+    '\xc3\x81': '\xc1',  # Á
+    '\xc3\x89': '\xc9',  # É
+    '\xc3\x8d': '\xcd',  # Í
+    '\xc3\x9a': '\xda',  # Ú
+    '\xc3\x91': '\xd1',  # Ñ
+    # Prefijo huérfano de la doble codificación (ej. '\xc2\xa0')
+    '\xc2': '',
+}
+
+_MOJIBAKE_RE = re.compile(
+    '|'.join(re.escape(seq) for seq in sorted(MOJIBAKE_MAP, key=len, reverse=True))
+)
+_HEAD_END_RE = re.compile(r'</head\s*>|<body[\s>]', re.IGNORECASE)
+_META_CHARSET_RE = re.compile(r'<meta\s+charset=["\']?[^"\'>]+["\']?\s*/?>', re.IGNORECASE)
+_HTML_TAG_RE = re.compile(r'<html([^>]*)>', re.IGNORECASE)
+
+_META_UTF8 = (
+    '<head>\n    <meta charset="UTF-8">\n'
+    '    <meta http-equiv="Content-Type" content="text/html; charset=utf-8">'
+)
+
+# Registro de etapas: lista de (secuencia, nombre, función) ordenada por secuencia
+_STAGES = []
+
+
+def register_stage(sequence):
+    """Registra una función ``str -> str`` como etapa del pipeline."""
+    def decorator(func):
+        _STAGES.append((sequence, func.__name__, func))
+        _STAGES.sort(key=itemgetter(0))
+        return func
+    return decorator
+
+
+def get_stages():
+    """Devuelve las etapas registradas como tuplas (secuencia, nombre, función)."""
+    return list(_STAGES)
+
+
+def _replace_mojibake(match):
+    return MOJIBAKE_MAP[match.group()]
+
+
+@register_stage(10)
+def repair_mojibake(html):
+    """
+    Corrige la doble codificación UTF-8 en una sola pasada de regex. La
+    guarda (búsqueda de los lead bytes, en C) evita la regex en documentos
+    limpios; con los datos reparados (ver encoding_repair) la etapa se puede
+    deshabilitar con el parámetro blink_invoice_layout.render_mojibake_repair.
+    """
+    if '\xc3' not in html and '\xc2' not in html:
+        return html
+    return _MOJIBAKE_RE.sub(_replace_mojibake, html)
+
+
+@register_stage(20)
+def ensure_utf8_head(html):
+    """
+    Fuerza charset UTF-8 y atributo lang. Solo opera sobre el prefijo hasta
+    el fin del <head>, no sobre el documento completo.
+    """
+    match = _HEAD_END_RE.search(html)
+    head_end = match.start() if match else len(html)
+    head, body = html[:head_end], html[head_end:]
+
+    if '<meta charset' not in head.lower():
+        head = head.replace('<head>', _META_UTF8, 1)
+    else:
+        head = _META_CHARSET_RE.sub('<meta charset="UTF-8">', head, count=1)
+
+    if '<html' in head and 'lang=' not in head[:500]:
+        head = _HTML_TAG_RE.sub(r'<html\1 lang="es" xml:lang="es">', head, count=1)
+
+    return head + body
+
+
+def decode_html(content):
+    """Decodifica bytes a str: UTF-8 y, si falla, latin-1 (nunca falla)."""
+    try:
+        return content.decode('utf-8')
+    except UnicodeDecodeError:
+        return content.decode('latin-1')
+
+
+def postprocess_html(content, skip=()):
+    """
+    Ejecuta las etapas registradas (salvo las de nombre en ``skip``) y
+    convierte los caracteres no ASCII a entidades numéricas (wkhtmltopdf no
+    respeta UTF-8, sí las entidades).
+
+    Devuelve bytes ASCII si ``content`` era bytes, o str en caso contrario.
+    """
+    was_bytes = isinstance(content, bytes)
+    html = decode_html(content) if was_bytes else str(content)
+    for _sequence, name, stage in _STAGES:
+        if name not in skip:
+            html = stage(html)
+    encoded = html.encode('ascii', errors='xmlcharrefreplace')
+    return encoded if was_bytes else encoded.decode('ascii')
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de PDFs en el filestore, direccionado por contenido.
+
+Cada PDF se guarda como ``<filestore>/blink_pdf_cache/<ab>/<sha256>.pdf``
+donde el sha256 es el hash de la clave de render (ver
+IrActionsReport._blink_pdf_cache_key). Como la clave incluye todo lo que
+afecta al PDF, nunca hay que invalidar entradas: las obsoletas dejan de
+pedirse y las elimina el LRU por tamaño (mtime = último acceso).
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+CACHE_DIRNAME = 'blink_pdf_cache'
+
+_evict_lock = threading.Lock()
+_last_eviction = {}  # cache_dir -> time.monotonic()
+
+
+def make_key(*parts):
+    """Hash sha256 de las partes de la clave, separadas por NUL."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], key + '.pdf')
+
+
+def get(cache_dir, key):
+    """Devuelve los bytes del PDF cacheado o None. Un hit actualiza el mtime (LRU)."""
+    path = _path(cache_dir, key)
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+    except OSError:
+        _logger.warning("No se pudo leer el PDF cacheado %s", path, exc_info=True)
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return content
+
+
+def put(cache_dir, key, content):
+    """
+    Escribe el PDF de forma atómica (archivo temporal + rename), así dos
+    workers que renderizan la misma factura no dejan un archivo a medias.
+    """
+    path = _path(cache_dir, key)
+    directory = os.path.dirname(path)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError:
+        _logger.warning("No se pudo guardar el PDF en cache %s", path, exc_info=True)
+
+
+def evict(cache_dir, max_bytes, interval=600):
+    """
+    Elimina los PDFs menos usados hasta quedar por debajo de ``max_bytes``.
+    Recorre el directorio a lo sumo una vez cada ``interval`` segundos por worker.
+    """
+    now = time.monotonic()
+    with _evict_lock:
+        last = _last_eviction.get(cache_dir)
+        if last is not None and now - last < interval:
+            return 0
+        _last_eviction[cache_dir] = now
+
+    entries = []
+    total = 0
+    for root, _dirs, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    entries.sort()
+    for _mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    _logger.info("Cache de PDFs: %d archivos eliminados por LRU en %s", removed, cache_dir)
+    return removed
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Histogramas en memoria de los tiempos de render de reportes, por worker.
+
+Cada muestra se acumula en un histograma de buckets fijos (en milisegundos)
+identificado por (report_name, company_id, stage). Registrar una muestra es
+O(log buckets) y no arma strings; los histogramas se vuelcan periódicamente
+al modelo blink.report.render.metric con ``drain``.
+"""
+import bisect
+import threading
+import time
+
+# Límites superiores de los buckets en ms; el último bucket es "> 60000"
+BUCKET_BOUNDS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+BUCKET_COUNT = len(BUCKET_BOUNDS_MS) + 1
+
+STAGES = ('qweb', 'postprocess', 'wkhtmltopdf', 'pdf_merge', 'total')
+
+_lock = threading.Lock()
+_histograms = {}   # dbname -> {(report_name, company_id, stage): Histogram}
+_last_flush = {}   # dbname -> time.monotonic() del último volcado
+_local = threading.local()
+
+
+class Histogram:
+    __slots__ = ('buckets', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.buckets = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms):
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+
+def percentile(buckets, fraction, max_ms=None):
+    """
+    Estima el percentil ``fraction`` (0-1) a partir de conteos por bucket,
+    interpolando linealmente dentro del bucket que lo contiene.
+    """
+    count = sum(buckets)
+    if not count:
+        return 0.0
+    rank = fraction * count
+    seen = 0
+    for index, bucket_count in enumerate(buckets):
+        if bucket_count and seen + bucket_count >= rank:
+            lower = BUCKET_BOUNDS_MS[index - 1] if index else 0.0
+            if index < len(BUCKET_BOUNDS_MS):
+                upper = BUCKET_BOUNDS_MS[index]
+            else:
+                upper = max(max_ms or lower, lower)
+            return lower + (upper - lower) * (rank - seen) / bucket_count
+        seen += bucket_count
+    return float(max_ms or BUCKET_BOUNDS_MS[-1])
+
+
+def record(dbname, report_name, company_id, stage, elapsed):
+    """Registra una duración ``elapsed`` (segundos) para la etapa ``stage``."""
+    key = (report_name, company_id, stage)
+    with _lock:
+        histograms = _histograms.setdefault(dbname, {})
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        histogram.add(elapsed * 1000.0)
+
+
+def should_flush(dbname, interval):
+    """True si pasaron ``interval`` segundos desde el último volcado de ``dbname``."""
+    now = time.monotonic()
+    with _lock:
+        last = _last_flush.setdefault(dbname, now)
+        return now - last >= interval and bool(_histograms.get(dbname))
+
+
+def drain(dbname):
+    """Devuelve y resetea los histogramas acumulados de ``dbname``."""
+    with _lock:
+        _last_flush[dbname] = time.monotonic()
+        return _histograms.pop(dbname, {})
+
+
+def restore(dbname, histograms):
+    """Reincorpora histogramas que no se pudieron volcar."""
+    with _lock:
+        current = _histograms.setdefault(dbname, {})
+        for key, histogram in histograms.items():
+            target = current.get(key)
+            if target is None:
+                current[key] = histogram
+                continue
+            target.buckets = [a + b for a, b in zip(target.buckets, histogram.buckets)]
+            target.count += histogram.count
+            target.total_ms += histogram.total_ms
+            target.max_ms = max(target.max_ms, histogram.max_ms)
+
+
+def set_prepare_elapsed(elapsed):
+    _local.prepare_elapsed = elapsed
+
+
+def pop_prepare_elapsed():
+    """Tiempo de _render_qweb_pdf_prepare_streams del render en curso (en este thread)."""
+    elapsed = getattr(_local, 'prepare_elapsed', 0.0)
+    _local.prepare_elapsed = 0.0
+    return elapsed
@@ -39,3 +39,8 @@ class AccountMove(models.Model):
         'doc.layout',
         related='company_id.document_layout_id', string="Theme",
         help="The relational field for document layout")
+
+    def _get_layout_profile(self):
+        """Compiled layout profile of the invoice company"""
+        self.ensure_one()
+        return self.theme_id._get_layout_profile()
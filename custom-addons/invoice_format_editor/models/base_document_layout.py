@@ -19,7 +19,31 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
+import hashlib
+import logging
 from odoo import api, models, fields
+from ..tools.lru import LRUCache
+
+_logger = logging.getLogger(__name__)
+
+# Rendered previews shared by all the wizards of a worker
+PREVIEW_CACHE = LRUCache(max_entries=64)
+# Compiled report styles per (styles version, font, colors, layout); the
+# company/wizard id in the selectors is replaced by a placeholder
+PREVIEW_CSS_CACHE = LRUCache(max_entries=128)
+PREVIEW_CSS_ID_PLACEHOLDER = 'o_company___preview__layout'
+
+PREVIEW_TEMPLATES = {
+    'default': 'web.report_invoice_wizard_preview',
+    'normal': 'invoice_format_editor.report_preview_normal',
+    'modern': 'invoice_format_editor.report_preview_modern',
+    'old': 'invoice_format_editor.report_preview_old',
+}
+
+
+def is_html_empty(value):
+    """Helper made available to the preview templates"""
+    return not bool(value)
 
 
 class BaseDocumentLayout(models.TransientModel):
@@ -35,46 +59,111 @@ class BaseDocumentLayout(models.TransientModel):
         related='company_id.document_layout_id', readonly=False,
         help="custom document layouts")
 
+    def _get_preview_cache_key(self, templates_version):
+        """Hash of every value the preview depends on"""
+        self.ensure_one()
+        layout = self.document_layout_id
+        values = (
+            self.env.cr.dbname,
+            self.env.lang,
+            templates_version,
+            self.base_layout,
+            self.report_layout_id.id,
+            layout.id,
+            layout.write_date,
+            self.company_id.id,
+            self.company_id.write_date,
+            self.primary_color,
+            self.secondary_color,
+            self.font,
+            hashlib.sha1(self.logo or b'').hexdigest(),
+            self.report_header,
+            self.report_footer,
+            self.company_details,
+            self.layout_background,
+        )
+        return hashlib.sha1(repr(values).encode()).hexdigest()
+
+    def _register_hook(self):
+        """Compile the preview styles of every company when the worker
+        loads the registry (start and module updates)"""
+        super()._register_hook()
+        try:
+            # A failed query must not abort the registry-loading transaction
+            with self.env.cr.savepoint():
+                self._warm_preview_css()
+        except Exception as e:
+            _logger.warning("Could not warm the preview styles: %s", e)
+
+    @api.model
+    def _warm_preview_css(self):
+        for company in self.env['res.company'].sudo().search([]):
+            self._get_preview_css(company)
+
+    @api.model
+    def _get_preview_css_key(self, record):
+        template_style = self.env.ref('web.styles_company_report',
+                                      raise_if_not_found=False)
+        return (
+            self.env.cr.dbname,
+            template_style.write_date if template_style else None,
+            record.font,
+            record.primary_color,
+            record.secondary_color,
+            record.external_report_layout_id.key,
+        )
+
+    @api.model
+    def _get_preview_css(self, record):
+        """Compiled report styles for the values of record (a wizard or a
+        company), compiling the SCSS only the first time"""
+        key = self._get_preview_css_key(record)
+        selector = f'o_company_{record.id}_layout'
+        css = PREVIEW_CSS_CACHE.get(key)
+        if css is None:
+            template_style = self.env.ref('web.styles_company_report',
+                                          raise_if_not_found=False)
+            if not template_style:
+                return ''
+            styles = self.env['ir.qweb']._render(
+                template_style.id, {'company_ids': record},
+                raise_if_not_found=False)
+            css = str(self._get_css_for_preview(styles, record.id) or '')
+            css = css.replace(selector, PREVIEW_CSS_ID_PLACEHOLDER)
+            PREVIEW_CSS_CACHE.put(key, css)
+        return css.replace(PREVIEW_CSS_ID_PLACEHOLDER, selector)
+
     @api.depends('report_layout_id', 'logo', 'font', 'primary_color',
                  'secondary_color', 'report_header', 'report_footer',
                  'base_layout', 'document_layout_id')
     def _compute_preview(self):
-        """Compute a qweb based preview to display on the wizard"""
-        styles = self._get_asset_style()
+        """Compute a qweb based preview to display on the wizard, reusing
+        the previews already rendered for the same values"""
+        self.env.cr.execute(
+            "SELECT max(write_date) FROM ir_ui_view WHERE type = 'qweb'")
+        templates_version = self.env.cr.fetchone()[0]
         for wizard in self:
-            if wizard.report_layout_id:
-                preview_css = self._get_css_for_preview(styles, wizard.id)
-                ir_ui_view = wizard.env['ir.ui.view']
-
-                # Define helper functions and context variables
-                def is_html_empty(value):
-                    return not bool(value)
-
+            template = PREVIEW_TEMPLATES.get(wizard.base_layout)
+            if not wizard.report_layout_id or not template:
+                wizard.preview = False
+                continue
+            key = wizard._get_preview_cache_key(templates_version)
+            preview = PREVIEW_CACHE.get(key)
+            if preview is None:
                 values = {
                     'company': wizard,
-                    'preview_css': preview_css,
-                    'is_html_empty': is_html_empty
+                    'preview_css': self._get_preview_css(wizard),
+                    'is_html_empty': is_html_empty,
                 }
                 try:
-                    if wizard.base_layout == 'default':
-                        wizard.preview = ir_ui_view._render_template(
-                            'web.report_invoice_wizard_preview', values)
-                    elif wizard.base_layout == 'normal':
-                        wizard.preview = ir_ui_view._render_template(
-                            'invoice_format_editor.report_preview_normal', values)
-                    elif wizard.base_layout == 'modern':
-                        wizard.preview = ir_ui_view._render_template(
-                            'invoice_format_editor.report_preview_modern', values)
-                    elif wizard.base_layout == 'old':
-                        wizard.preview = ir_ui_view._render_template(
-                            'invoice_format_editor.report_preview_old', values)
-                    else:
-                        wizard.preview = False
+                    preview = wizard.env['ir.ui.view']._render_template(
+                        template, values)
                 except Exception as e:
-                    print(f"Error rendering preview: {str(e)}")
-                    wizard.preview = False
-            else:
-                wizard.preview = False
+                    _logger.warning("Error rendering preview: %s", e)
+                    preview = False
+                else:
+                    PREVIEW_CACHE.put(key, preview)
+            wizard.preview = preview
 
     @api.onchange('paperformat_id')
     def _onchange_paperformat_id(self):
@@ -19,7 +19,35 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import models, fields
+from collections import namedtuple
+from markupsafe import Markup
+from odoo import api, models, fields, tools
+from ..tools.layout_css import build_layout_css
+
+# Fields written into the generated stylesheet of a layout; the company color
+# stays inline, the page header is rendered apart from the invoice body
+CSS_COLOR_FIELDS = ('base_color', 'heading_text_color', 'text_color',
+                    'customer_text_color')
+
+# Compact, immutable view of a doc.layout for the report templates: colors,
+# ready-made position classes and column visibility flags
+LayoutProfile = namedtuple('LayoutProfile', [
+    'id', 'base_color', 'heading_text_color', 'text_color',
+    'customer_text_color', 'company_text_color',
+    'logo_class', 'tagline_class', 'customer_class', 'company_class',
+    'sales_person', 'description', 'tax_value', 'reference', 'source',
+    'address', 'city', 'country', 'vat', 'css',
+])
+
+EMPTY_LAYOUT_PROFILE = LayoutProfile(
+    id=False, base_color=False, heading_text_color=False, text_color=False,
+    customer_text_color=False, company_text_color=False,
+    logo_class='d-flex justify-content-start',
+    tagline_class='d-flex justify-content-start',
+    customer_class='', company_class='',
+    sales_person=False, description=False, tax_value=False, reference=False,
+    source=False, address=False, city=False, country=False, vat=False,
+    css=False)
 
 
 class AddDocumentTemplate(models.Model):
@@ -73,3 +101,58 @@ class AddDocumentTemplate(models.Model):
                              help="Country of the document layout")
     vat = fields.Boolean(string='VAT', default=True,
                          help='Customer vat id')
+
+    def _get_layout_profile(self):
+        """Layout profile of this layout (an empty profile if there is none),
+        built once per worker and rebuilt after a write"""
+        if not self:
+            return EMPTY_LAYOUT_PROFILE
+        self.ensure_one()
+        return self._compile_layout_profile(self.id)
+
+    @api.model
+    @tools.ormcache('layout_id')
+    def _compile_layout_profile(self, layout_id):
+        layout = self.browse(layout_id).sudo()
+
+        def position_class(position, left_class=''):
+            return 'ms-auto' if position == 'right' else left_class
+
+        return LayoutProfile(
+            id=layout.id,
+            base_color=layout.base_color,
+            heading_text_color=layout.heading_text_color,
+            text_color=layout.text_color,
+            customer_text_color=layout.customer_text_color,
+            company_text_color=layout.company_text_color,
+            logo_class=position_class(layout.logo_position,
+                                      'd-flex justify-content-start'),
+            tagline_class=position_class(layout.tagline_position,
+                                         'd-flex justify-content-start'),
+            customer_class=position_class(layout.customer_position),
+            company_class=position_class(layout.company_position),
+            sales_person=layout.sales_person,
+            description=layout.description,
+            tax_value=layout.tax_value,
+            reference=layout.reference,
+            source=layout.source,
+            address=layout.address,
+            city=layout.city,
+            country=layout.country,
+            vat=layout.vat,
+            # Inlined by the templates: wkhtmltopdf does not fetch it over
+            # HTTP. Colors are filtered by build_layout_css, hence Markup
+            css=Markup(build_layout_css(
+                layout.id, {name: layout[name] for name in CSS_COLOR_FIELDS})),
+        )
+
+    def write(self, vals):
+        """Drop the compiled layout profiles (and their stylesheets)"""
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2023-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU AFFERO
+#    GENERAL PUBLIC LICENSE (AGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU AFFERO GENERAL PUBLIC LICENSE (AGPL v3) for more details.
+#
+#    You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+#    (AGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+"""Stylesheet generated from the colors of a document layout"""
+import re
+
+# Colors are free text on doc.layout; only plain CSS color values are emitted
+COLOR_RE = re.compile(r'^#?[\w(),.%\s-]+$')
+
+# Class used in the invoice templates -> CSS declarations, with the doc.layout
+# color field each one takes its value from
+LAYOUT_CLASSES = {
+    'o_ife_text': [('color', 'text_color')],
+    'o_ife_heading': [('color', 'heading_text_color')],
+    'o_ife_customer': [('color', 'customer_text_color')],
+    'o_ife_band': [('background-color', 'base_color'),
+                   ('color', 'heading_text_color')],
+    'o_ife_customer_band': [('background-color', 'base_color'),
+                            ('color', 'customer_text_color')],
+}
+
+
+def build_layout_css(layout_id, colors):
+    """Stylesheet of a document layout, scoped to its o_ife_layout_<id>
+    wrapper so invoices of several companies can share one PDF"""
+    rules = []
+    for css_class, declarations in LAYOUT_CLASSES.items():
+        body = ' '.join(
+            f'{prop}: {colors[field].strip()} !important;'
+            for prop, field in declarations
+            if colors.get(field) and COLOR_RE.match(colors[field].strip()))
+        if body:
+            rules.append(f'.o_ife_layout_{layout_id} .{css_class} {{ {body} }}')
+    return '\n'.join(rules) + '\n'
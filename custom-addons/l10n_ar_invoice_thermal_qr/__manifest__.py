@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Argentina - Facturas Térmicas con QR AFIP',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.2.0',
     'category': 'Accounting/Localizations/Reporting',
     'summary': 'Agrega reporte térmico 80mm y código QR AFIP a facturas electrónicas',
     'description': """
@@ -29,9 +29,20 @@
         'python': ['qrcode', 'PIL'],
     },
     'data': [
+        'security/ir.model.access.csv',
+        'security/invoice_export_security.xml',
         'report/paperformat.xml',
         'data/report_data.xml',
+        'data/afip_qr_data.xml',
+        'views/afip_qr_templates.xml',
         'report/invoice_thermal_report.xml',
+        'data/invoice_export_data.xml',
+        'views/invoice_export_job_views.xml',
+        'data/invoice_pdf_prerender_data.xml',
+        'views/invoice_pdf_prerender_views.xml',
+        'data/escpos_data.xml',
+        'data/pos_invoice_job_data.xml',
+        'views/pos_invoice_job_views.xml',
     ],
     'assets': {
         'web.report_assets_common': [
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Comando ``odoo-bin l10n_ar_afip_qr_recompute``: calcula por lotes el
+payload del QR AFIP de las facturas existentes. Se puede interrumpir y
+volver a ejecutar; sigue por las facturas que quedaron sin payload.
+
+    odoo-bin l10n_ar_afip_qr_recompute -c odoo.conf -d base --batch-size 2000
+"""
+import argparse
+import sys
+import time
+
+import odoo
+from odoo.cli import Command
+from odoo.tools import config
+
+
+class AfipQrRecompute(Command):
+    """Calcula por lotes el payload del QR AFIP de facturas existentes"""
+    name = 'l10n_ar_afip_qr_recompute'
+
+    def run(self, cmdargs):
+        parser = argparse.ArgumentParser(
+            prog=f'{sys.argv[0].split("/")[-1]} {self.name}',
+            description=self.__doc__.strip(),
+        )
+        parser.add_argument('-d', '--database', dest='db_name', required=True)
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='facturas por transacción')
+        args, odoo_args = parser.parse_known_args(cmdargs)
+        config.parse_config(odoo_args + ['-d', args.db_name])
+
+        registry = odoo.modules.registry.Registry(args.db_name)
+        start = time.monotonic()
+        with registry.cursor() as cr:
+            env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+            done, errors = env['account.move']._recompute_afip_qr_payload_batched(
+                batch_size=max(args.batch_size, 1))
+        elapsed = time.monotonic() - start
+        print(f"{done} facturas en {elapsed:.1f} s ({done / elapsed if elapsed else 0:.0f} facturas/s), "
+              f"{errors} con error")
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from odoo import http
+from odoo.http import request
+
+
+class EscPosController(http.Controller):
+
+    @http.route('/l10n_ar_invoice_thermal_qr/escpos', type='http', auth='user')
+    def invoice_escpos(self, ids='', layout='thermal', **kwargs):
+        """Bytes ESC/POS de las facturas ``ids`` (separadas por coma), para enviar crudos a la impresora."""
+        if layout not in ('thermal', 'ticket'):
+            return request.not_found()
+        try:
+            move_ids = [int(move_id) for move_id in ids.split(',') if move_id]
+        except ValueError:
+            return request.not_found()
+        moves = request.env['account.move'].browse(move_ids).exists()
+        if not moves:
+            return request.not_found()
+        moves.check_access('read')
+
+        content = moves._get_escpos(layout)
+        return request.make_response(content, headers=[
+            ('Content-Type', 'application/octet-stream'),
+            ('Content-Length', len(content)),
+            ('Content-Disposition', f'attachment; filename="{layout}_{moves[0].id}.bin"'),
+        ])
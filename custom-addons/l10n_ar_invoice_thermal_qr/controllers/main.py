@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import os
+
+from odoo import http
+from odoo.http import request
+
+
+class InvoiceExportController(http.Controller):
+
+    @http.route('/l10n_ar_invoice_thermal_qr/invoice_export/<int:job_id>', type='http', auth='user')
+    def invoice_export_download(self, job_id, **kwargs):
+        """Descarga el ZIP de una exportación terminada, leyéndolo desde disco."""
+        job = request.env['l10n_ar.invoice.export.job'].browse(job_id).exists()
+        if not job:
+            return request.not_found()
+        job.check_access('read')
+        path = job._get_zip_path()
+        if job.state != 'done' or not os.path.exists(path):
+            return request.not_found()
+
+        stream = http.Stream(
+            type='path',
+            path=path,
+            mimetype='application/zip',
+            download_name=f'facturas_{job.id}.zip',
+            size=os.path.getsize(path),
+            etag=False,
+        )
+        return stream.get_response(as_attachment=True)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from odoo import http
+from odoo.http import request
+from odoo.tools import consteq
+
+from ..tools import afip_qr
+
+# El token de la URL depende del payload: una URL siempre devuelve la misma imagen
+QR_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+QR_SIZE_MM_RANGE = (10, 100)
+QR_DPI_RANGE = (72, 600)
+
+
+class AfipQrController(http.Controller):
+
+    @http.route('/l10n_ar_invoice_thermal_qr/qr/<int:move_id>/<string:token>.<any(svg,png):image_format>',
+                type='http', auth='public', methods=['GET'])
+    def afip_qr_image(self, move_id, token, image_format, size_mm='30', dpi='90', **kwargs):
+        """
+        Imagen del QR AFIP de una factura. El token (HMAC del payload) hace
+        de permiso de acceso, como el access_token del portal, y la respuesta
+        se puede cachear indefinidamente en el navegador o en nginx.
+        """
+        try:
+            size_mm = min(max(int(size_mm), QR_SIZE_MM_RANGE[0]), QR_SIZE_MM_RANGE[1])
+            dpi = min(max(int(dpi), QR_DPI_RANGE[0]), QR_DPI_RANGE[1])
+        except ValueError:
+            return request.not_found()
+
+        move = request.env['account.move'].sudo().browse(move_id).exists()
+        payload = move and move._get_afip_qr_payload()
+        if not payload or not consteq(move._get_afip_qr_token(), token):
+            return request.not_found()
+
+        etag = f'{afip_qr.payload_hash(payload)[:32]}-{image_format}-{size_mm}-{dpi}'
+        headers = [('Cache-Control', QR_CACHE_CONTROL), ('ETag', f'"{etag}"')]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+
+        mimetype, content = afip_qr.render_cached(payload, image_format, size_mm, dpi)
+        return request.make_response(content, headers=headers + [
+            ('Content-Type', mimetype),
+            ('Content-Length', len(content)),
+        ])
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+afip_qr_code deja de guardarse: solo queda el payload (afip_qr_payload) y
+la imagen se genera al imprimir. Borra las imágenes PNG guardadas,
+registra el espacio liberado y dispara el cron que calcula por lotes el
+payload de las facturas existentes (mientras tanto se calcula al imprimir).
+"""
+import logging
+
+from odoo import api, SUPERUSER_ID
+from odoo.tools.sql import column_exists
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+
+    # Binary con attachment=True: una fila de ir_attachment y un archivo por factura
+    cr.execute("""
+        DELETE FROM ir_attachment
+         WHERE res_model = 'account.move' AND res_field = 'afip_qr_code'
+     RETURNING store_fname, file_size
+    """)
+    rows = cr.fetchall()
+    Attachment = env['ir.attachment']
+    for store_fname, _file_size in rows:
+        if store_fname:
+            # Los archivos los borra el GC del filestore
+            Attachment._file_delete(store_fname)
+    freed = sum(file_size or 0 for _store_fname, file_size in rows)
+
+    # Por si el campo se guardó como columna (attachment=False)
+    if column_exists(cr, 'account_move', 'afip_qr_code'):
+        cr.execute("SELECT coalesce(sum(octet_length(afip_qr_code::text)), 0) FROM account_move")
+        freed += cr.fetchone()[0]
+        cr.execute("ALTER TABLE account_move DROP COLUMN afip_qr_code")
+
+    cr.execute("""
+        SELECT count(*), coalesce(avg(octet_length(afip_qr_payload)), 0)
+          FROM account_move
+         WHERE afip_qr_payload IS NOT NULL
+    """)
+    payload_count, payload_avg = cr.fetchone()
+    _logger.info(
+        "QR AFIP: %d imágenes borradas (%.1f MB liberados); %d facturas con payload "
+        "(%.0f bytes en promedio)",
+        len(rows), freed / 1024 / 1024, payload_count, payload_avg,
+    )
+    env.ref('l10n_ar_invoice_thermal_qr.ir_cron_afip_qr_payload_recompute')._trigger()
+    _logger.info("QR AFIP: el payload de las facturas existentes se calcula en segundo plano "
+                 "(cron 'Payload QR AFIP de facturas existentes', o odoo-bin l10n_ar_afip_qr_recompute)")
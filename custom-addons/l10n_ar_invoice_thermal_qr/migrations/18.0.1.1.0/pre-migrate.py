@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Crea la columna afip_qr_payload antes de cargar el modelo: el ORM no
+recalcula un campo almacenado cuya columna ya existe, así la actualización
+no calcula el payload de todo el historial en una sola transacción. Ese
+cálculo lo hace después, por lotes, el cron que dispara post-migrate.
+"""
+from odoo.tools.sql import column_exists, create_column
+
+
+def migrate(cr, version):
+    if not column_exists(cr, 'account_move', 'afip_qr_payload'):
+        create_column(cr, 'account_move', 'afip_qr_payload', 'varchar')
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Crea y completa is_pos_origin con una sola consulta antes de cargar el
+modelo, en lugar de que el ORM lo recalcule factura por factura.
+"""
+from odoo.tools.sql import column_exists, create_column, create_index
+
+
+def migrate(cr, version):
+    if column_exists(cr, 'account_move', 'is_pos_origin'):
+        return
+    create_column(cr, 'account_move', 'is_pos_origin', 'boolean')
+    # NULL se lee como False: solo se marcan las facturas con pedido del POS
+    cr.execute("""
+        UPDATE account_move
+           SET is_pos_origin = TRUE
+         WHERE id IN (SELECT account_move FROM pos_order WHERE account_move IS NOT NULL)
+    """)
+    create_index(cr, 'account_move__is_pos_origin_index', 'account_move', ['is_pos_origin'])
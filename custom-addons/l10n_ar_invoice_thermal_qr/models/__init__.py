@@ -1,3 +1,8 @@
 # -*- coding: utf-8 -*-
 from . import account_move
+from . import account_move_send
+from . import invoice_export_job
+from . import invoice_pdf_prerender
+from . import ir_actions_report
+from . import pos_invoice_job
 from . import pos_order
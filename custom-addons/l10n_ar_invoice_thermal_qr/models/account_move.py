@@ -1,110 +1,307 @@
 # -*- coding: utf-8 -*-
-import json
 import base64
-import io
-import qrcode
+import time
 from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.misc import hmac
 import logging
 
+from ..tools import afip_qr, escpos
+
 _logger = logging.getLogger(__name__)
 
+# Formato de la imagen del QR en los reportes: 'svg' (default) o 'png' (1 bit)
+QR_IMAGE_FORMAT_PARAM = 'l10n_ar_invoice_thermal_qr.qr_image_format'
+# Lado del QR impreso y resolución cuando no se indica un paperformat
+DEFAULT_QR_SIZE_MM = 30
+DEFAULT_QR_DPI = 90
+QR_URL_HMAC_SCOPE = 'l10n_ar_invoice_thermal_qr.afip_qr'
+QR_RECOMPUTE_CRON_XMLID = 'l10n_ar_invoice_thermal_qr.ir_cron_afip_qr_payload_recompute'
+# Segundos de trabajo por ejecución del cron de payloads, por debajo de limit_time_real
+QR_RECOMPUTE_TIME_BUDGET = 600
+# Salida de las impresiones térmicas: 'pdf' (default) o 'escpos' (bytes para la impresora)
+THERMAL_OUTPUT_PARAM = 'l10n_ar_invoice_thermal_qr.thermal_output'
+ESCPOS_QR_MODULE_SIZE_PARAM = 'l10n_ar_invoice_thermal_qr.escpos_qr_module_size'
+# Campos que lee _get_afip_qr_data, para precargarlos por lote
+QR_DATA_FIELDS = {
+    'account.move': ['invoice_date', 'company_id', 'journal_id', 'l10n_latam_document_type_id', 'name',
+                     'amount_total', 'currency_id', 'l10n_ar_currency_rate', 'afip_auth_mode',
+                     'afip_auth_code', 'partner_id'],
+    'res.company': ['vat'],
+    'account.journal': ['l10n_ar_afip_pos_number'],
+    'l10n_latam.document.type': ['code'],
+    'res.currency': ['l10n_ar_afip_code'],
+    'res.partner': ['vat', 'l10n_latam_identification_type_id'],
+    'l10n_latam.identification.type': ['l10n_ar_afip_code'],
+}
+
 
 class AccountMove(models.Model):
     _inherit = 'account.move'
 
-    # Campo para almacenar la imagen QR
+    # Solo se guarda el payload; la imagen se genera al imprimir
+    afip_qr_payload = fields.Char(
+        string='Payload QR AFIP',
+        compute='_compute_afip_qr_payload',
+        store=True,
+        help='URL codificada en el código QR según especificación AFIP RG 4892'
+    )
     afip_qr_code = fields.Binary(
         string='Código QR AFIP',
         compute='_compute_afip_qr_code',
+        help='Imagen PNG del código QR AFIP, generada a partir del payload (por compatibilidad: '
+             'los reportes usan _get_afip_qr_src, al tamaño de su paperformat)'
+    )
+    # Enruta la impresión al reporte térmico sin cargar pos_order_ids
+    is_pos_origin = fields.Boolean(
+        string='Factura del POS',
+        compute='_compute_is_pos_origin',
         store=True,
-        help='Código QR según especificación AFIP RG 4892'
+        index=True,
+        help='La factura se generó desde un pedido del Punto de Venta; se imprime en formato térmico'
     )
 
-    @api.depends('afip_auth_code', 'afip_auth_mode', 'invoice_date', 'amount_total')
-    def _compute_afip_qr_code(self):
+    @api.depends('pos_order_ids')
+    def _compute_is_pos_origin(self):
+        for rec in self:
+            rec.is_pos_origin = bool(rec.pos_order_ids)
+
+    def _get_afip_qr_data(self):
         """
-        Genera el código QR según especificación oficial de AFIP
+        Datos del QR según especificación oficial de AFIP
         https://www.afip.gob.ar/fe/qr/documentos/QRespecificaciones.pdf
         """
+        self.ensure_one()
+        qr_data = {
+            'ver': 1,
+            'fecha': self.invoice_date.strftime('%Y-%m-%d') if self.invoice_date else '',
+            'cuit': int(self.company_id.vat or 0),
+            'ptoVta': self.journal_id.l10n_ar_afip_pos_number or 0,
+            'tipoCmp': int(self.l10n_latam_document_type_id.code or 0),
+            'nroCmp': int((self.l10n_latam_document_number or '0').split('-')[-1]),
+            'importe': float(self.amount_total),
+            'moneda': self.currency_id.l10n_ar_afip_code or 'PES',
+            'ctz': float(getattr(self, 'l10n_ar_currency_rate', 1.0)),
+            'tipoCodAut': 'E' if self.afip_auth_mode == 'CAE' else 'A',
+            'codAut': int(self.afip_auth_code),
+        }
+        if self.partner_id.l10n_latam_identification_type_id:
+            qr_data['tipoDocRec'] = int(self.partner_id.l10n_latam_identification_type_id.l10n_ar_afip_code or 99)
+        if self.partner_id.vat:
+            qr_data['nroDocRec'] = int(self.partner_id.vat)
+        return qr_data
+
+    @api.depends('afip_auth_code', 'afip_auth_mode', 'invoice_date', 'amount_total')
+    def _compute_afip_qr_payload(self):
+        if len(self) > 1:
+            self._prefetch_afip_qr_data(self)
         for rec in self:
-            qr_code = False
-            
+            payload = False
             # Solo generar QR para facturas electrónicas con CAE/CAEA
             if rec.afip_auth_code and rec.afip_auth_mode in ['CAE', 'CAEA']:
                 try:
-                    # Preparar datos según especificación AFIP
-                    qr_data = {
-                        'ver': 1,
-                        'fecha': rec.invoice_date.strftime('%Y-%m-%d') if rec.invoice_date else '',
-                        'cuit': int(rec.company_id.vat or 0),
-                        'ptoVta': rec.journal_id.l10n_ar_afip_pos_number or 0,
-                        'tipoCmp': int(rec.l10n_latam_document_type_id.code or 0),
-                        'nroCmp': int((rec.l10n_latam_document_number or '0').split('-')[-1]),
-                        'importe': float(rec.amount_total),
-                        'moneda': rec.currency_id.l10n_ar_afip_code or 'PES',
-                        'ctz': float(getattr(rec, 'l10n_ar_currency_rate', 1.0)),
-                        'tipoCodAut': 'E' if rec.afip_auth_mode == 'CAE' else 'A',
-                        'codAut': int(rec.afip_auth_code),
-                    }
-                    
-                    if rec.partner_id.l10n_latam_identification_type_id:
-                        qr_data['tipoDocRec'] = int(rec.partner_id.l10n_latam_identification_type_id.l10n_ar_afip_code or 99)
-                    if rec.partner_id.vat:
-                        qr_data['nroDocRec'] = int(rec.partner_id.vat)
-                    
-                    json_str = json.dumps(qr_data, separators=(',', ':'))
-                    json_bytes = json_str.encode('utf-8')
-                    b64_data = base64.b64encode(json_bytes).decode('ascii')
-                    qr_url = f"https://www.afip.gob.ar/fe/qr/?p={b64_data}"
-                    
-                    qr = qrcode.QRCode(
-                        version=None,
-                        error_correction=qrcode.constants.ERROR_CORRECT_M,
-                        box_size=10,
-                        border=4,
-                    )
-                    qr.add_data(qr_url)
-                    qr.make(fit=True)
-                    
-                    img = qr.make_image(fill_color="black", back_color="white")
-                    buffer = io.BytesIO()
-                    img.save(buffer, format='PNG')
-                    qr_code = base64.b64encode(buffer.getvalue())
-                    
-                    _logger.info(f"QR Code generado para factura {rec.name}")
-                    
+                    payload = afip_qr.build_payload(rec._get_afip_qr_data())
                 except Exception as e:
-                    _logger.error(f"Error generando QR Code: {str(e)}")
-                    qr_code = False
-            
-            rec.afip_qr_code = qr_code
+                    _logger.error(f"Error generando payload QR de {rec.name}: {str(e)}")
+            rec.afip_qr_payload = payload
 
+    @api.depends('afip_qr_payload')
+    def _compute_afip_qr_code(self):
+        for rec in self:
+            payload = rec._get_afip_qr_payload()
+            rec.afip_qr_code = base64.b64encode(
+                afip_qr.render_cached(payload, 'png', DEFAULT_QR_SIZE_MM, DEFAULT_QR_DPI)[1]
+            ) if payload else False
 
-class IrActionsReport(models.Model):
-    _inherit = 'ir.actions.report'
+    def _get_afip_qr_payload(self):
+        """
+        Payload guardado o, si todavía no se calculó (facturas anteriores a
+        la migración que el cron aún no procesó), calculado al vuelo.
+        """
+        self.ensure_one()
+        if self.afip_qr_payload or not (self.afip_auth_code and self.afip_auth_mode in ['CAE', 'CAEA']):
+            return self.afip_qr_payload
+        try:
+            return afip_qr.build_payload(self._get_afip_qr_data())
+        except Exception as e:
+            _logger.error(f"Error generando payload QR de {self.name}: {str(e)}")
+            return False
 
     @api.model
-    def _render_qweb_pdf_prepare_streams(self, report_ref, data, res_ids=None):
+    def _cron_recompute_afip_qr_payload(self):
+        """Completa por lotes los payloads faltantes; si se agotó el tiempo se reprograma."""
+        deadline = time.monotonic() + QR_RECOMPUTE_TIME_BUDGET
+        self._recompute_afip_qr_payload_batched(deadline=deadline)
+        if time.monotonic() > deadline:
+            self.env.ref(QR_RECOMPUTE_CRON_XMLID)._trigger()
+
+    @api.model
+    def _recompute_afip_qr_payload_batched(self, batch_size=1000, commit=True, deadline=None):
         """
-        Intercepta la generación de reportes para usar el térmico cuando viene del POS
+        Calcula afip_qr_payload de las facturas con CAE/CAEA que no lo tienen,
+        por lotes de ``batch_size``: precarga en bloque los campos del QR y
+        escribe cada lote con un solo UPDATE. Con ``commit`` cada lote es su
+        propia transacción, así se puede interrumpir y retomar (se sigue por
+        las que quedaron sin payload). Con ``deadline`` (time.monotonic())
+        corta entre lotes. Devuelve (procesadas, con error).
         """
-        # Obtener el reporte actual
-        report_sudo = self._get_report(report_ref)
-        
-        # Si es el reporte de facturas estándar
-        if report_sudo.report_name in ['account.report_invoice_with_payments', 'account.report_invoice']:
-            # Verificar si alguna de las facturas viene del POS
-            if res_ids:
-                invoices = self.env['account.move'].browse(res_ids)
-                if any(inv.pos_order_ids for inv in invoices):
-                    # Cambiar al reporte térmico
-                    thermal_report = self.env.ref(
-                        'l10n_ar_invoice_thermal_qr.action_report_invoice_thermal_80mm',
-                        raise_if_not_found=False
-                    )
-                    if thermal_report:
-                        _logger.info(f"Cambiando a reporte térmico para facturas del POS: {invoices.mapped('name')}")
-                        report_sudo = thermal_report
-        
-        # Llamar al método original con el reporte (posiblemente modificado)
-        return super(IrActionsReport, report_sudo)._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=res_ids)
+        domain = SQL("afip_auth_code IS NOT NULL AND afip_auth_mode IN ('CAE', 'CAEA') "
+                     "AND afip_qr_payload IS NULL")
+        self.env.cr.execute(SQL("SELECT count(*) FROM account_move WHERE %s", domain))
+        total = self.env.cr.fetchone()[0]
+        _logger.info("Payload QR AFIP: %d facturas por calcular", total)
+
+        start = time.monotonic()
+        done = errors = 0
+        last_id = 0
+        while deadline is None or time.monotonic() < deadline:
+            self.env.cr.execute(SQL(
+                "SELECT id FROM account_move WHERE %s AND id > %s ORDER BY id LIMIT %s",
+                domain, last_id, batch_size,
+            ))
+            ids = [row[0] for row in self.env.cr.fetchall()]
+            if not ids:
+                break
+            last_id = ids[-1]
+            moves = self.browse(ids)
+            self._prefetch_afip_qr_data(moves)
+
+            values = []
+            for move in moves:
+                try:
+                    values.append(SQL('(%s, %s)', move.id, afip_qr.build_payload(move._get_afip_qr_data())))
+                except Exception as e:
+                    errors += 1
+                    _logger.error(f"Error generando payload QR de {move.name}: {str(e)}")
+            if values:
+                self.env.cr.execute(SQL(
+                    "UPDATE account_move m SET afip_qr_payload = v.payload "
+                    "FROM (VALUES %s) AS v(id, payload) WHERE m.id = v.id",
+                    SQL(', ').join(values),
+                ))
+            done += len(ids)
+            if commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+
+            elapsed = time.monotonic() - start
+            rate = done / elapsed if elapsed else 0.0
+            _logger.info("Payload QR AFIP: %d/%d facturas, %.0f facturas/s, faltan ~%.0f s",
+                         done, total, rate, (total - done) / rate if rate else 0.0)
+        return done, errors
+
+    @api.model
+    def _prefetch_afip_qr_data(self, moves):
+        """Trae en una consulta por modelo los campos que usa _get_afip_qr_data."""
+        records = {'account.move': moves}
+        for model_name, field_names in QR_DATA_FIELDS.items():
+            recs = records.get(model_name)
+            if not recs:
+                continue
+            stored = [name for name in field_names if name in recs._fields and recs._fields[name].store]
+            recs.fetch(stored)
+            for name in stored:
+                field = recs._fields[name]
+                if field.type == 'many2one':
+                    comodel = self.env[field.comodel_name]
+                    records[field.comodel_name] = records.get(field.comodel_name, comodel) | recs.mapped(name)
+
+    def _get_afip_qr_src(self, paperformat_xmlid=None, size_mm=DEFAULT_QR_SIZE_MM, report_type='pdf'):
+        """
+        Imagen del QR para los reportes, con la resolución del paperformat
+        ``paperformat_xmlid``: embebida (data URI) en el PDF y, en la vista
+        HTML (la que muestra el portal), la URL cacheable de _get_afip_qr_url.
+        False si la factura no tiene QR.
+        """
+        self.ensure_one()
+        payload = self._get_afip_qr_payload()
+        if not payload:
+            return False
+        paperformat = paperformat_xmlid and self.env.ref(paperformat_xmlid, raise_if_not_found=False)
+        dpi = paperformat.dpi if paperformat and paperformat.dpi else DEFAULT_QR_DPI
+        image_format = self.env['ir.config_parameter'].sudo().get_param(QR_IMAGE_FORMAT_PARAM, 'svg')
+        if report_type == 'html':
+            return self._get_afip_qr_url(image_format, size_mm, dpi)
+        return afip_qr.data_uri(payload, image_format, size_mm, dpi)
+
+    def _post(self, soft=True):
+        """Encola el pre-render del PDF de las facturas publicadas (ver invoice_pdf_prerender)."""
+        posted = super()._post(soft=soft)
+        self.env['l10n_ar.invoice.pdf.prerender']._enqueue(posted)
+        return posted
+
+    def _get_afip_qr_token(self):
+        """Token de la URL pública del QR: HMAC del payload con el secreto de la base."""
+        self.ensure_one()
+        return hmac(self.env(su=True), QR_URL_HMAC_SCOPE, self._get_afip_qr_payload())[:32]
+
+    def _get_afip_qr_url(self, image_format='svg', size_mm=DEFAULT_QR_SIZE_MM, dpi=DEFAULT_QR_DPI):
+        """
+        URL absoluta y cacheable de la imagen del QR, para el portal (vista
+        HTML de los reportes) y el email de la factura (ver account.move.send).
+        El token cambia con el payload, así la respuesta es inmutable.
+        Los PDFs siguen embebiendo la imagen (ver _get_afip_qr_src): que
+        wkhtmltopdf pida imágenes al mismo servidor ocupa workers.
+        """
+        self.ensure_one()
+        if not self._get_afip_qr_payload():
+            return False
+        return (f'{self.get_base_url()}/l10n_ar_invoice_thermal_qr/qr/{self.id}/'
+                f'{self._get_afip_qr_token()}.{image_format}?size_mm={size_mm}&dpi={dpi}')
+
+    def _get_escpos(self, layout='thermal'):
+        """
+        Bytes ESC/POS de las facturas, una tras otra con su corte. ``layout``
+        'thermal' replica report_invoice_thermal_80mm y 'ticket' el Ticket
+        80mm de l10n_ar_thermal_ticket.
+        """
+        build = {'thermal': escpos.thermal_invoice, 'ticket': escpos.ticket}[layout]
+        ICP = self.env['ir.config_parameter'].sudo()
+        module_size = int(ICP.get_param(ESCPOS_QR_MODULE_SIZE_PARAM, escpos.DEFAULT_QR_MODULE_SIZE))
+        return b''.join(build(move._get_escpos_data(), module_size) for move in self)
+
+    def _action_print_escpos(self, layout='thermal'):
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/l10n_ar_invoice_thermal_qr/escpos?ids={",".join(map(str, self.ids))}&layout={layout}',
+            'target': 'self',
+        }
+
+    def _get_escpos_data(self):
+        """Datos planos del comprobante para tools/escpos.py (sin acceso al ORM desde allí)."""
+        self.ensure_one()
+        company = self.company_id
+        partner = self.partner_id
+        return {
+            'company': {
+                'name': company.name or '',
+                'vat': company.vat or '',
+                'responsibility': company.l10n_ar_afip_responsibility_type_id.name or '',
+                'street': company.street or '',
+                'website': company.website or '',
+            },
+            'document_type': self.l10n_latam_document_type_id.name or '',
+            'name': self.name or '',
+            'date': self.invoice_date.strftime('%d/%m/%Y') if self.invoice_date else '',
+            'partner': {
+                'name': partner.name or '',
+                'vat': partner.vat or '',
+                'id_type': partner.l10n_latam_identification_type_id.name or '',
+                'responsibility': partner.l10n_ar_afip_responsibility_type_id.name or '',
+            },
+            'lines': [{
+                'product_name': line.product_id.name or '',
+                'name': line.name or '',
+                'quantity': line.quantity,
+                'price_unit': line.price_unit,
+                'discount': line.discount,
+                'price_subtotal': line.price_subtotal,
+            } for line in self.invoice_line_ids.filtered(lambda l: l.display_type == 'product')],
+            'amount_untaxed': self.amount_untaxed,
+            'amount_tax': self.amount_tax,
+            'amount_total': self.amount_total,
+            'auth_mode': self.afip_auth_mode or '',
+            'auth_code': self.afip_auth_code or '',
+            'auth_code_due': self.afip_auth_code_due.strftime('%d/%m/%Y') if self.afip_auth_code_due else '',
+            'qr_payload': self._get_afip_qr_payload() or '',
+        }
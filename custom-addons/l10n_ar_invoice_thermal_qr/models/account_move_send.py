@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+from .account_move import DEFAULT_QR_SIZE_MM
+
+# Resolución del QR en el email: PNG (los clientes de correo no muestran SVG)
+MAIL_QR_DPI = 120
+
+
+class AccountMoveSend(models.AbstractModel):
+    _inherit = 'account.move.send'
+
+    @api.model
+    def _get_default_mail_body(self, move, mail_template, mail_lang):
+        """
+        Agrega el QR AFIP al cuerpo del email de la factura, enlazado a la URL
+        cacheable del QR en lugar de embebido en el mensaje.
+        """
+        body = super()._get_default_mail_body(move, mail_template, mail_lang)
+        qr_url = move._get_afip_qr_url('png', DEFAULT_QR_SIZE_MM, MAIL_QR_DPI)
+        if not qr_url:
+            return body
+        return body + self.env['ir.qweb']._render('l10n_ar_invoice_thermal_qr.afip_qr_mail_block', {
+            'move': move,
+            'qr_url': qr_url,
+        })
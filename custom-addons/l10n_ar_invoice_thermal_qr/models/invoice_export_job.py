@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import re
+import shutil
+import time
+import zipfile
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import config
+from odoo.tools.safe_eval import safe_eval
+
+_logger = logging.getLogger(__name__)
+
+EXPORT_DIRNAME = 'l10n_ar_invoice_exports'
+# Reporte de facturas estándar; el enrutamiento a térmico lo hace ir.actions.report
+EXPORT_REPORT_XMLID = 'account.account_invoices'
+# Segundos de trabajo por ejecución del cron, por debajo de limit_time_real
+CRON_TIME_BUDGET = 600
+
+
+class InvoiceExportJob(models.Model):
+    _name = 'l10n_ar.invoice.export.job'
+    _description = 'Exportación masiva de PDFs de facturas'
+    _order = 'id desc'
+
+    name = fields.Char(string='Nombre', required=True)
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pendiente'),
+            ('running', 'En proceso'),
+            ('done', 'Terminada'),
+            ('failed', 'Fallida'),
+        ],
+        string='Estado', default='pending', required=True, index=True)
+    company_id = fields.Many2one(
+        'res.company', string='Compañía', required=True, index=True,
+        default=lambda self: self.env.company)
+    move_ids = fields.Many2many('account.move', string='Facturas')
+    batch_size = fields.Integer(string='Facturas por lote', default=50)
+    total_count = fields.Integer(string='Total de facturas', readonly=True)
+    processed_count = fields.Integer(string='Procesadas', default=0, readonly=True)
+    progress = fields.Float(string='Progreso', compute='_compute_progress')
+    part_count = fields.Integer(
+        string='Lotes confirmados', default=0, readonly=True,
+        help='Cada lote confirmado queda en su propia carpeta de PDFs; al '
+             'reanudar se descartan las carpetas posteriores y el ZIP se arma '
+             'recién al terminar.')
+    error_message = fields.Text(string='Error', readonly=True)
+    download_url = fields.Char(string='Descarga', compute='_compute_download_url')
+
+    @api.depends('processed_count', 'total_count')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = 100.0 * job.processed_count / job.total_count if job.total_count else 0.0
+
+    @api.depends('state')
+    def _compute_download_url(self):
+        for job in self:
+            job.download_url = (f'/l10n_ar_invoice_thermal_qr/invoice_export/{job.id}'
+                                if job.state == 'done' else False)
+
+    @api.model
+    def action_create_from_moves(self, moves):
+        """Crea un job con las facturas seleccionadas y despierta al cron."""
+        moves = moves.filtered(lambda m: m.is_invoice(include_receipts=True))
+        if not moves:
+            raise UserError(_('No hay facturas para exportar en la selección.'))
+        job = self.create({
+            'name': _('Exportación de %s facturas (%s)') % (len(moves), fields.Datetime.now()),
+            'move_ids': [(6, 0, moves.ids)],
+            'total_count': len(moves),
+        })
+        self.env.ref('l10n_ar_invoice_thermal_qr.ir_cron_invoice_export')._trigger()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def action_retry(self):
+        self.filtered(lambda j: j.state == 'failed').write({'state': 'pending', 'error_message': False})
+        self.env.ref('l10n_ar_invoice_thermal_qr.ir_cron_invoice_export')._trigger()
+
+    def action_download(self):
+        self.ensure_one()
+        return {'type': 'ir.actions.act_url', 'url': self.download_url, 'target': 'self'}
+
+    def unlink(self):
+        paths = [(job._get_zip_path(), job._get_parts_dir()) for job in self]
+        res = super().unlink()
+        for path, parts_dir in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            shutil.rmtree(parts_dir, ignore_errors=True)
+        return res
+
+    def _get_zip_path(self):
+        self.ensure_one()
+        return os.path.join(config.filestore(self.env.cr.dbname), EXPORT_DIRNAME, f'job_{self.id}.zip')
+
+    def _get_parts_dir(self):
+        self.ensure_one()
+        return os.path.join(config.filestore(self.env.cr.dbname), EXPORT_DIRNAME, f'job_{self.id}_parts')
+
+    @staticmethod
+    def _get_part_name(index):
+        return f'part_{index:05d}'
+
+    @api.model
+    def _cron_process_jobs(self):
+        """Procesa jobs pendientes dentro de un presupuesto de tiempo; si queda trabajo se reprograma."""
+        deadline = time.monotonic() + CRON_TIME_BUDGET
+        for job in self.search([('state', 'in', ('pending', 'running'))], order='id'):
+            if not job._process(deadline):
+                break
+        if self.search_count([('state', 'in', ('pending', 'running'))]):
+            self.env.ref('l10n_ar_invoice_thermal_qr.ir_cron_invoice_export')._trigger()
+
+    def _process(self, deadline):
+        """
+        Exporta las facturas que faltan, un lote por transacción: cada lote
+        escribe sus PDFs en una carpeta propia que solo cuenta si llegó al
+        commit. El ZIP se arma con todas las carpetas al terminar.
+        Devuelve False si se agotó el tiempo antes de terminar.
+        """
+        self.ensure_one()
+        report = self.env.ref(EXPORT_REPORT_XMLID)
+        move_ids = self.move_ids.sorted('id').ids
+        parts_dir = self._get_parts_dir()
+
+        committed = [self._get_part_name(index) for index in range(self.part_count)]
+        if ((self.processed_count and not self.part_count)
+                or any(not os.path.isdir(os.path.join(parts_dir, name)) for name in committed)):
+            _logger.warning("Exportación %s: faltan lotes en disco, se reinicia", self.id)
+            self.write({'processed_count': 0, 'part_count': 0})
+            committed = []
+        os.makedirs(parts_dir, exist_ok=True)
+        # Reanudar: descartar lo escrito por un lote que no llegó al commit
+        for name in set(os.listdir(parts_dir)) - set(committed):
+            shutil.rmtree(os.path.join(parts_dir, name), ignore_errors=True)
+        existing = {filename for name in committed for filename in os.listdir(os.path.join(parts_dir, name))}
+
+        self.write({'state': 'running', 'total_count': len(move_ids)})
+        self.env.cr.commit()
+
+        while self.processed_count < len(move_ids):
+            if time.monotonic() > deadline:
+                return False
+            start = time.monotonic()
+            chunk = move_ids[self.processed_count:self.processed_count + max(self.batch_size, 1)]
+            try:
+                self._export_chunk(report, chunk, os.path.join(parts_dir, self._get_part_name(self.part_count)),
+                                   existing)
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception("Exportación %s: error en lote %s", self.id, chunk)
+                self.write({'state': 'failed', 'error_message': str(e)})
+                self.env.cr.commit()
+                return True
+            self.write({
+                'processed_count': self.processed_count + len(chunk),
+                'part_count': self.part_count + 1,
+            })
+            self.env.cr.commit()
+            _logger.info("Exportación %s: %d/%d facturas (%.1f%%), lote en %.1f s",
+                         self.id, self.processed_count, len(move_ids), self.progress,
+                         time.monotonic() - start)
+
+        self._build_zip(parts_dir)
+        self.state = 'done'
+        self.env.cr.commit()
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        return True
+
+    def _render_chunk_streams(self, report, chunk):
+        """
+        {move_id: stream} con el PDF de cada factura del lote, renderizado con
+        los permisos de quien pidió la exportación (el cron corre como
+        superusuario).
+        """
+        report = report.with_user(self.create_uid).with_context(
+            allowed_company_ids=(self.company_id | self.move_ids.company_id).ids)
+        streams = report.with_context(report_pdf_no_attachment=True)._render_qweb_pdf_prepare_streams(
+            report.report_name, None, res_ids=chunk)
+        if any(not res_id for res_id in streams):
+            # El PDF del lote no se pudo separar por factura: una por una
+            for entry in streams.values():
+                if entry.get('stream'):
+                    entry['stream'].close()
+            streams = {}
+            for move_id in chunk:
+                streams.update(report.with_context(report_pdf_no_attachment=True)
+                               ._render_qweb_pdf_prepare_streams(report.report_name, None, res_ids=[move_id]))
+        return {res_id: entry['stream'] for res_id, entry in streams.items() if entry.get('stream')}
+
+    def _export_chunk(self, report, chunk, part_dir, existing):
+        """
+        Renderiza un lote y copia cada PDF a ``part_dir`` sin cargarlos todos
+        en memoria. La carpeta se escribe con otro nombre y se renombra al
+        final, así que existe completa o no existe.
+        """
+        tmp_dir = part_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        streams = self._render_chunk_streams(report, chunk)
+        names = set()
+        try:
+            for move in self.env['account.move'].browse(chunk):
+                stream = streams.get(move.id)
+                if not stream:
+                    continue
+                filename = self._get_pdf_filename(report, move, existing | names)
+                names.add(filename)
+                stream.seek(0)
+                with open(os.path.join(tmp_dir, filename), 'wb') as dest:
+                    shutil.copyfileobj(stream, dest)
+        finally:
+            for stream in streams.values():
+                stream.close()
+        os.rename(tmp_dir, part_dir)
+        existing |= names
+
+    def _build_zip(self, parts_dir):
+        """Une las carpetas de los lotes en el ZIP final (escrito aparte y renombrado)."""
+        path = self._get_zip_path()
+        tmp_path = path + '.tmp'
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for index in range(self.part_count):
+                part_dir = os.path.join(parts_dir, self._get_part_name(index))
+                for filename in sorted(os.listdir(part_dir)):
+                    archive.write(os.path.join(part_dir, filename), arcname=filename)
+        os.replace(tmp_path, path)
+
+    def _get_pdf_filename(self, report, move, existing):
+        name = ''
+        if report.print_report_name:
+            name = safe_eval(report.print_report_name, {'object': move, 'time': time})
+        name = re.sub(r'[\\/:*?"<>|]+', '_', name or move.name or str(move.id))
+        filename = f'{name}.pdf'
+        if filename in existing:
+            filename = f'{name}_{move.id}.pdf'
+        return filename
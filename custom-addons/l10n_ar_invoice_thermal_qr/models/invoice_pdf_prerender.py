@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+# Reporte de facturas estándar; el enrutamiento a térmico lo hace ir.actions.report
+PRERENDER_REPORT_XMLID = 'account.account_invoices'
+PRERENDER_CRON_XMLID = 'l10n_ar_invoice_thermal_qr.ir_cron_invoice_pdf_prerender'
+PRERENDER_BATCH_SIZE = 20
+# Reintentos con espera creciente (minutos): 1, 4, 9, 16...
+PRERENDER_MAX_ATTEMPTS = 5
+# Espera entre controles de una factura que todavía no tiene CAE (no cuenta como intento)
+PRERENDER_CAE_WAIT_MINUTES = 10
+# Segundos de trabajo por ejecución del cron, por debajo de limit_time_real
+CRON_TIME_BUDGET = 300
+
+
+class InvoicePdfPrerender(models.Model):
+    _name = 'l10n_ar.invoice.pdf.prerender'
+    _description = 'Cola de pre-render de PDFs de facturas'
+    _order = 'next_attempt, id'
+
+    move_id = fields.Many2one('account.move', string='Factura', required=True, ondelete='cascade', index=True)
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pendiente'),
+            ('done', 'Generado'),
+            ('failed', 'Fallido'),
+        ],
+        string='Estado', default='pending', required=True, index=True)
+    attempts = fields.Integer(string='Intentos', default=0, readonly=True)
+    next_attempt = fields.Datetime(string='Próximo intento', default=fields.Datetime.now, readonly=True)
+    error_message = fields.Text(string='Error', readonly=True)
+
+    _sql_constraints = [
+        ('move_uniq', 'unique(move_id)', 'La factura ya está en la cola de pre-render.'),
+    ]
+
+    @api.model
+    def _enqueue(self, moves):
+        """Encola (o vuelve a encolar) ``moves`` y despierta al cron."""
+        # Solo comprobantes de venta: las facturas de proveedor no usan el reporte de factura
+        moves = moves.filtered(lambda m: m.state == 'posted' and m.is_sale_document(include_receipts=True))
+        if not moves:
+            return
+        existing = self.sudo().search([('move_id', 'in', moves.ids)])
+        existing.write({'state': 'pending', 'attempts': 0, 'next_attempt': fields.Datetime.now(),
+                        'error_message': False})
+        self.sudo().create([{'move_id': move.id} for move in moves - existing.move_id])
+        self.env.ref(PRERENDER_CRON_XMLID)._trigger()
+
+    def action_retry(self):
+        self.filtered(lambda e: e.state == 'failed').write({
+            'state': 'pending', 'attempts': 0, 'next_attempt': fields.Datetime.now(), 'error_message': False})
+        self.env.ref(PRERENDER_CRON_XMLID)._trigger()
+
+    @api.model
+    def _is_ready(self, move):
+        """La factura electrónica necesita el CAE antes de imprimirse."""
+        if 'afip_auth_code' not in move._fields or move.afip_auth_code:
+            return True
+        journal = move.journal_id
+        return not ('afip_ws' in journal._fields and journal.afip_ws)
+
+    @api.model
+    def _cron_prerender(self):
+        """
+        Genera los PDFs pendientes por lotes, un lote por transacción, dentro
+        de un presupuesto de tiempo; si queda trabajo se reprograma.
+        """
+        deadline = time.monotonic() + CRON_TIME_BUDGET
+        cron = self.env.ref(PRERENDER_CRON_XMLID)
+        while True:
+            entries = self.search([('state', '=', 'pending'), ('next_attempt', '<=', fields.Datetime.now())],
+                                  limit=PRERENDER_BATCH_SIZE)
+            if not entries:
+                break
+            entries._process_batch()
+            self.env.cr.commit()
+            if time.monotonic() > deadline:
+                cron._trigger()
+                return
+        # Quedan reintentos programados: despertar al cron para el más próximo
+        retry = self.search([('state', '=', 'pending')], limit=1)
+        if retry:
+            cron._trigger(retry.next_attempt)
+
+    def _process_batch(self):
+        """
+        Renderiza el PDF de las facturas del lote y lo adjunta como PDF de la
+        factura (invoice_pdf_report_id), que es lo que usan el portal y el
+        envío por email. El reporte térmico o A4 se elige por factura.
+        """
+        done = self.browse()
+        waiting = self.browse()
+        for entry in self:
+            move = entry.move_id
+            if (move.state != 'posted' or move.invoice_pdf_report_id
+                    or not move.is_sale_document(include_receipts=True)):
+                done |= entry
+            elif not self._is_ready(move):
+                waiting |= entry
+        done.write({'state': 'done', 'error_message': False})
+        # Esperar el CAE no es un fallo: se pospone sin gastar intentos
+        waiting.write({
+            'next_attempt': fields.Datetime.now() + timedelta(minutes=PRERENDER_CAE_WAIT_MINUTES),
+            'error_message': "Factura sin CAE todavía",
+        })
+
+        todo = self - done - waiting
+        if not todo:
+            return
+        try:
+            with self.env.cr.savepoint():
+                todo._render_and_attach()
+            todo.write({'state': 'done', 'error_message': False})
+        except Exception as e:
+            _logger.warning("Pre-render de PDFs: error en %s", todo.move_id.mapped('name'), exc_info=True)
+            todo._schedule_retry(str(e))
+
+    def _schedule_retry(self, message):
+        for entry in self:
+            attempts = entry.attempts + 1
+            if attempts >= PRERENDER_MAX_ATTEMPTS:
+                entry.write({'state': 'failed', 'attempts': attempts, 'error_message': message})
+            else:
+                entry.write({
+                    'attempts': attempts,
+                    'next_attempt': fields.Datetime.now() + timedelta(minutes=attempts ** 2),
+                    'error_message': message,
+                })
+
+    def _render_and_attach(self):
+        report = self.env.ref(PRERENDER_REPORT_XMLID)
+        moves = self.move_id
+        streams = report.with_context(report_pdf_no_attachment=True)._render_qweb_pdf_prepare_streams(
+            report.report_name, None, res_ids=moves.ids)
+        if any(not res_id for res_id in streams):
+            # El PDF del lote no se pudo separar por factura: una por una
+            for entry in streams.values():
+                if entry.get('stream'):
+                    entry['stream'].close()
+            streams = {}
+            for move in moves:
+                streams.update(report.with_context(report_pdf_no_attachment=True)
+                               ._render_qweb_pdf_prepare_streams(report.report_name, None, res_ids=move.ids))
+
+        for move in moves:
+            entry = streams.get(move.id)
+            if not entry or not entry.get('stream'):
+                continue
+            stream = entry['stream']
+            content = stream.getvalue()
+            stream.close()
+            self.env['ir.attachment'].sudo().create({
+                'name': move._get_invoice_report_filename(),
+                'raw': content,
+                'mimetype': 'application/pdf',
+                'res_model': move._name,
+                'res_id': move.id,
+                'res_field': 'invoice_pdf_report_file',
+                'company_id': move.company_id.id,
+            })
+            move.invalidate_recordset(fnames=['invoice_pdf_report_id', 'invoice_pdf_report_file'])
+        _logger.info("Pre-render de PDFs: %d facturas generadas", len(moves))
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo import models, api
+from odoo.tools.pdf import PdfFileReader, PdfFileWriter
+
+_logger = logging.getLogger(__name__)
+
+# Reportes de factura A4 que se enrutan al térmico cuando vienen del POS
+INVOICE_REPORTS = ('account.report_invoice_with_payments', 'account.report_invoice')
+THERMAL_REPORT_XMLID = 'l10n_ar_invoice_thermal_qr.action_report_invoice_thermal_80mm'
+THERMAL_REPORT_NAME = 'l10n_ar_invoice_thermal_qr.report_invoice_thermal_80mm'
+
+# Impresión por lotes: a partir de cuántas facturas se parte el render y con
+# cuántos threads (cada uno con su propio cursor y su wkhtmltopdf)
+PDF_BATCH_SIZE_PARAM = 'l10n_ar_invoice_thermal_qr.pdf_batch_size'
+PDF_BATCH_WORKERS_PARAM = 'l10n_ar_invoice_thermal_qr.pdf_batch_workers'
+DEFAULT_PDF_BATCH_SIZE = 50
+DEFAULT_PDF_BATCH_WORKERS = 2
+
+# Los PDFs más grandes que esto pasan de memoria a disco
+PDF_SPOOL_MAX_SIZE = 4 * 1024 * 1024
+
+
+class SpooledPdfStream(tempfile.SpooledTemporaryFile):
+    """SpooledTemporaryFile con getvalue(), que es lo que ir.actions.report espera de un stream."""
+
+    def __init__(self):
+        super().__init__(max_size=PDF_SPOOL_MAX_SIZE, mode='w+b')
+
+    def getvalue(self):
+        self.seek(0)
+        return self.read()
+
+
+def _spool(stream):
+    """Copia un stream (BytesIO) a un SpooledPdfStream y libera el original."""
+    spooled = SpooledPdfStream()
+    spooled.write(stream.getvalue())
+    spooled.seek(0)
+    stream.close()
+    return spooled
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    @api.model
+    def _render_qweb_pdf_prepare_streams(self, report_ref, data, res_ids=None):
+        """
+        Intercepta la generación de reportes para usar el térmico cuando viene del POS
+        """
+        # Obtener el reporte actual
+        report_sudo = self._get_report(report_ref)
+
+        # Lotes grandes de facturas: render por partes en paralelo
+        if (res_ids
+                and report_sudo.report_name in INVOICE_REPORTS + (THERMAL_REPORT_NAME,)
+                and not self.env.context.get('l10n_ar_pdf_batch_chunk')
+                and len(set(res_ids)) == len(res_ids)):
+            batch_size, workers = self._get_pdf_batch_params()
+            if batch_size and len(res_ids) > batch_size:
+                if self._has_uncommitted_writes():
+                    # Los threads no verían esos cambios: render secuencial en este cursor
+                    _logger.info("Impresión de %d facturas con cambios sin commitear: sin lotes en paralelo",
+                                 len(res_ids))
+                else:
+                    return self._render_qweb_pdf_prepare_streams_batched(
+                        report_ref, data, res_ids, batch_size, workers)
+
+        # Reporte de facturas estándar: las del POS van al térmico
+        if report_sudo.report_name in INVOICE_REPORTS and res_ids:
+            return self._render_qweb_pdf_prepare_streams_routed(report_ref, data, res_ids)
+
+        return super()._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=res_ids)
+
+    @api.model
+    def _render_qweb_pdf_prepare_streams_routed(self, report_ref, data, res_ids):
+        """
+        Separa las facturas del POS (reporte térmico) del resto (A4) según
+        is_pos_origin, renderiza cada grupo con su reporte y devuelve los
+        streams en el orden de ``res_ids``. Los lotes grandes ya llegan acá
+        partidos y en paralelo (_render_qweb_pdf_prepare_streams_batched).
+        """
+        thermal_report = self.env.ref(THERMAL_REPORT_XMLID, raise_if_not_found=False)
+        moves = self.env['account.move'].browse(res_ids)
+        pos_ids = set(moves.filtered('is_pos_origin').ids) if thermal_report else set()
+        if not pos_ids:
+            return super()._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=res_ids)
+        if len(pos_ids) == len(set(res_ids)):
+            return super()._render_qweb_pdf_prepare_streams(thermal_report, data, res_ids=res_ids)
+
+        _logger.info("Lote mixto: %d facturas del POS en térmico y %d en A4",
+                     len(pos_ids), len(set(res_ids)) - len(pos_ids))
+        groups = [
+            (thermal_report, [res_id for res_id in res_ids if res_id in pos_ids]),
+            (report_ref, [res_id for res_id in res_ids if res_id not in pos_ids]),
+        ]
+        collected = {}
+        for group_report, group_ids in groups:
+            streams = super()._render_qweb_pdf_prepare_streams(group_report, data, res_ids=group_ids)
+            if any(not res_id for res_id in streams):
+                # El PDF del grupo no se pudo separar por factura: una por una
+                # para poder intercalarlas en el orden original
+                for entry in streams.values():
+                    if entry.get('stream'):
+                        entry['stream'].close()
+                streams = {}
+                for res_id in group_ids:
+                    streams.update(super()._render_qweb_pdf_prepare_streams(
+                        group_report, data, res_ids=[res_id]))
+            collected.update(streams)
+        return {res_id: collected[res_id] for res_id in res_ids if res_id in collected}
+
+    @api.model
+    def _has_uncommitted_writes(self):
+        """
+        True si la transacción actual ya escribió en la base (por ejemplo
+        publicar e imprimir en el mismo request). PostgreSQL asigna el id de
+        transacción recién con la primera escritura.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("SELECT txid_current_if_assigned() IS NOT NULL")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _get_pdf_batch_params(self):
+        """(tamaño de lote, threads). Tamaño 0 deshabilita la impresión por lotes."""
+        ICP = self.env['ir.config_parameter'].sudo()
+        try:
+            batch_size = int(ICP.get_param(PDF_BATCH_SIZE_PARAM, DEFAULT_PDF_BATCH_SIZE))
+            workers = int(ICP.get_param(PDF_BATCH_WORKERS_PARAM, DEFAULT_PDF_BATCH_WORKERS))
+        except ValueError:
+            _logger.warning("Parámetros de impresión por lotes inválidos, usando valores por defecto")
+            batch_size, workers = DEFAULT_PDF_BATCH_SIZE, DEFAULT_PDF_BATCH_WORKERS
+        return max(batch_size, 0), max(workers, 1)
+
+    @api.model
+    def _render_qweb_pdf_prepare_streams_batched(self, report_ref, data, res_ids, batch_size, workers):
+        """
+        Parte ``res_ids`` en lotes de ``batch_size`` y renderiza hasta
+        ``workers`` lotes a la vez, cada uno en un thread con su propio cursor
+        (QWeb + wkhtmltopdf por lote). Los PDFs de cada factura se pasan a
+        archivos temporales apenas termina su lote, así la memoria depende del
+        tamaño de lote y no del total.
+
+        Los threads leen datos ya commiteados; por eso solo se llega acá si
+        la transacción actual no tiene escrituras (_has_uncommitted_writes).
+        """
+        chunks = [res_ids[i:i + batch_size] for i in range(0, len(res_ids), batch_size)]
+        _logger.info("Impresión por lotes: %d facturas en %d lotes de %d (%d threads)",
+                     len(res_ids), len(chunks), batch_size, workers)
+
+        registry = self.env.registry
+        uid = self.env.uid
+        # Mismo modo superusuario que quien llama (portal, asistente de envío)
+        su = self.env.su
+        context = dict(self.env.context, l10n_ar_pdf_batch_chunk=True)
+
+        def render_chunk(chunk):
+            cr = registry.cursor()
+            try:
+                env = api.Environment(cr, uid, context, su=su)
+                streams = self.with_env(env)._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=chunk)
+                return {
+                    key: {
+                        'stream': _spool(entry['stream']) if entry.get('stream') else None,
+                        'attachment': entry['attachment'].id if entry.get('attachment') else False,
+                    }
+                    for key, entry in streams.items()
+                }
+            finally:
+                cr.close()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='l10n_ar_pdf_batch') as executor:
+            results = list(executor.map(render_chunk, chunks))
+
+        collected = {}
+        unsplit = False
+        for chunk_streams in results:
+            for key, entry in chunk_streams.items():
+                if not key:
+                    unsplit = True
+                entry['attachment'] = self.env['ir.attachment'].browse(entry['attachment'])
+                collected[key if key else ('chunk', len(collected))] = entry
+
+        if unsplit:
+            # Algún lote no se pudo separar por factura: se devuelve un único
+            # PDF (sin adjuntos por registro), igual que hace Odoo en ese caso
+            streams = [entry['stream'] for entry in collected.values() if entry['stream']]
+            try:
+                merged = self._merge_pdf_streams_spooled(streams)
+            finally:
+                for stream in streams:
+                    stream.close()
+            return {False: {'stream': merged, 'attachment': None}}
+        return collected
+
+    @api.model
+    def _merge_pdf_streams_spooled(self, streams):
+        """Une los PDFs de ``streams`` en un SpooledPdfStream."""
+        writer = PdfFileWriter()
+        for stream in streams:
+            stream.seek(0)
+            reader = PdfFileReader(stream, strict=False)
+            for page in range(reader.getNumPages()):
+                writer.addPage(reader.getPage(page))
+        merged = SpooledPdfStream()
+        writer.write(merged)
+        merged.seek(0)
+        return merged
+
+    def _merge_pdfs(self, streams):
+        """
+        Si los PDFs vienen de la impresión por lotes (en archivos temporales),
+        el PDF unido también va a un archivo temporal: la única copia completa
+        en memoria es la que devuelve _render_qweb_pdf.
+        """
+        if not any(isinstance(stream, SpooledPdfStream) for stream in streams):
+            return super()._merge_pdfs(streams)
+        merged = self._merge_pdf_streams_spooled(streams)
+        # Como en el core: quien llama cierra todos los streams de la lista
+        streams.append(merged)
+        return merged
+
+    def _render_qweb_pdf_spooled(self, report_ref, res_ids=None, data=None):
+        """
+        Como _render_qweb_pdf, pero devuelve el PDF unido en un archivo
+        temporal en lugar de bytes, y no crea adjuntos. Para exportaciones
+        grandes que escriben el resultado a disco.
+        """
+        collected_streams = self._render_qweb_pdf_prepare_streams(report_ref, data, res_ids=res_ids)
+        streams = [entry['stream'] for entry in collected_streams.values() if entry['stream']]
+        try:
+            return self._merge_pdf_streams_spooled(streams)
+        finally:
+            for stream in streams:
+                stream.close()
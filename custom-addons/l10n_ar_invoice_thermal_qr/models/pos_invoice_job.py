@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+import io
+import logging
+import time
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+from .account_move import THERMAL_OUTPUT_PARAM
+from .ir_actions_report import THERMAL_REPORT_XMLID
+
+_logger = logging.getLogger(__name__)
+
+POS_INVOICE_CRON_XMLID = 'l10n_ar_invoice_thermal_qr.ir_cron_pos_invoice_job'
+# Segundos de trabajo por ejecución del cron, por debajo de limit_time_real
+CRON_TIME_BUDGET = 600
+
+
+class PosInvoiceJob(models.Model):
+    _name = 'l10n_ar.pos.invoice.job'
+    _description = 'Facturación masiva de pedidos del POS'
+    _order = 'id desc'
+
+    name = fields.Char(string='Nombre', required=True)
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pendiente'),
+            ('running', 'En proceso'),
+            ('done', 'Terminada'),
+            ('failed', 'Fallida'),
+        ],
+        string='Estado', default='pending', required=True, index=True)
+    order_ids = fields.Many2many('pos.order', string='Pedidos')
+    move_ids = fields.Many2many('account.move', string='Facturas', readonly=True)
+    batch_size = fields.Integer(string='Pedidos por lote', default=20)
+    total_count = fields.Integer(string='Total de pedidos', readonly=True)
+    processed_count = fields.Integer(string='Procesados', default=0, readonly=True)
+    progress = fields.Float(string='Progreso', compute='_compute_progress')
+    output_attachment_id = fields.Many2one('ir.attachment', string='Impresión', readonly=True)
+    error_message = fields.Text(string='Errores', readonly=True)
+
+    @api.depends('processed_count', 'total_count')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = 100.0 * job.processed_count / job.total_count if job.total_count else 0.0
+
+    @api.model
+    def action_create_from_orders(self, orders):
+        """Crea un job con los pedidos sin facturar y despierta al cron; devuelve el job."""
+        orders = orders.filtered(lambda o: not o.account_move and o.state in ('paid', 'done'))
+        if not orders:
+            raise UserError(_('No hay pedidos pagados sin facturar en la selección.'))
+        job = self.create({
+            'name': _('Facturación de %s pedidos (%s)') % (len(orders), fields.Datetime.now()),
+            'order_ids': [(6, 0, orders.ids)],
+            'total_count': len(orders),
+        })
+        self.env.ref(POS_INVOICE_CRON_XMLID)._trigger()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def action_retry(self):
+        self.filtered(lambda j: j.state == 'failed').write({'state': 'pending', 'error_message': False})
+        self.env.ref(POS_INVOICE_CRON_XMLID)._trigger()
+
+    def action_download(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/{self.output_attachment_id.id}?download=true',
+            'target': 'self',
+        }
+
+    @api.model
+    def _cron_process_jobs(self):
+        """Procesa jobs pendientes dentro de un presupuesto de tiempo; si queda trabajo se reprograma."""
+        deadline = time.monotonic() + CRON_TIME_BUDGET
+        for job in self.search([('state', 'in', ('pending', 'running'))], order='id'):
+            if not job._process(deadline):
+                break
+        if self.search_count([('state', 'in', ('pending', 'running'))]):
+            self.env.ref(POS_INVOICE_CRON_XMLID)._trigger()
+
+    def _process(self, deadline):
+        """
+        Factura los pedidos que faltan, un lote por transacción, y al terminar
+        genera una única impresión térmica con todas las facturas. El payload
+        del QR se calcula al publicar (campo almacenado) y el PDF de cada
+        factura lo genera la cola de pre-render, que se alimenta al publicar;
+        la impresión final reutiliza esos PDFs. Devuelve False si se agotó el
+        tiempo antes de terminar.
+        """
+        self.ensure_one()
+        order_ids = self.order_ids.sorted('id').ids
+        self.write({'state': 'running', 'total_count': len(order_ids)})
+        self.env.cr.commit()
+
+        # Errores de ejecuciones anteriores del mismo job (al reanudar)
+        errors = self.error_message.splitlines() if self.error_message else []
+        while self.processed_count < len(order_ids):
+            if time.monotonic() > deadline:
+                return False
+            start = time.monotonic()
+            chunk = order_ids[self.processed_count:self.processed_count + max(self.batch_size, 1)]
+            invoices = self.env['account.move']
+            for order in self.env['pos.order'].browse(chunk):
+                if order.account_move:
+                    invoices |= order.account_move
+                    continue
+                try:
+                    with self.env.cr.savepoint():
+                        order.with_context(l10n_ar_pos_invoice_no_print=True).action_pos_order_invoice()
+                    invoices |= order.account_move
+                except Exception as e:
+                    _logger.warning("Facturación POS %s: error en pedido %s", self.id, order.name, exc_info=True)
+                    errors.append(f'{order.name}: {e}')
+            self.write({
+                'processed_count': self.processed_count + len(chunk),
+                'move_ids': [(4, move_id) for move_id in invoices.ids],
+                'error_message': '\n'.join(errors) or False,
+            })
+            self.env.cr.commit()
+            _logger.info("Facturación POS %s: %d/%d pedidos (%.1f%%), lote en %.1f s",
+                         self.id, self.processed_count, len(order_ids), self.progress,
+                         time.monotonic() - start)
+
+        try:
+            self._generate_output()
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.exception("Facturación POS %s: error generando la impresión", self.id)
+            self.write({'state': 'failed', 'error_message': '\n'.join(errors + [str(e)])})
+            self.env.cr.commit()
+            return True
+        self.state = 'done'
+        self.env.cr.commit()
+        return True
+
+    def _generate_output(self):
+        """Una sola impresión con todas las facturas, en ESC/POS o PDF térmico según la configuración."""
+        self.ensure_one()
+        moves = self.move_ids.sorted('id')
+        if not moves:
+            return
+        ICP = self.env['ir.config_parameter'].sudo()
+        if ICP.get_param(THERMAL_OUTPUT_PARAM, 'pdf') == 'escpos':
+            content, mimetype, extension = moves._get_escpos('thermal'), 'application/octet-stream', 'bin'
+        else:
+            merged = self._merge_invoice_pdfs(moves)
+            try:
+                content = merged.getvalue()
+            finally:
+                merged.close()
+            mimetype, extension = 'application/pdf', 'pdf'
+        self.output_attachment_id = self.env['ir.attachment'].create({
+            'name': f'facturas_pos_{self.id}.{extension}',
+            'raw': content,
+            'mimetype': mimetype,
+            'res_model': self._name,
+            'res_id': self.id,
+        })
+
+    def _merge_invoice_pdfs(self, moves):
+        """
+        Une los PDFs de ``moves`` en un archivo temporal. Reutiliza el PDF ya
+        generado por la cola de pre-render (invoice_pdf_report_id, térmico para
+        las facturas del POS) y renderiza solo las facturas que todavía no lo
+        tienen.
+        """
+        report = self.env.ref(THERMAL_REPORT_XMLID)
+        missing = moves.filtered(lambda m: not m.invoice_pdf_report_id)
+        rendered = {}
+        if missing:
+            _logger.info("Facturación POS %s: %d de %d facturas sin PDF pre-renderizado",
+                         self.id, len(missing), len(moves))
+            rendered = report._render_qweb_pdf_prepare_streams(report, None, res_ids=missing.ids)
+            if any(not res_id for res_id in rendered):
+                # El PDF del lote no se pudo separar por factura: una por una
+                for entry in rendered.values():
+                    if entry.get('stream'):
+                        entry['stream'].close()
+                rendered = {}
+                for move in missing:
+                    rendered.update(report._render_qweb_pdf_prepare_streams(report, None, res_ids=move.ids))
+
+        streams = []
+        try:
+            for move in moves:
+                if move.invoice_pdf_report_id:
+                    streams.append(self._open_attachment_stream(move.invoice_pdf_report_id))
+                elif rendered.get(move.id, {}).get('stream'):
+                    streams.append(rendered.pop(move.id)['stream'])
+            return report._merge_pdf_streams_spooled(streams)
+        finally:
+            for stream in streams + [entry['stream'] for entry in rendered.values() if entry.get('stream')]:
+                stream.close()
+
+    @api.model
+    def _open_attachment_stream(self, attachment):
+        """Archivo del adjunto en el filestore, sin cargarlo en memoria; si está en la base, en memoria."""
+        attachment = attachment.sudo()
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or b'')
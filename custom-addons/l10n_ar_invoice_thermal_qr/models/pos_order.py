@@ -2,6 +2,8 @@
 from odoo import models
 import logging
 
+from .account_move import THERMAL_OUTPUT_PARAM
+
 _logger = logging.getLogger(__name__)
 
 
@@ -14,6 +16,9 @@ class PosOrder(models.Model):
         """
         # Llamar al método original para crear la factura
         result = super().action_pos_order_invoice()
+        if self.env.context.get('l10n_ar_pos_invoice_no_print'):
+            # Facturación masiva en segundo plano: la impresión la genera el job
+            return result
         
         # Obtener las facturas creadas
         invoices = self.mapped('account_move')
@@ -21,6 +26,11 @@ class PosOrder(models.Model):
         if invoices:
             _logger.info(f"Facturas creadas desde POS: {invoices.mapped('name')}")
             
+            ICP = self.env['ir.config_parameter'].sudo()
+            if ICP.get_param(THERMAL_OUTPUT_PARAM, 'pdf') == 'escpos':
+                # Bytes ESC/POS para enviar directo a la impresora, sin PDF
+                return invoices._action_print_escpos('thermal')
+
             # Generar y retornar el reporte térmico
             thermal_report = self.env.ref(
                 'l10n_ar_invoice_thermal_qr.action_report_invoice_thermal_80mm',
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import os
+
+from odoo.tests.common import BaseCase, tagged
+
+from odoo.addons.l10n_ar_invoice_thermal_qr.tools import escpos
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+# ESCPOS_UPDATE_FIXTURES=1 regraba los .bin tras un cambio intencional del formato
+UPDATE_FIXTURES = bool(os.environ.get('ESCPOS_UPDATE_FIXTURES'))
+
+INVOICE_DATA = {
+    'company': {
+        'name': 'Corte Perfecto Peluquería',
+        'vat': '30712345679',
+        'responsibility': 'IVA Responsable Inscripto',
+        'street': 'Av. Corrientes 1234, Ciudad Autónoma de Buenos Aires',
+        'website': 'https://corteperfecto.somosblink.com',
+    },
+    'document_type': 'FACTURA B',
+    'name': 'FA-B 00003-00001234',
+    'date': '15/10/2026',
+    'partner': {
+        'name': 'Consumidor Final Anónimo',
+        'vat': '20123456786',
+        'id_type': 'CUIT',
+        'responsibility': 'Consumidor Final',
+    },
+    'lines': [
+        {'product_name': 'Corte de pelo', 'name': 'Corte de pelo', 'quantity': 1.0,
+         'price_unit': 12100.0, 'discount': 0.0, 'price_subtotal': 10000.0},
+        {'product_name': 'Shampoo reparador con keratina y aceite de argán, 500 ml',
+         'name': 'Shampoo', 'quantity': 2.0, 'price_unit': 6050.0, 'discount': 10.0,
+         'price_subtotal': 9000.0},
+        {'product_name': '', 'name': 'Propina', 'quantity': 1.0,
+         'price_unit': 0.0, 'discount': 0.0, 'price_subtotal': 0.0},
+    ],
+    'amount_untaxed': 19000.0,
+    'amount_tax': 3990.0,
+    'amount_total': 22990.0,
+    'auth_mode': 'CAE',
+    'auth_code': '76123456789012',
+    'auth_code_due': '25/10/2026',
+    'qr_payload': 'https://www.afip.gob.ar/fe/qr/?p=eyJ2ZXIiOjEsImZlY2hhIjoiMjAyNi0xMC0xNSJ9',
+}
+
+
+@tagged('post_install', '-at_install')
+class TestEscPos(BaseCase):
+
+    def assertMatchesFixture(self, content, filename):
+        path = os.path.join(FIXTURES_DIR, filename)
+        if UPDATE_FIXTURES:
+            with open(path, 'wb') as f:
+                f.write(content)
+        with open(path, 'rb') as f:
+            self.assertEqual(content, f.read(), f'{filename}: la salida ESC/POS cambió')
+
+    def test_thermal_invoice_bytes(self):
+        content = escpos.thermal_invoice(INVOICE_DATA, module_size=4)
+        self.assertMatchesFixture(content, 'thermal_invoice.bin')
+        # Mismos datos que report_invoice_thermal_80mm
+        for expected in (b'CLIENTE:', b'Fecha: 15/10/2026', b'Corte de pelo', b'Subtotal:',
+                         b'TOTAL:', b'$22990.00', b'Vto CAE: 25/10/2026'):
+            self.assertIn(expected, content)
+        self.assertNotIn(b'Propina', content)
+
+    def test_ticket_bytes(self):
+        content = escpos.ticket(INVOICE_DATA, module_size=4)
+        self.assertMatchesFixture(content, 'ticket.bin')
+        self.assertIn(b'Propina', content)
+        self.assertIn('Peluquería'.encode(escpos.CODEPAGE), content)
+
+    def test_qr_command_carries_payload(self):
+        content = escpos.EscPosBuilder().qr('ABC', module_size=5).getvalue()
+        self.assertIn(b'\x1d(k\x03\x001C\x05', content)
+        self.assertIn(b'\x1d(k\x06\x001P0ABC', content)
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import time
+import zipfile
+from unittest.mock import patch
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.exceptions import AccessError
+from odoo.tests import tagged
+
+
+class SimulatedCrash(BaseException):
+    """Corte del worker a mitad de un lote: no la atrapa ``except Exception``."""
+
+
+class CrashingStream(io.BytesIO):
+    def read(self, *args):
+        raise SimulatedCrash()
+
+
+def fake_pdf(move_id):
+    return b'%PDF-1.4 factura ' + str(move_id).encode()
+
+
+@tagged('post_install', '-at_install')
+class TestInvoiceExportJob(AccountTestInvoicingCommon):
+
+    def setUp(self):
+        super().setUp()
+        # _process confirma cada lote; dentro del test todo queda en la transacción
+        self.startPatcher(patch.object(self.env.cr, 'commit'))
+        self.moves = self.env['account.move']
+        for amount in (100, 200, 300, 400):
+            self.moves |= self.init_invoice('out_invoice', amounts=[amount], post=True)
+        self.job = self.env['l10n_ar.invoice.export.job'].create({
+            'name': 'Exportación de prueba',
+            'move_ids': [(6, 0, self.moves.ids)],
+            'total_count': len(self.moves),
+            'batch_size': 2,
+        })
+        self.addCleanup(self.job.unlink)
+
+    def _render(self, crash_on_call=None):
+        calls = []
+
+        def render_chunk_streams(report, chunk):
+            calls.append(chunk)
+            streams = {move_id: io.BytesIO(fake_pdf(move_id)) for move_id in chunk}
+            if len(calls) == crash_on_call:
+                streams[chunk[-1]] = CrashingStream()
+            return streams
+        return patch.object(type(self.job), '_render_chunk_streams', side_effect=render_chunk_streams)
+
+    def test_resume_after_crash_keeps_committed_batches(self):
+        with self._render(crash_on_call=2), self.assertRaises(SimulatedCrash):
+            self.job._process(time.monotonic() + 600)
+        self.assertEqual(self.job.processed_count, 2)
+        self.assertEqual(self.job.part_count, 1)
+        self.assertFalse(os.path.exists(self.job._get_zip_path()))
+
+        with self._render():
+            self.assertTrue(self.job._process(time.monotonic() + 600))
+        self.assertEqual(self.job.state, 'done')
+        self.assertEqual(self.job.processed_count, 4)
+        self.assertFalse(os.path.exists(self.job._get_parts_dir()))
+
+        with zipfile.ZipFile(self.job._get_zip_path()) as archive:
+            self.assertIsNone(archive.testzip())
+            contents = {archive.read(name) for name in archive.namelist()}
+        self.assertEqual(len(contents), 4)
+        self.assertEqual(contents, {fake_pdf(move_id) for move_id in self.moves.ids})
+
+    def test_missing_parts_restart_the_export(self):
+        self.job.write({'processed_count': 2, 'part_count': 1})
+        with self._render():
+            self.job._process(time.monotonic() + 600)
+        with zipfile.ZipFile(self.job._get_zip_path()) as archive:
+            self.assertEqual(len(archive.namelist()), 4)
+
+    def test_jobs_are_private_to_their_creator(self):
+        invoice_user = self.env.ref('account.group_account_invoice')
+        users = self.env['res.users'].create([{
+            'name': name,
+            'login': name,
+            'groups_id': [(6, 0, invoice_user.ids)],
+            'company_id': self.env.company.id,
+            'company_ids': [(6, 0, self.env.company.ids)],
+        } for name in ('export_user_a', 'export_user_b')])
+        Job = self.env['l10n_ar.invoice.export.job']
+        job = Job.with_user(users[0]).create({'name': 'Propia', 'move_ids': [(6, 0, self.moves.ids)]})
+        self.addCleanup(job.sudo().unlink)
+
+        self.assertEqual(job.company_id, self.env.company)
+        self.assertEqual(Job.with_user(users[0]).search([('id', '=', job.id)]), job)
+        self.assertFalse(Job.with_user(users[1]).search([('id', '=', job.id)]))
+        with self.assertRaises(AccessError):
+            job.with_user(users[1]).check_access('read')
+
+    def test_chunks_render_as_the_requesting_user(self):
+        rendered_as = []
+
+        def prepare_streams(report, report_ref, data, res_ids=None):
+            rendered_as.append((report.env.uid, report.env.su))
+            return {move_id: {'stream': io.BytesIO(fake_pdf(move_id))} for move_id in res_ids}
+
+        with patch.object(type(self.env['ir.actions.report']), '_render_qweb_pdf_prepare_streams',
+                          autospec=True, side_effect=prepare_streams):
+            self.job.sudo()._process(time.monotonic() + 600)
+        self.assertEqual(self.job.state, 'done')
+        self.assertEqual(set(rendered_as), {(self.job.create_uid.id, False)})
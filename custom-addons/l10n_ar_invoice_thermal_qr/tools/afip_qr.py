@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+QR de AFIP (RG 4892): payload canónico e imágenes al tamaño del papel.
+
+En la base solo se guarda el payload (la URL que codifica el QR, unos
+cientos de bytes); la imagen se genera al imprimir con la resolución que
+necesita el paperformat: SVG (vectorial, nítido a cualquier escala) o PNG
+de 1 bit.
+"""
+import base64
+import hashlib
+import io
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import qrcode
+
+AFIP_QR_URL = 'https://www.afip.gob.ar/fe/qr/?p='
+QR_BORDER = 4
+MM_PER_INCH = 25.4
+
+
+def build_payload(qr_data):
+    """URL del QR a partir del dict de la especificación AFIP."""
+    json_str = json.dumps(qr_data, separators=(',', ':'))
+    return AFIP_QR_URL + base64.b64encode(json_str.encode('utf-8')).decode('ascii')
+
+
+def _make_qr(payload, box_size=1):
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=box_size,
+        border=QR_BORDER,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr
+
+
+def box_size_for(modules, size_mm, dpi):
+    """Píxeles por módulo para que el QR ocupe ``size_mm`` a ``dpi``."""
+    pixels = size_mm / MM_PER_INCH * dpi
+    return max(1, math.ceil(pixels / (modules + 2 * QR_BORDER)))
+
+
+def render_png(payload, size_mm, dpi):
+    """PNG de 1 bit (blanco y negro) con la resolución justa para ``size_mm`` a ``dpi``."""
+    qr = _make_qr(payload)
+    qr.box_size = box_size_for(qr.modules_count, size_mm, dpi)
+    img = qr.make_image(fill_color='black', back_color='white')
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def render_svg(payload, size_mm):
+    """
+    SVG con un único path (una línea por fila, tramos horizontales unidos)
+    en unidades de módulo; ``size_mm`` solo fija width/height.
+    """
+    matrix = _make_qr(payload).get_matrix()
+    side = len(matrix)
+    path = []
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < side:
+            if not row[x]:
+                x += 1
+                continue
+            run = 1
+            while x + run < side and row[x + run]:
+                run += 1
+            path.append(f'M{x} {y}h{run}v1h-{run}z')
+            x += run
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{size_mm}mm" height="{size_mm}mm" '
+        f'viewBox="0 0 {side} {side}" shape-rendering="crispEdges">'
+        f'<rect width="{side}" height="{side}" fill="#fff"/>'
+        f'<path d="{"".join(path)}" fill="#000"/></svg>'
+    ).encode('ascii')
+
+
+def render(payload, image_format, size_mm, dpi):
+    """(mimetype, bytes) de la imagen del QR en ``image_format`` ('svg' o 'png')."""
+    if image_format == 'png':
+        return 'image/png', render_png(payload, size_mm, dpi)
+    return 'image/svg+xml', render_svg(payload, size_mm)
+
+
+def data_uri(payload, image_format, size_mm, dpi):
+    """Imagen del QR como data URI para embeber en el HTML del reporte."""
+    mimetype, content = render_cached(payload, image_format, size_mm, dpi)
+    return f'data:{mimetype};base64,{base64.b64encode(content).decode("ascii")}'
+
+
+# Memo de imágenes por worker: clave (hash del payload, formato, tamaño, dpi)
+MEMO_MAX_ENTRIES = 512
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+
+
+def payload_hash(payload):
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def render_cached(payload, image_format, size_mm, dpi):
+    """Como ``render``, con memo LRU por worker (el payload de un CAE no cambia)."""
+    key = (payload_hash(payload), image_format, size_mm, dpi)
+    with _memo_lock:
+        if key in _memo:
+            _memo.move_to_end(key)
+            return _memo[key]
+    result = render(payload, image_format, size_mm, dpi)
+    with _memo_lock:
+        _memo[key] = result
+        while len(_memo) > MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+    return result
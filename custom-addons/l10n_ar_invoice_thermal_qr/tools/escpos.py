@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Armado de tickets ESC/POS para impresoras térmicas de 80mm.
+
+Genera directamente los bytes que entiende la impresora (Epson y
+compatibles), sin pasar por QWeb ni wkhtmltopdf. El QR de AFIP se imprime
+con el comando nativo de la impresora (GS ( k), a partir del payload.
+
+``thermal_invoice`` y ``ticket`` arman los dos formatos a partir de un dict
+plano (account.move._get_escpos_data), así la salida se puede comparar
+byte a byte con los fixtures de tests/fixtures/.
+"""
+
+ESC = b'\x1b'
+GS = b'\x1d'
+
+# Fuente A en 80mm: 576 puntos / 12 = 48 columnas
+LINE_WIDTH = 48
+# Página de códigos PC858 (latin-1 de DOS con €): ESC t 19
+CODEPAGE = 'cp858'
+CODEPAGE_NUMBER = 19
+
+ALIGN_LEFT, ALIGN_CENTER, ALIGN_RIGHT = 0, 1, 2
+
+# Corrección de errores del QR: L, M, Q, H
+QR_ERROR_CORRECTION = {'L': 48, 'M': 49, 'Q': 50, 'H': 51}
+DEFAULT_QR_MODULE_SIZE = 4
+
+
+class EscPosBuilder:
+    """Acumula comandos y texto; ``getvalue()`` devuelve los bytes del ticket."""
+
+    def __init__(self, width=LINE_WIDTH):
+        self.width = width
+        self._parts = [ESC + b'@', ESC + b't' + bytes([CODEPAGE_NUMBER])]
+
+    def _raw(self, data):
+        self._parts.append(data)
+        return self
+
+    def align(self, alignment):
+        return self._raw(ESC + b'a' + bytes([alignment]))
+
+    def bold(self, enabled=True):
+        return self._raw(ESC + b'E' + bytes([1 if enabled else 0]))
+
+    def size(self, width=1, height=1):
+        """Multiplicador de ancho y alto del carácter (1-8)."""
+        return self._raw(GS + b'!' + bytes([((width - 1) << 4) | (height - 1)]))
+
+    def text(self, value):
+        return self._raw(str(value).encode(CODEPAGE, errors='replace'))
+
+    def line(self, value=''):
+        return self.text(value)._raw(b'\n')
+
+    def wrapped(self, value):
+        """Texto largo partido en líneas del ancho del papel."""
+        value = str(value or '')
+        if not value:
+            return self
+        for start in range(0, len(value), self.width):
+            self.line(value[start:start + self.width])
+        return self
+
+    def columns(self, left, right):
+        """``left`` a la izquierda y ``right`` alineado a la derecha en la misma línea."""
+        left, right = str(left), str(right)
+        space = self.width - len(right) - 1
+        if len(left) > space:
+            self.wrapped(left)
+            left = ''
+        return self.line(left.ljust(self.width - len(right)) + right)
+
+    def separator(self, char='-'):
+        return self.line(char * self.width)
+
+    def feed(self, lines=1):
+        return self._raw(ESC + b'd' + bytes([lines]))
+
+    def qr(self, data, module_size=DEFAULT_QR_MODULE_SIZE, error_correction='M'):
+        """QR nativo (GS ( k): modelo 2, tamaño de módulo, corrección, datos e impresión."""
+        payload = data.encode('ascii')
+        store_length = len(payload) + 3
+        self._raw(GS + b'(k\x04\x001A2\x00')
+        self._raw(GS + b'(k\x03\x001C' + bytes([module_size]))
+        self._raw(GS + b'(k\x03\x001E' + bytes([QR_ERROR_CORRECTION[error_correction]]))
+        self._raw(GS + b'(k' + bytes([store_length % 256, store_length // 256]) + b'1P0' + payload)
+        return self._raw(GS + b'(k\x03\x001Q0')
+
+    def cut(self):
+        """Avanza el papel y hace corte parcial."""
+        return self._raw(GS + b'VB\x00')
+
+    def getvalue(self):
+        return b''.join(self._parts)
+
+
+def _money(value):
+    return f'${value:.2f}'
+
+
+def _afip(builder, data, module_size, due_label):
+    """CAE/CAEA, vencimiento y QR AFIP nativo."""
+    if not data['auth_code']:
+        return
+    builder.align(ALIGN_CENTER)
+    builder.line(f'{data["auth_mode"] or "CAE"}: {data["auth_code"]}')
+    if data['auth_code_due']:
+        builder.line(f'{due_label}: {data["auth_code_due"]}')
+    if data['qr_payload']:
+        builder.qr(data['qr_payload'], module_size=module_size)
+    builder.align(ALIGN_LEFT)
+
+
+def thermal_invoice(data, module_size=DEFAULT_QR_MODULE_SIZE):
+    """
+    Bytes del comprobante con los mismos datos y orden que el reporte QWeb
+    report_invoice_thermal_80mm. ``data`` es el dict de
+    account.move._get_escpos_data().
+    """
+    builder = EscPosBuilder()
+    builder.align(ALIGN_CENTER).bold().line(data['company']['name']).bold(False)
+    builder.line(f'CUIT: {data["company"]["vat"]}')
+    builder.separator()
+    builder.bold().line(data['document_type']).bold(False)
+    builder.line(f'Nro: {data["name"]}')
+    builder.align(ALIGN_LEFT).separator()
+
+    builder.bold().line('CLIENTE:').bold(False).wrapped(data['partner']['name'])
+    builder.separator()
+    builder.line(f'Fecha: {data["date"]}')
+    builder.separator()
+
+    for line in data['lines']:
+        if not (line['product_name'] and line['quantity'] and line['price_unit']):
+            continue
+        builder.bold().wrapped(line['product_name']).bold(False)
+        builder.line(f'{line["quantity"]:.2f} x {_money(line["price_unit"])} = {_money(line["price_subtotal"])}')
+    builder.separator()
+
+    builder.columns('Subtotal:', _money(data['amount_untaxed']))
+    builder.bold().columns('TOTAL:', _money(data['amount_total'])).bold(False)
+    builder.line(f'IVA contenido: {_money(data["amount_tax"])}')
+    builder.separator()
+
+    _afip(builder, data, module_size, 'Vto CAE')
+    builder.separator()
+    builder.align(ALIGN_CENTER)
+    builder.wrapped('Regimen de Transparencia Fiscal para el Consumidor Final (Ley 27.743)')
+    builder.separator()
+    builder.line('Gracias por su compra')
+    return builder.feed(3).cut().getvalue()
+
+
+def ticket(data, module_size=DEFAULT_QR_MODULE_SIZE):
+    """Bytes del Ticket 80mm de l10n_ar_thermal_ticket, a partir del mismo ``data``."""
+    company, partner = data['company'], data['partner']
+    builder = EscPosBuilder()
+
+    builder.align(ALIGN_CENTER).bold().size(2, 2).wrapped(company['name']).size().bold(False)
+    if company['responsibility']:
+        builder.line(company['responsibility'])
+    builder.line(f'CUIT: {company["vat"]}')
+    if company['street']:
+        builder.wrapped(company['street'])
+    builder.separator()
+
+    builder.bold().line(data['document_type'] or 'FACTURA').bold(False)
+    builder.line(f'Nro: {data["name"]}')
+    if data['date']:
+        builder.line(f'Fecha: {data["date"]}')
+    builder.align(ALIGN_LEFT).separator()
+
+    builder.line('CLIENTE:').wrapped(partner['name'])
+    if partner['vat']:
+        builder.line(f'{partner["id_type"]}: {partner["vat"]}' if partner['id_type'] else partner['vat'])
+    if partner['responsibility']:
+        builder.line(partner['responsibility'])
+    builder.separator()
+
+    for line in data['lines']:
+        builder.wrapped(line['product_name'] or line['name'])
+        detail = f'  {line["quantity"]:.2f} x {_money(line["price_unit"])}'
+        if line['discount']:
+            detail += f' (-{line["discount"]:.0f}%)'
+        builder.columns(detail, _money(line['price_subtotal']))
+    builder.separator()
+
+    builder.columns('Subtotal:', _money(data['amount_untaxed']))
+    if data['amount_tax']:
+        builder.columns('IVA:', _money(data['amount_tax']))
+    builder.bold().columns('TOTAL:', _money(data['amount_total'])).bold(False)
+    builder.separator('=')
+
+    _afip(builder, data, module_size, 'Vto')
+    builder.separator()
+    builder.align(ALIGN_CENTER).line('Gracias por su compra')
+    if company['website']:
+        builder.line(company['website'])
+    return builder.feed(3).cut().getvalue()
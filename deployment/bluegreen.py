@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Odoo by Blink - Reinicio blue/green
+===================================
+
+Reinicio sin cortes de un host: en lugar de reiniciar la instancia que
+atiende el tráfico, se levanta otra en el puerto alternativo, se espera a
+que cargue el registry y pase los health checks, se cambia el upstream del
+proxy (escritura atómica + reload de Nginx, que es graceful) y recién
+entonces se drena y se detiene la instancia anterior.
+
+Puertos: http_port (blue) y bluegreen_port (green, por defecto
+http_port + 1000). La instancia activa queda guardada en
+deployment/state/<host>.bluegreen.json.
+
+Claves opcionales en [options] del host (``{port}`` y ``{service}`` se
+reemplazan en los comandos):
+
+    bluegreen_port            puerto alternativo
+    bluegreen_start_cmd       default: sudo systemctl start {service}@{port}
+    bluegreen_stop_cmd        default: sudo systemctl stop {service}@{port}
+    bluegreen_upstream_file   default: /etc/nginx/conf.d/{service}-upstream.conf
+    bluegreen_reload_cmd      default: sudo nginx -s reload
+    bluegreen_ready_timeout   segundos para que la nueva instancia esté lista (300)
+    bluegreen_drain_seconds   espera antes de detener la anterior (60)
+
+La unidad systemd ``{service}@.service`` debe arrancar Odoo con
+``--http-port=%i`` (y un gevent_port propio por puerto si hay workers).
+
+Migración desde la unidad simple ``{service}.service``: el primer cambio
+detiene ``{service}@<http_port>``, no la unidad simple, que seguiría
+escuchando en http_port. Antes del primer reinicio blue/green hay que
+pasarla a la unidad con plantilla, en el mismo puerto:
+
+    sudo systemctl disable --now {service}
+    sudo systemctl enable --now {service}@<http_port>
+
+Si el puerto de la nueva instancia ya está ocupado (una instancia vieja
+que quedó corriendo), el reinicio falla antes de arrancar nada: sus
+health checks responderían con el código anterior.
+
+Los comandos corren en la máquina del deploy, así que el reinicio
+blue/green solo se hace desde el servidor del host (ver deploy.is_local_host).
+
+Para probarlo de punta a punta sin Odoo ni Nginx alcanza con el servidor
+stub de healthcheck.py, que responde en los health paths (así lo hacen los
+tests de deployment/tests):
+
+    bluegreen_start_cmd = python3 deployment/healthcheck.py --serve {port}
+    bluegreen_stop_cmd = pkill -f "healthcheck[.]py --serve {port}"
+    bluegreen_upstream_file = /tmp/upstream.conf
+    bluegreen_reload_cmd = true
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import healthcheck
+
+DEFAULT_PORT_OFFSET = 1000
+DEFAULT_START_CMD = 'sudo systemctl start {service}@{port}'
+DEFAULT_STOP_CMD = 'sudo systemctl stop {service}@{port}'
+DEFAULT_UPSTREAM_FILE = '/etc/nginx/conf.d/{service}-upstream.conf'
+DEFAULT_RELOAD_CMD = 'sudo nginx -s reload'
+DEFAULT_READY_TIMEOUT = 300
+DEFAULT_DRAIN_SECONDS = 60
+# Tiempo en que un comando de inicio que falla de entrada debería terminar
+START_CHECK_SECONDS = 2
+# Requests de calentamiento sobre /web/login una vez que responde /web/health
+WARMUP_SAMPLES = 5
+
+UPSTREAM_TEMPLATE = """# Generado por deployment/bluegreen.py, no editar a mano
+upstream {service} {{
+    server 127.0.0.1:{port};
+}}
+"""
+
+
+class BlueGreenError(Exception):
+    pass
+
+
+class BlueGreenRestart:
+
+    def __init__(self, host, opts, service, state_dir, log=print,
+                 health_paths=('/web/health', '/web/login')):
+        self.host = host
+        self.service = service
+        self.state_dir = Path(state_dir)
+        self.log = log
+        self.health_paths = tuple(health_paths)
+        self.blue_port = int(opts['http_port'])
+        self.green_port = int(opts.get('bluegreen_port') or self.blue_port + DEFAULT_PORT_OFFSET)
+        self.start_cmd = opts.get('bluegreen_start_cmd', DEFAULT_START_CMD)
+        self.stop_cmd = opts.get('bluegreen_stop_cmd', DEFAULT_STOP_CMD)
+        self.upstream_file = Path(opts.get('bluegreen_upstream_file', DEFAULT_UPSTREAM_FILE).format(service=service))
+        self.reload_cmd = opts.get('bluegreen_reload_cmd', DEFAULT_RELOAD_CMD)
+        self.ready_timeout = float(opts.get('bluegreen_ready_timeout', DEFAULT_READY_TIMEOUT))
+        self.drain_seconds = float(opts.get('bluegreen_drain_seconds', DEFAULT_DRAIN_SECONDS))
+
+    @property
+    def state_file(self):
+        return self.state_dir / f"{self.host}.bluegreen.json"
+
+    def active_port(self):
+        """Puerto que atiende el tráfico hoy (blue si nunca hubo un cambio)."""
+        try:
+            return int(json.loads(self.state_file.read_text(encoding='utf-8'))['active_port'])
+        except (OSError, ValueError, KeyError):
+            return self.blue_port
+
+    def save_active_port(self, port):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.state_file.write_text(json.dumps({'active_port': port}), encoding='utf-8')
+
+    def _command(self, template, port):
+        return template.format(port=port, service=self.service)
+
+    def start(self, port):
+        """
+        Arranca la instancia en ``port``. Con systemd el comando vuelve en
+        seguida; un proceso en primer plano (stub) queda corriendo en su propia
+        sesión, fuera del ciclo de vida de este script.
+        """
+        cmd = self._command(self.start_cmd, port)
+        self.log(f"Iniciando instancia en puerto {port}: {cmd}")
+        process = subprocess.Popen(cmd, shell=True, start_new_session=True,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            returncode = process.wait(timeout=START_CHECK_SECONDS)
+        except subprocess.TimeoutExpired:
+            return
+        if returncode != 0:
+            raise BlueGreenError(f"El comando de inicio terminó con código {returncode}: {cmd}")
+
+    def _run(self, cmd):
+        """Ejecuta ``cmd`` y pasa su salida a ``log`` (sirve en el modo flota)."""
+        result = subprocess.run(cmd, shell=True, check=False, capture_output=True, text=True)
+        for line in (result.stdout + result.stderr).splitlines():
+            self.log(line)
+        return result.returncode
+
+    def stop(self, port):
+        cmd = self._command(self.stop_cmd, port)
+        self.log(f"Deteniendo instancia en puerto {port}: {cmd}")
+        self._run(cmd)
+
+    def wait_ready(self, port):
+        """
+        Espera a que la instancia en ``port`` acepte conexiones y responda 200
+        en todos los health paths (el primer request a /web/login carga el
+        registry de la base); después la calienta con algunos requests más.
+        """
+        base_url = f"http://127.0.0.1:{port}"
+        deadline = time.monotonic() + self.ready_timeout
+        while True:
+            if healthcheck.check_tcp('127.0.0.1', port, timeout=2)[0]:
+                report = healthcheck.run_checks(base_url, '127.0.0.1', port, paths=self.health_paths,
+                                                samples=1, concurrency=1, timeout=self.ready_timeout)
+                if report['ok']:
+                    break
+            if time.monotonic() > deadline:
+                raise BlueGreenError(f"La instancia en puerto {port} no quedó lista en {self.ready_timeout:.0f} s")
+            time.sleep(1)
+
+        report = healthcheck.run_checks(base_url, '127.0.0.1', port, paths=self.health_paths,
+                                        samples=WARMUP_SAMPLES)
+        if not report['ok']:
+            raise BlueGreenError(f"La instancia en puerto {port} falla en el calentamiento")
+        for path, result in report['endpoints'].items():
+            self.log(f"Puerto {port} listo: {healthcheck.format_endpoint(path, result)}")
+
+    def switch(self, port):
+        """
+        Apunta el upstream del proxy a ``port``: se escribe un archivo temporal
+        en el mismo directorio y se renombra (atómico), y después se recarga el
+        proxy. Si el reload falla se restaura el upstream anterior.
+        """
+        previous = self.upstream_file.read_text(encoding='utf-8') if self.upstream_file.exists() else None
+        self._write_upstream(UPSTREAM_TEMPLATE.format(service=self.service, port=port))
+        cmd = self._command(self.reload_cmd, port)
+        self.log(f"Cambiando upstream a puerto {port}: {cmd}")
+        returncode = self._run(cmd)
+        if returncode != 0:
+            if previous is None:
+                self.upstream_file.unlink()
+            else:
+                self._write_upstream(previous)
+            raise BlueGreenError(f"El reload del proxy falló con código {returncode}; upstream restaurado")
+
+    def _write_upstream(self, content):
+        self.upstream_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.upstream_file.parent, prefix='.upstream-')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+                tmp.write(content)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.upstream_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def run(self):
+        """Reinicio completo; devuelve el puerto que queda activo."""
+        old_port = self.active_port()
+        new_port = self.green_port if old_port == self.blue_port else self.blue_port
+        self.log(f"Activo: {old_port}; nueva instancia: {new_port}")
+
+        if healthcheck.check_tcp('127.0.0.1', new_port, timeout=2)[0]:
+            raise BlueGreenError(
+                f"El puerto {new_port} ya está en uso (¿instancia anterior o unidad {self.service} sin "
+                f"plantilla?): detenerla antes del reinicio blue/green")
+
+        start = time.monotonic()
+        self.start(new_port)
+        try:
+            self.wait_ready(new_port)
+            self.switch(new_port)
+        except BlueGreenError:
+            # La instancia anterior sigue atendiendo; se descarta la nueva
+            self.stop(new_port)
+            raise
+        self.save_active_port(new_port)
+        self.log(f"Tráfico en puerto {new_port} ({time.monotonic() - start:.1f} s desde el inicio)")
+
+        if self.drain_seconds:
+            self.log(f"Drenando puerto {old_port} durante {self.drain_seconds:.0f} s")
+            time.sleep(self.drain_seconds)
+        self.stop(old_port)
+        return new_port
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Odoo by Blink - Ajuste de capacidad por servidor
+================================================
+
+Cada host trae workers, límites de memoria, max_cron_threads y db_maxconn
+fijos, sin importar la máquina ni cuántas instancias la comparten. Este
+script reparte los recursos de un servidor entre sus instancias:
+
+- CPU: en total (2 × CPUs) + 1 workers, con un mínimo por instancia
+  (2 en producción, 1 en el resto) y el sobrante según el peso de cada una
+  (production 3, resto 1; se puede fijar con ``capacity_weight``).
+- Memoria: RAM menos lo reservado para el sistema y PostgreSQL, dividida
+  entre todos los procesos (workers + cron + gevent);
+  limit_memory_soft es esa porción y limit_memory_hard un 25% más.
+- Conexiones: cada proceso de Odoo tiene su propio pool de hasta
+  db_maxconn conexiones, así que el peor caso es procesos × db_maxconn
+  por instancia, y la suma de todas tiene que entrar en max_connections
+  de PostgreSQL (menos las reservadas).
+
+Las instancias de un servidor son los hosts con la misma clave ``server``
+en su configuración; un host sin la clave es un servidor en sí mismo. Los
+recursos del servidor salen de las claves ``server_cpus``, ``server_ram_gb``
+y (opcional) ``server_pg_max_connections`` de sus hosts, o de --cpus /
+--ram-gb / --pg-max-connections. Sin max_connections se consulta con psql,
+salvo que la base esté en el PostgreSQL local de otra máquina. Un servidor
+sin CPUs o RAM declaradas se omite: los recursos de la máquina donde corre
+el script no dicen nada de otra.
+
+Uso:
+    ./deployment/capacity_tuner.py
+    ./deployment/capacity_tuner.py --server ec2-prod --cpus 4 --ram-gb 16 --pg-max-connections 200
+    ./deployment/capacity_tuner.py --snippets
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import config_compiler
+from deploy import (is_local_db, is_local_host, print_error, print_header, print_info, print_success, print_warning,
+                    select_hosts)
+from fleet_upgrade import postgres_connections
+
+MB = 1024 * 1024
+GB = 1024 * MB
+# Reservado para el sistema operativo y procesos auxiliares
+OS_RESERVED_RAM = 1 * GB
+# Porción de la RAM para PostgreSQL cuando corre en la misma máquina
+POSTGRES_RAM_SHARE = 0.25
+# superuser_reserved_connections y margen para mantenimiento/psql
+PG_RESERVED_CONNECTIONS = 10
+DEFAULT_PG_MAX_CONNECTIONS = 100
+MIN_MEMORY_SOFT = 512 * MB
+MAX_MEMORY_SOFT = 2048 * MB
+HARD_OVER_SOFT = 1.25
+# Un worker usa 1-2 conexiones a la vez; el cron, 2
+MIN_DB_MAXCONN = 4
+MAX_DB_MAXCONN = 64
+ENVIRONMENT_WEIGHTS = {'production': 3}
+DEFAULT_WEIGHT = 1
+
+
+class Instance:
+    """Una instancia de Odoo del servidor, con su configuración compilada."""
+
+    def __init__(self, host, values):
+        self.host = host
+        self.values = values
+        self.environment = values.get('environment', '')
+        self.weight = float(values.get('capacity_weight') or ENVIRONMENT_WEIGHTS.get(self.environment, DEFAULT_WEIGHT))
+        self.recommended = {}
+
+    def current(self, key, default=0):
+        try:
+            return int(self.values.get(key, default))
+        except ValueError:
+            return default
+
+    @staticmethod
+    def processes_for(workers, cron_threads):
+        """Procesos que abren conexiones: en modo threaded (workers = 0) es uno solo."""
+        return workers + cron_threads + 1 if workers else 1
+
+
+def _config_number(instances, key, cast):
+    """Primer valor de ``key`` entre las configuraciones de ``instances``."""
+    for instance in instances:
+        value = instance.values.get(key)
+        if value:
+            try:
+                return cast(value)
+            except ValueError:
+                print_warning(f"{instance.host}: {key} = {value} no es un número, se ignora")
+    return None
+
+
+def detect_machine(instances, cpus=None, ram_bytes=None, pg_max_connections=None, pg_local=None):
+    """
+    Recursos del servidor de ``instances``: lo indicado explícitamente o las
+    claves server_* de su configuración. None si faltan CPUs o RAM.
+    """
+    if cpus is None:
+        cpus = _config_number(instances, 'server_cpus', int)
+    if ram_bytes is None:
+        ram_gb = _config_number(instances, 'server_ram_gb', float)
+        ram_bytes = int(ram_gb * GB) if ram_gb else None
+    if not cpus or not ram_bytes:
+        return None
+    values = instances[0].values
+    if pg_local is None:
+        pg_local = is_local_db(values)
+    if pg_max_connections is None:
+        pg_max_connections = _config_number(instances, 'server_pg_max_connections', int)
+    if pg_max_connections is None:
+        # psql a "localhost" desde otra máquina consultaría otro PostgreSQL
+        connections = postgres_connections(values) if not pg_local or is_local_host(values) else None
+        pg_max_connections = connections[0] if connections else DEFAULT_PG_MAX_CONNECTIONS
+    return {'cpus': cpus, 'ram_bytes': ram_bytes, 'pg_max_connections': pg_max_connections, 'pg_local': pg_local}
+
+
+def budgets(machine):
+    ram = machine['ram_bytes'] - OS_RESERVED_RAM
+    if machine['pg_local']:
+        ram -= machine['ram_bytes'] * POSTGRES_RAM_SHARE
+    return {
+        'workers': 2 * machine['cpus'] + 1,
+        'ram_bytes': max(ram, 0),
+        'connections': machine['pg_max_connections'] - PG_RESERVED_CONNECTIONS,
+    }
+
+
+def load_instances(repo_root, server=None, include_local=False):
+    compiler = config_compiler.ConfigCompiler(repo_root)
+    instances = []
+    for host in select_hosts(repo_root):
+        try:
+            values = compiler.compile_values(host)
+        except config_compiler.ConfigError as e:
+            print_warning(f"{host}: configuración inválida, se omite ({e})")
+            continue
+        if values.get('environment') == 'local' and not include_local:
+            continue
+        if server and values.get('server') != server:
+            continue
+        instances.append(Instance(host, values))
+    return instances
+
+
+def server_key(instance):
+    """Servidor de la instancia: la clave ``server`` o, sin ella, el propio host."""
+    return instance.values.get('server') or instance.host
+
+
+def group_by_server(instances):
+    servers = {}
+    for instance in instances:
+        servers.setdefault(server_key(instance), []).append(instance)
+    return servers
+
+
+def same_server(instances, host, values):
+    """Instancias que comparten servidor con ``host`` (configuración ``values``)."""
+    server = values.get('server') or host
+    return [instance for instance in instances if server_key(instance) == server]
+
+
+def _distribute(total, weights):
+    """Reparte ``total`` unidades enteras según ``weights`` (mayor resto)."""
+    weight_sum = sum(weights) or 1
+    shares = [total * weight / weight_sum for weight in weights]
+    result = [int(share) for share in shares]
+    remainders = sorted(range(len(weights)), key=lambda i: shares[i] - result[i], reverse=True)
+    for i in remainders[:total - sum(result)]:
+        result[i] += 1
+    return result
+
+
+def recommend(instances, machine):
+    """
+    Calcula instance.recommended para cada instancia y devuelve la lista de
+    advertencias si ni con los mínimos entra todo en el servidor.
+    """
+    warnings = []
+    budget = budgets(machine)
+    if not instances:
+        return warnings
+
+    for instance in instances:
+        instance.recommended['max_cron_threads'] = 2 if instance.environment == 'production' and machine['cpus'] >= 8 else 1
+
+    # CPU: mínimos primero, sobrante por peso. El total de workers también
+    # lo limitan la RAM y las conexiones (cada proceso necesita su mínimo)
+    minimums = [2 if instance.environment == 'production' else 1 for instance in instances]
+    other_processes = sum(instance.recommended['max_cron_threads'] + 1 for instance in instances)
+    max_workers = min(
+        budget['workers'],
+        int(budget['ram_bytes'] // MIN_MEMORY_SOFT) - other_processes,
+        budget['connections'] // MIN_DB_MAXCONN - other_processes,
+    )
+    spare = max_workers - sum(minimums)
+    if sum(minimums) > budget['workers']:
+        warnings.append(f"CPU: los mínimos suman {sum(minimums)} workers y el servidor admite {budget['workers']}")
+    extra = _distribute(max(spare, 0), [instance.weight for instance in instances])
+    for instance, minimum, more in zip(instances, minimums, extra):
+        instance.recommended['workers'] = minimum + more
+
+    processes = {instance.host: Instance.processes_for(instance.recommended['workers'],
+                                                       instance.recommended['max_cron_threads'])
+                 for instance in instances}
+    total_processes = sum(processes.values())
+
+    # Memoria: la misma porción por proceso
+    soft = budget['ram_bytes'] / total_processes
+    if soft < MIN_MEMORY_SOFT:
+        warnings.append(
+            f"Memoria: {budget['ram_bytes'] / GB:.1f} GB para {total_processes} procesos "
+            f"({soft / MB:.0f} MB c/u, mínimo {MIN_MEMORY_SOFT / MB:.0f} MB)")
+    soft = int(min(max(soft, MIN_MEMORY_SOFT), MAX_MEMORY_SOFT))
+    soft -= soft % MB
+
+    # Conexiones: procesos × db_maxconn de todas las instancias <= presupuesto
+    maxconn = budget['connections'] // total_processes
+    if maxconn < MIN_DB_MAXCONN:
+        warnings.append(
+            f"PostgreSQL: {budget['connections']} conexiones para {total_processes} procesos "
+            f"({maxconn} c/u, mínimo {MIN_DB_MAXCONN}); subir max_connections o usar un pooler")
+    maxconn = min(max(maxconn, MIN_DB_MAXCONN), MAX_DB_MAXCONN)
+
+    for instance in instances:
+        instance.recommended.update({
+            'limit_memory_soft': soft,
+            'limit_memory_hard': int(soft * HARD_OVER_SOFT),
+            'db_maxconn': maxconn,
+        })
+    return warnings
+
+
+def oversubscription_warnings(instances, machine):
+    """Advertencias sobre la configuración actual de ``instances`` en ``machine``."""
+    budget = budgets(machine)
+    warnings = []
+    workers = sum(instance.current('workers') for instance in instances)
+    connections = memory = 0
+    for instance in instances:
+        processes = Instance.processes_for(instance.current('workers'), instance.current('max_cron_threads', 1))
+        connections += processes * instance.current('db_maxconn', MAX_DB_MAXCONN)
+        if instance.current('workers'):
+            memory += processes * instance.current('limit_memory_soft', MAX_MEMORY_SOFT)
+    hosts = ', '.join(instance.host for instance in instances)
+    if workers > budget['workers']:
+        warnings.append(f"CPU: {workers} workers en total ({hosts}) para {machine['cpus']} CPUs "
+                        f"(máximo recomendado {budget['workers']})")
+    if connections > budget['connections']:
+        warnings.append(f"PostgreSQL: hasta {connections} conexiones (procesos × db_maxconn de {hosts}) "
+                        f"con max_connections = {machine['pg_max_connections']}")
+    if memory > budget['ram_bytes']:
+        warnings.append(f"Memoria: limit_memory_soft × procesos suma {memory / GB:.1f} GB y quedan "
+                        f"{budget['ram_bytes'] / GB:.1f} GB para Odoo")
+    return warnings
+
+
+def print_recommendations(instances, machine, snippets=False):
+    budget = budgets(machine)
+    print_info(f"Servidor: {machine['cpus']} CPUs, {machine['ram_bytes'] / GB:.1f} GB RAM, "
+               f"PostgreSQL max_connections = {machine['pg_max_connections']}")
+    print_info(f"Presupuesto: {budget['workers']} workers, {budget['ram_bytes'] / GB:.1f} GB para Odoo, "
+               f"{budget['connections']} conexiones")
+    print(f"\n{'HOST':<36} {'ENTORNO':<11} {'PESO':>4} {'WORKERS':>9} {'CRON':>6} "
+          f"{'SOFT MB':>13} {'HARD MB':>13} {'DB_MAXCONN':>11}")
+    for instance in instances:
+        rec = instance.recommended
+        print(
+            f"{instance.host:<36} {instance.environment:<11} {instance.weight:>4.0f} "
+            f"{instance.current('workers'):>4}→{rec['workers']:<4} "
+            f"{instance.current('max_cron_threads', 1):>2}→{rec['max_cron_threads']:<3} "
+            f"{instance.current('limit_memory_soft') // MB:>6}→{rec['limit_memory_soft'] // MB:<6} "
+            f"{instance.current('limit_memory_hard') // MB:>6}→{rec['limit_memory_hard'] // MB:<6} "
+            f"{instance.current('db_maxconn', MAX_DB_MAXCONN):>5}→{rec['db_maxconn']:<5}")
+    print()
+    if snippets:
+        for instance in instances:
+            print(f"# config/hosts/{instance.host}.conf")
+            for key, value in instance.recommended.items():
+                print(f"{key} = {value}")
+            print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recomendar workers, memoria, cron y db_maxconn por instancia")
+    parser.add_argument('--server', help='Solo hosts con esta clave server (default: todos los servidores)')
+    parser.add_argument('--include-local', action='store_true', help='Incluir hosts con environment = local')
+    parser.add_argument('--cpus', type=int, help='CPUs del servidor (default: clave server_cpus)')
+    parser.add_argument('--ram-gb', type=float, help='RAM del servidor en GB (default: clave server_ram_gb)')
+    parser.add_argument('--pg-max-connections', type=int,
+                        help='max_connections de PostgreSQL (default: clave server_pg_max_connections o psql)')
+    parser.add_argument('--pg-remote', action='store_true', help='PostgreSQL corre en otra máquina (no se le reserva RAM)')
+    parser.add_argument('--snippets', action='store_true', help='Mostrar los valores recomendados listos para pegar')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).parent.parent
+    instances = load_instances(repo_root, server=args.server, include_local=args.include_local)
+    if not instances:
+        print_error("Ningún host para ese servidor")
+        sys.exit(1)
+
+    report = {}
+    failed = False
+    for server, server_instances in group_by_server(instances).items():
+        machine = detect_machine(
+            server_instances, cpus=args.cpus,
+            ram_bytes=int(args.ram_gb * GB) if args.ram_gb else None,
+            pg_max_connections=args.pg_max_connections, pg_local=False if args.pg_remote else None)
+        if not machine:
+            if not args.json:
+                print_warning(f"{server}: sin server_cpus / server_ram_gb en la configuración "
+                              f"(ni --cpus / --ram-gb), se omite")
+            continue
+        current_warnings = oversubscription_warnings(server_instances, machine)
+        warnings = recommend(server_instances, machine)
+        failed = failed or bool(warnings)
+
+        if args.json:
+            report[server] = {
+                'machine': machine,
+                'instances': {instance.host: instance.recommended for instance in server_instances},
+                'current_warnings': current_warnings,
+                'warnings': warnings,
+            }
+            continue
+        print_header(f"AJUSTE DE CAPACIDAD: {server}")
+        print_recommendations(server_instances, machine, snippets=args.snippets)
+        for warning in current_warnings:
+            print_warning(f"Configuración actual: {warning}")
+        for warning in warnings:
+            print_error(f"Ni con los mínimos alcanza: {warning}")
+        if not current_warnings and not warnings:
+            print_success("Sin sobresuscripción")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Odoo by Blink - Compilador de configuración
+===========================================
+
+Odoo no entiende ``extends = ../base.conf``: lee un único archivo. Este
+compilador resuelve las capas y escribe un odoo.conf plano y validado por
+host en deployment/build/<host>/odoo.conf.
+
+Precedencia (la última gana):
+
+    1. base      la cadena de ``extends`` (relativa a cada archivo), desde la raíz
+    2. template  config/templates/<environment>.template.conf, si existe
+                 (los valores ``<COMPLETAR...>`` del template se ignoran)
+    3. host      config/hosts/<host>.conf
+
+Los valores ``${VARIABLE}`` se reemplazan por variables de entorno (para
+secretos fuera de Git). La salida se cachea en deployment/state/config-cache/
+con una clave hecha de los hashes de todos los archivos de entrada y de las
+variables usadas: si nada cambió, no se vuelve a compilar.
+
+Uso:
+    ./deployment/config_compiler.py corteperfecto.somosblink.com
+    ./deployment/config_compiler.py --all --diff
+    ./deployment/config_compiler.py localhost --against /etc/odoo/odoo-dev.conf
+"""
+
+import argparse
+import configparser
+import difflib
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+# Sube si cambia la lógica de compilación, para invalidar el cache
+COMPILER_VERSION = 1
+SECTION = 'options'
+# Claves que solo usa el compilador y no pasan al odoo.conf
+COMPILER_KEYS = ('extends',)
+REQUIRED_KEYS = ('hostname', 'environment', 'db_name', 'http_port')
+INTEGER_KEYS = (
+    'http_port', 'db_port', 'db_maxconn', 'workers', 'max_cron_threads',
+    'limit_time_cpu', 'limit_time_real', 'limit_memory_soft', 'limit_memory_hard', 'limit_request',
+)
+PLACEHOLDER = '<COMPLETAR'
+ENV_VAR_RE = re.compile(r'\$\{(\w+)\}')
+
+
+class ConfigError(Exception):
+    pass
+
+
+def _read(path):
+    parser = configparser.RawConfigParser()
+    try:
+        with open(path, encoding='utf-8') as f:
+            parser.read_file(f)
+    except (OSError, configparser.Error) as e:
+        raise ConfigError(f"{path}: {e}")
+    if not parser.has_section(SECTION):
+        raise ConfigError(f"{path}: falta la sección [{SECTION}]")
+    return dict(parser.items(SECTION))
+
+
+def _extends_chain(path, seen=None):
+    """Archivos de la cadena de ``extends`` de ``path``, desde la raíz hasta ``path``."""
+    path = Path(path).resolve()
+    seen = seen or []
+    if path in seen:
+        raise ConfigError("extends circular: " + ' -> '.join(str(p) for p in seen + [path]))
+    values = _read(path)
+    parent = values.get('extends')
+    chain = _extends_chain(path.parent / parent, seen + [path]) if parent else []
+    return chain + [(path, values)]
+
+
+def _write_atomic(path, text, mode):
+    """
+    Escribe ``path`` en un temporal del mismo directorio y lo renombra: quien
+    lo lea en paralelo (otro host del modo flota, odoo-bin) ve el archivo
+    viejo o el nuevo completo, nunca uno a medio escribir.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+class ConfigCompiler:
+
+    def __init__(self, repo_root=None):
+        self.repo_root = Path(repo_root) if repo_root else Path(__file__).parent.parent
+        self.hosts_dir = self.repo_root / "config" / "hosts"
+        self.templates_dir = self.repo_root / "config" / "templates"
+        self.build_dir = self.repo_root / "deployment" / "build"
+        self.cache_dir = self.repo_root / "deployment" / "state" / "config-cache"
+
+    def host_file(self, host):
+        return self.hosts_dir / f"{host}.conf"
+
+    def output_file(self, host):
+        return self.build_dir / host / "odoo.conf"
+
+    def layers(self, host):
+        """[(nombre de la capa, archivo, valores)] en orden de precedencia creciente."""
+        chain = _extends_chain(self.host_file(host))
+        *bases, (host_path, host_values) = chain
+        layers = [('base', path, values) for path, values in bases]
+        environment = host_values.get('environment')
+        template = self.templates_dir / f"{environment}.template.conf"
+        if environment and template.exists():
+            values = {key: value for key, value in _read(template).items()
+                      if PLACEHOLDER not in value}
+            layers.append(('template', template.resolve(), values))
+        layers.append(('host', host_path, host_values))
+        return layers
+
+    def cache_key(self, layers):
+        digest = hashlib.sha256(f"v{COMPILER_VERSION}".encode())
+        env_vars = set()
+        for name, path, values in layers:
+            digest.update(f"{name}:{path}:".encode())
+            digest.update(path.read_bytes())
+            for value in values.values():
+                env_vars.update(ENV_VAR_RE.findall(value))
+        for var in sorted(env_vars):
+            digest.update(f"{var}={os.environ.get(var, '')}".encode())
+        return digest.hexdigest()
+
+    def merge(self, layers):
+        """Valores planos: cada capa pisa a las anteriores."""
+        merged = {}
+        for _name, _path, values in layers:
+            for key, value in values.items():
+                if key not in COMPILER_KEYS:
+                    merged[key] = value
+        for key, value in merged.items():
+            def substitute(match):
+                if match.group(1) not in os.environ:
+                    raise ConfigError(f"{key}: variable de entorno {match.group(1)} no definida")
+                return os.environ[match.group(1)]
+            merged[key] = ENV_VAR_RE.sub(substitute, value)
+        return merged
+
+    def validate(self, values):
+        errors = [f"falta {key}" for key in REQUIRED_KEYS if not values.get(key)]
+        errors += [f"{key} sin completar ({value})" for key, value in values.items() if PLACEHOLDER in value]
+        for key in INTEGER_KEYS:
+            if key in values:
+                try:
+                    int(values[key])
+                except ValueError:
+                    errors.append(f"{key} debe ser un entero: {values[key]}")
+        try:
+            if int(values.get('limit_memory_soft', 0)) > int(values.get('limit_memory_hard', 0) or sys.maxsize):
+                errors.append("limit_memory_soft mayor que limit_memory_hard")
+        except ValueError:
+            pass
+        return errors
+
+    def render(self, host, values, layers):
+        lines = [
+            f"# Generado por deployment/config_compiler.py para {host}, no editar a mano.",
+            "# Capas: " + ' < '.join(f"{name} ({path.name})" for name, path, _values in layers),
+            f"[{SECTION}]",
+        ]
+        for key in sorted(values):
+            value = values[key].replace('\n', '\n    ')
+            lines.append(f"{key} = {value}")
+        return '\n'.join(lines) + '\n'
+
+    def compile(self, host, write=True):
+        """
+        Texto del odoo.conf plano de ``host`` (del cache si ninguna entrada
+        cambió). Lanza ConfigError si la configuración no es válida.
+        """
+        layers = self.layers(host)
+        key = self.cache_key(layers)
+        cache_file = self.cache_dir / f"{host}.json"
+        try:
+            cached = json.loads(cache_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            cached = {}
+        if cached.get('key') == key:
+            text = cached['output']
+        else:
+            values = self.merge(layers)
+            errors = self.validate(values)
+            if errors:
+                raise ConfigError(f"{host}: " + '; '.join(errors))
+            text = self.render(host, values, layers)
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Tiene los secretos ya resueltos, igual que el odoo.conf
+            _write_atomic(cache_file, json.dumps({'key': key, 'output': text}), 0o600)
+        if write:
+            output = self.output_file(host)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            if not output.exists() or output.read_text(encoding='utf-8') != text:
+                _write_atomic(output, text, 0o640)
+        return text
+
+    def compile_values(self, host):
+        """Valores planos compilados de ``host`` (dict), para los scripts de deployment."""
+        parser = configparser.RawConfigParser()
+        parser.read_string(self.compile(host))
+        return dict(parser.items(SECTION))
+
+    def diff(self, host, against):
+        """Diff unificado entre ``against`` (lo desplegado) y la compilación actual."""
+        new = self.compile(host, write=False).splitlines(keepends=True)
+        against = Path(against)
+        old = against.read_text(encoding='utf-8').splitlines(keepends=True) if against.exists() else []
+        return ''.join(difflib.unified_diff(old, new, fromfile=str(against), tofile=f"{host} (compilado)"))
+
+
+def deployed_copy(repo_root, host):
+    """Copia del odoo.conf del último deployment exitoso (la guarda deploy.py)."""
+    return Path(repo_root) / "deployment" / "state" / f"{host}.odoo.conf"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compilar config/hosts/<host>.conf a un odoo.conf plano")
+    parser.add_argument('hosts', nargs='*', help='Hosts a compilar')
+    parser.add_argument('--all', action='store_true', help='Todos los hosts de config/hosts/')
+    parser.add_argument('--diff', action='store_true', help='Mostrar diff contra la versión desplegada')
+    parser.add_argument('--against', help='Archivo contra el que comparar (default: copia del último deployment)')
+    parser.add_argument('--print', dest='print_output', action='store_true', help='Mostrar el odoo.conf compilado')
+    args = parser.parse_args()
+
+    compiler = ConfigCompiler()
+    hosts = sorted(f.stem for f in compiler.hosts_dir.glob("*.conf")) if args.all else args.hosts
+    if not hosts:
+        parser.error('indicar hosts o --all')
+
+    ok = True
+    for host in hosts:
+        try:
+            text = compiler.compile(host)
+        except ConfigError as e:
+            print(f"✗ {e}")
+            ok = False
+            continue
+        print(f"✓ {host}: {compiler.output_file(host)}")
+        if args.print_output:
+            print(text)
+        if args.diff or args.against:
+            diff = compiler.diff(host, args.against or deployed_copy(compiler.repo_root, host))
+            print(diff or "  (sin cambios respecto de lo desplegado)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
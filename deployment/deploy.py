@@ -11,16 +11,43 @@ Uso:
     ./deployment/deploy.py --host corteperfecto-test.somosblink.com --branch test --auto
     ./deployment/deploy.py --host demo.somosblink.com --branch demo --reset-db
 
+Modo flota (varios hosts en paralelo, un log por host):
+    ./deployment/deploy.py --all --branch main --parallel 4
+    ./deployment/deploy.py --environment production --branch main --fail-fast
+    ./deployment/deploy.py --hosts 'corteperfecto*' --branch main
+    ./deployment/deploy.py --hosts 're:^(demo|blink)\\.' --branch main
+
+El modo flota solo despliega hosts que corren en esta máquina: environment
+local o clave ``server`` igual al nombre de este servidor (variable de
+entorno BLINK_SERVER, o el hostname). El resto se rechaza antes de empezar.
+
 """
 
 import argparse
 import configparser
+import fnmatch
+import json
 import os
+import re
+import shutil
+import socket
 import subprocess
 import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+import bluegreen
+import config_compiler
+import healthcheck
+import module_upgrade
+
+# db_host que apuntan al PostgreSQL de la máquina donde corre el host
+LOCAL_DB_HOSTS = ('', 'localhost', '127.0.0.1', '::1')
+
 # Colores para output
 class Colors:
     HEADER = '\033[95m'
@@ -51,25 +78,74 @@ def print_info(msg):
     print(f"{Colors.OKCYAN}ℹ {msg}{Colors.ENDC}")
 
 def run_command(cmd, cwd=None, check=True, capture_output=True):
-    """Ejecutar comando shell y retornar resultado."""
+    """
+    Ejecutar comando shell y retornar resultado.
+
+    La salida se muestra línea a línea a medida que llega (no al final), y
+    además se acumula en result.stdout / result.stderr si capture_output.
+    """
     print_info(f"Ejecutando: {cmd}")
-    try:
-        result = subprocess.run(
-            cmd,
-            shell=True,
-            cwd=cwd,
-            check=check,
-            capture_output=capture_output,
-            text=True
-        )
-        if result.stdout:
-            print(result.stdout)
-        return result
-    except subprocess.CalledProcessError as e:
+    if not capture_output:
+        return subprocess.run(cmd, shell=True, cwd=cwd, check=check, text=True)
+
+    process = subprocess.Popen(
+        cmd,
+        shell=True,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        bufsize=1,
+    )
+    # stderr en un thread aparte para que ninguno de los dos pipes se llene
+    stderr_lines = []
+    stderr_reader = threading.Thread(target=lambda: stderr_lines.extend(process.stderr))
+    stderr_reader.start()
+    stdout_lines = []
+    for line in process.stdout:
+        stdout_lines.append(line)
+        print(line, end='')
+    stderr_reader.join()
+    returncode = process.wait()
+
+    stdout, stderr = ''.join(stdout_lines), ''.join(stderr_lines)
+    if check and returncode != 0:
+        e = subprocess.CalledProcessError(returncode, cmd, output=stdout, stderr=stderr)
         print_error(f"Error ejecutando comando: {e}")
-        if e.stderr:
-            print(e.stderr)
-        raise
+        if stderr:
+            print(stderr)
+        raise e
+    return subprocess.CompletedProcess(cmd, returncode, stdout, stderr)
+
+
+class ThreadRoutedStream:
+    """
+    Reemplazo de sys.stdout para el modo flota: cada thread de deployment
+    escribe en el log de su host; el resto (tabla de estado, resumen) va a
+    la salida original.
+    """
+
+    ANSI_RE = re.compile(r'\x1b\[[0-9;]*m')
+
+    def __init__(self, default):
+        self.default = default
+        self._local = threading.local()
+
+    def route_to(self, stream):
+        self._local.stream = stream
+
+    def write(self, data):
+        stream = getattr(self._local, 'stream', None)
+        if stream is None:
+            return self.default.write(data)
+        return stream.write(self.ANSI_RE.sub('', data))
+
+    def flush(self):
+        stream = getattr(self._local, 'stream', None)
+        (stream or self.default).flush()
+
+    def isatty(self):
+        return self.default.isatty()
 
 class OdooDeployment:
     def __init__(self, host, branch, options):
@@ -79,6 +155,9 @@ class OdooDeployment:
         self.repo_root = Path(__file__).parent.parent
         self.config_file = self.repo_root / "config" / "hosts" / f"{host}.conf"
         self.config = None
+        self.compiled_config_file = None
+        # Paso en curso, lo muestra la tabla de estado del modo flota
+        self.current_step = None
 
     def validate_config(self):
         """Validar que existe configuración para el host."""
@@ -94,14 +173,24 @@ class OdooDeployment:
 
         print_success(f"Archivo de configuración encontrado: {self.config_file}")
 
-        # Leer configuración
-        self.config = configparser.ConfigParser()
+        # Compilar configuración: resuelve extends (base.conf), template y host
+        compiler = config_compiler.ConfigCompiler(self.repo_root)
         try:
-            self.config.read(self.config_file)
-            print_success("Configuración leída correctamente")
-        except Exception as e:
-            print_error(f"Error leyendo configuración: {e}")
+            compiled = compiler.compile(self.host)
+        except config_compiler.ConfigError as e:
+            print_error(f"Error compilando configuración: {e}")
             return False
+        self.compiled_config_file = compiler.output_file(self.host)
+        self.config = configparser.RawConfigParser()
+        self.config.read_string(compiled)
+        print_success(f"Configuración compilada: {self.compiled_config_file}")
+
+        diff = compiler.diff(self.host, config_compiler.deployed_copy(self.repo_root, self.host))
+        if diff:
+            changed = [line for line in diff.splitlines()
+                       if line[:1] in '+-' and not line.startswith(('+++', '---', '+#', '-#'))]
+            print_info(f"Cambios respecto de la configuración desplegada ({len(changed)} líneas):")
+            print(diff)
 
         # Validar valores críticos
         required_keys = ['hostname', 'environment', 'db_name', 'http_port']
@@ -128,8 +217,35 @@ class OdooDeployment:
         print_info(f"Base de datos: {opts.get('db_name', 'N/A')}")
         print_info(f"Puerto: {opts.get('http_port', 'N/A')}")
 
+        self.check_capacity()
         return True
 
+    def check_capacity(self):
+        """
+        Advertir si las instancias que comparten servidor con este host piden
+        más workers, memoria o conexiones de las que hay. Los recursos del
+        servidor salen de las claves server_cpus / server_ram_gb de la
+        configuración; sin ellas no se verifica. No bloquea el deployment.
+        """
+        opts = dict(self.config['options'])
+        if opts.get('environment') == 'local':
+            return
+        # Import diferido: capacity_tuner importa este módulo
+        import capacity_tuner
+        instances = capacity_tuner.same_server(capacity_tuner.load_instances(self.repo_root), self.host, opts)
+        if not instances:
+            return
+        machine = capacity_tuner.detect_machine(instances)
+        if not machine:
+            print_info("Capacidad: sin server_cpus / server_ram_gb en la configuración, no se verifica")
+            return
+        warnings = capacity_tuner.oversubscription_warnings(instances, machine)
+        for warning in warnings:
+            print_warning(f"Sobresuscripción: {warning}")
+        if warnings:
+            print_info("Valores recomendados: ./deployment/capacity_tuner.py"
+                       + (f" --server {opts['server']}" if opts.get('server') else ''))
+
     def check_git_status(self):
         """Verificar estado de Git y rama actual."""
         print_header("VERIFICANDO ESTADO DE GIT")
@@ -194,11 +310,28 @@ class OdooDeployment:
             print_warning("Validaciones omitidas (--skip-validations)")
             return True
 
-        # TODO: Agregar checks específicos según necesidad
-        # - Verificar que base de datos existe
-        # - Verificar que puerto no está en uso por otro servicio
-        # - Verificar conectividad a base de datos
-        # - Etc.
+        # La base de datos tiene que estar accesible antes de tocar nada
+        database = self.get_database_check_args()
+        if database is None:
+            print_info("Base de datos en el PostgreSQL local de otro servidor: se verifica vía HTTP")
+        else:
+            ok, detail = healthcheck.check_database(**database)
+            if not ok:
+                print_error(detail)
+                return False
+            print_success(detail)
+
+        # Si no hay baseline de latencia y la instancia actual responde, se mide
+        # ahora para poder comparar después del deployment
+        state_dir = self.repo_root / "deployment" / "state"
+        if healthcheck.load_baseline(state_dir, self.host) is None:
+            base_url, http_host, http_port = self.get_health_target()
+            if healthcheck.check_tcp(http_host, http_port, timeout=2)[0]:
+                report = healthcheck.run_checks(base_url, http_host, http_port,
+                                                samples=self.options.get('health_samples') or healthcheck.DEFAULT_SAMPLES)
+                if report['ok']:
+                    healthcheck.save_baseline(state_dir, self.host, report)
+                    print_info("Baseline de latencia tomado de la instancia actual")
 
         print_success("Pre-deployment checks completados")
         return True
@@ -213,10 +346,10 @@ class OdooDeployment:
             print_info("Entorno local - No se requiere deployment remoto")
             return True
 
-        # Para entornos remotos, necesitaríamos:
-        # - SSH al servidor
-        # - Pull del código en el servidor
-        # - Reiniciar servicio
+        if is_local_host(self.config['options']):
+            # El repositorio de este servidor es el que usa Odoo: el checkout ya es el deployment
+            print_success(f"El host corre en este servidor ({server_name()}): código actualizado por el checkout")
+            return True
 
         print_warning("Deployment remoto no implementado aún")
         print_info("Pasos manuales:")
@@ -236,21 +369,122 @@ class OdooDeployment:
         return True
 
     def update_modules(self):
-        """Actualizar módulos de Odoo si es necesario."""
+        """
+        Actualizar solo los módulos que cambiaron desde el último deployment
+        del host (y los que dependen de ellos), en lugar de -u all.
+        """
         print_header("ACTUALIZACIÓN DE MÓDULOS")
 
         if not self.options.get('update_modules'):
             print_info("Actualización de módulos omitida (usar --update-modules para habilitar)")
             return True
 
-        # Comando para actualizar módulos
-        # odoo-bin -c config.conf -u module_name -d database --stop-after-init
-
-        print_warning("Actualización de módulos debe hacerse en servidor")
-        print_info("Comando de ejemplo:")
         db_name = self.config['options'].get('db_name')
-        print_info(f"sudo -u odoo /opt/odoo/odoo18/odoo-bin -c {self.config_file} -u all -d {db_name} --stop-after-init")
+        odoo_bin = self.options.get('odoo_bin') or '/opt/odoo/odoo18/odoo-bin'
+        target = run_command("git rev-parse HEAD", cwd=self.repo_root).stdout.strip()
 
+        plan = self.get_upgrade_plan(target)
+        if plan is None:
+            print_warning("No hay registro de una actualización de módulos en este host: se actualiza todo")
+            modules = ['all']
+        else:
+            print(module_upgrade.format_plan(plan))
+            if not plan['modules']:
+                print_success("Sin módulos para actualizar")
+                self.record_upgraded_commit(target)
+                return True
+            modules = [module['name'] for module in plan['modules']]
+
+        command = f"{odoo_bin} -c {self.compiled_config_file} -u {','.join(modules)} -d {db_name} --stop-after-init"
+        if not self.options.get('odoo_bin'):
+            # Sin --odoo-bin el script no corre en el servidor: solo se indica el
+            # comando, y el commit actualizado no avanza hasta que se corra aquí
+            print_warning("Actualización de módulos debe hacerse en servidor")
+            print_info(f"sudo -u odoo {command}")
+            return True
+
+        start = time.monotonic()
+        result = run_command(command, cwd=self.repo_root, check=False)
+        seconds = time.monotonic() - start
+        if result.returncode != 0:
+            print_error(f"Actualización de módulos fallida ({seconds:.0f} s)")
+            return False
+        self.record_upgraded_commit(target)
+        if plan is None:
+            print_success(f"Todos los módulos actualizados en {seconds:.0f} s")
+            return True
+        module_upgrade.record_timing(self.repo_root, self.repo_root / "deployment" / "state",
+                                     self.host, modules, seconds)
+        print_success(f"Módulos actualizados en {seconds:.0f} s (estimado: {plan['estimated_seconds']:.0f} s)")
+        return True
+
+    def get_upgraded_commit(self):
+        """
+        Commit hasta el que se actualizaron los módulos del host, o None. Solo
+        lo mueve una actualización que corrió bien: desplegar sin
+        --update-modules (o sin --odoo-bin) no lo cambia.
+        """
+        path = self.repo_root / "deployment" / "state" / f"{self.host}.upgraded.json"
+        try:
+            return json.loads(path.read_text(encoding='utf-8'))['commit']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def record_upgraded_commit(self, commit):
+        path = self.repo_root / "deployment" / "state" / f"{self.host}.upgraded.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            'commit': commit,
+            'date': datetime.now().isoformat(timespec='seconds'),
+        }, indent=2), encoding='utf-8')
+
+    def record_deployed_commit(self):
+        """Registrar el commit desplegado (el plan de actualización usa get_upgraded_commit)."""
+        commit = run_command("git rev-parse HEAD", cwd=self.repo_root).stdout.strip()
+        path = self.repo_root / "deployment" / "state" / f"{self.host}.deployed.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({
+            'commit': commit,
+            'branch': self.branch,
+            'date': datetime.now().isoformat(timespec='seconds'),
+        }, indent=2), encoding='utf-8')
+        # Copia del odoo.conf desplegado, base del diff del próximo deployment
+        shutil.copyfile(self.compiled_config_file, config_compiler.deployed_copy(self.repo_root, self.host))
+        print_success(f"Commit desplegado registrado: {commit[:10]}")
+        return True
+
+    def get_upgrade_plan(self, target):
+        """Plan de actualización del último commit actualizado a ``target``, o None si no hay registro."""
+        upgraded = self.get_upgraded_commit()
+        if not upgraded:
+            return None
+        return module_upgrade.build_plan(self.repo_root, upgraded, target,
+                                         state_dir=self.repo_root / "deployment" / "state", host=self.host)
+
+    def fetch_branch(self):
+        """
+        Trae ``origin/<rama>`` sin tocar el working tree y la devuelve como
+        destino del plan: es lo que va a quedar en HEAD después del pull del
+        deployment. Si el fetch falla se usa la rama local.
+        """
+        result = run_command(f"git fetch origin {self.branch}", cwd=self.repo_root, check=False)
+        if result.returncode != 0:
+            print_warning(f"No se pudo traer origin/{self.branch}: plan contra la rama local")
+            return self.branch
+        return f"origin/{self.branch}"
+
+    def print_upgrade_plan(self, target=None):
+        """
+        Dry-run: plan de actualización hacia ``target`` (default: la rama
+        destino en origin, recién traída), sin desplegar.
+        """
+        print_header(f"PLAN DE ACTUALIZACIÓN PARA {self.host}")
+        plan = self.get_upgrade_plan(target or self.fetch_branch())
+        if plan is None:
+            print_warning("No hay registro de una actualización de módulos en este host: "
+                          "el próximo deployment con --update-modules actualiza todo")
+            return True
+        print(module_upgrade.format_plan(plan))
         return True
 
     def restart_service(self):
@@ -258,21 +492,44 @@ class OdooDeployment:
         print_header("REINICIANDO SERVICIO")
 
         environment = self.config['options'].get('environment', 'unknown')
-        client_code = self.config['options'].get('client_code', 'unknown')
+        service_name = self.get_service_name()
+
+        if self.options.get('restart_mode') == 'bluegreen':
+            # Blue/green: nueva instancia en el otro puerto, cambio de upstream
+            # y drenado de la anterior, sin cortar requests en curso
+            if not is_local_host(self.config['options']):
+                print_error(f"Blue/green: {self.host} corre en otro servidor "
+                            f"({self.config['options'].get('server') or 'sin clave server'}); "
+                            f"ejecutar el deploy desde esa máquina")
+                return False
+            restart = bluegreen.BlueGreenRestart(
+                self.host, self.config['options'], service_name,
+                self.repo_root / "deployment" / "state", log=print_info)
+            try:
+                port = restart.run()
+            except bluegreen.BlueGreenError as e:
+                print_error(f"Reinicio blue/green fallido, sigue activa la instancia anterior: {e}")
+                return False
+            print_success(f"Reinicio blue/green completado, instancia activa en puerto {port}")
+            return True
 
         if environment == 'local':
             print_info("Entorno local - Reiniciar manualmente tu instancia de Odoo")
             return True
 
-        # Nombre del servicio systemd (ajustar según convención)
-        service_name = f"odoo-{client_code}"
-        if environment != 'production':
-            service_name = f"{service_name}-{environment}"
-
         print_warning(f"Reiniciar servicio en servidor: sudo systemctl restart {service_name}")
 
         return True
 
+    def get_service_name(self):
+        """Nombre del servicio systemd (ajustar según convención)."""
+        environment = self.config['options'].get('environment', 'unknown')
+        client_code = self.config['options'].get('client_code', 'unknown')
+        service_name = f"odoo-{client_code}"
+        if environment != 'production':
+            service_name = f"{service_name}-{environment}"
+        return service_name
+
     def run_health_checks(self):
         """Ejecutar health checks post-deployment."""
         print_header("HEALTH CHECKS POST-DEPLOYMENT")
@@ -281,15 +538,80 @@ class OdooDeployment:
             print_warning("Health checks omitidos (--skip-validations)")
             return True
 
-        # TODO: Implementar health checks
-        # - Verificar que servicio está corriendo
-        # - Verificar que puerto responde
-        # - Verificar que base de datos es accesible
-        # - Hacer request HTTP para verificar que responde
+        base_url, http_host, http_port = self.get_health_target()
+        print_info(f"Probando {base_url}")
+        report = healthcheck.run_checks(
+            base_url, http_host, http_port,
+            samples=self.options.get('health_samples') or healthcheck.DEFAULT_SAMPLES,
+            database=self.get_database_check_args(),
+        )
+
+        ok, detail = report['tcp']
+        if ok:
+            print_success(f"Puerto {http_host}:{http_port} acepta conexiones ({detail:.1f} ms)")
+        else:
+            print_error(f"Puerto {http_host}:{http_port} no responde: {detail}")
+        if report['database'] is not None:
+            ok, detail = report['database']
+            (print_success if ok else print_error)(detail)
+        for path, result in report['endpoints'].items():
+            (print_success if result['ok'] else print_error)(healthcheck.format_endpoint(path, result))
+        if not report['ok']:
+            return False
+
+        state_dir = self.repo_root / "deployment" / "state"
+        threshold = self.options.get('latency_threshold')
+        if threshold is None:
+            threshold = healthcheck.DEFAULT_LATENCY_THRESHOLD
+        regressions = healthcheck.compare_with_baseline(
+            report, healthcheck.load_baseline(state_dir, self.host), threshold)
+        if regressions:
+            for regression in regressions:
+                print_error(f"Regresión de latencia: {regression}")
+            return False
+        healthcheck.save_baseline(state_dir, self.host, report)
 
         print_success("Health checks completados")
         return True
 
+    def get_health_target(self):
+        """
+        (URL base, host, puerto) donde responde la instancia del host. En esta
+        máquina se prueba la instancia directamente; para un host de otro
+        servidor, su URL pública (https://<hostname>), ya que 127.0.0.1 sería
+        la máquina que corre el deploy.
+        """
+        opts = self.config['options']
+        base_url = self.options.get('health_url') or opts.get('health_url')
+        if not base_url and not is_local_host(opts):
+            base_url = f"https://{opts.get('hostname') or self.host}"
+        if not base_url:
+            # Con blue/green la instancia activa puede estar en el puerto alternativo
+            http_port = bluegreen.BlueGreenRestart(
+                self.host, opts, self.get_service_name(), self.repo_root / "deployment" / "state").active_port()
+            interface = opts.get('http_interface', '127.0.0.1')
+            http_host = '127.0.0.1' if interface in ('', '0.0.0.0') else interface
+            base_url = f"http://{http_host}:{http_port}"
+        parsed = urllib.parse.urlparse(base_url)
+        return base_url, parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80)
+
+    def get_database_check_args(self):
+        """
+        Argumentos de healthcheck.check_database, o None si la base no se
+        puede probar desde acá: está en el PostgreSQL local de otro servidor
+        (la cubre /web/login, que no responde sin base).
+        """
+        opts = self.config['options']
+        if is_local_db(opts) and not is_local_host(opts):
+            return None
+        return {
+            'db_host': opts.get('db_host') or 'localhost',
+            'db_port': int(opts.get('db_port') or 5432),
+            'db_name': opts.get('db_name'),
+            'db_user': opts.get('db_user'),
+            'db_password': opts.get('db_password'),
+        }
+
     def send_notification(self):
         """Enviar notificación de deployment."""
         print_header("NOTIFICACIÓN")
@@ -340,9 +662,19 @@ Deployment completado:
             ("Reiniciar servicio", self.restart_service),
             ("Health checks", self.run_health_checks),
             ("Notificación", self.send_notification),
+            ("Registrar commit desplegado", self.record_deployed_commit),
         ]
 
+        if self.options.get('skip_git'):
+            # Modo flota: la rama ya se verificó y se hizo checkout una sola vez
+            steps = [step for step in steps if step[1] not in (self.check_git_status, self.checkout_branch)]
+
+        stop_event = self.options.get('stop_event')
         for step_name, step_func in steps:
+            if stop_event is not None and stop_event.is_set():
+                print_error(f"Deployment cancelado antes de: {step_name} (--fail-fast)")
+                return False
+            self.current_step = step_name
             try:
                 if not step_func():
                     print_error(f"Fallo en paso: {step_name}")
@@ -357,6 +689,255 @@ Deployment completado:
         print_header("DEPLOYMENT COMPLETADO EXITOSAMENTE")
         return True
 
+
+def list_hosts(repo_root):
+    """Hosts con configuración en config/hosts/ (nombre del archivo sin .conf)."""
+    return sorted(f.stem for f in (repo_root / "config" / "hosts").glob("*.conf"))
+
+
+def server_name():
+    """Nombre de esta máquina para comparar con la clave ``server`` de los hosts."""
+    return os.environ.get('BLINK_SERVER') or socket.gethostname()
+
+
+def is_local_host(values):
+    """
+    True si el host de configuración ``values`` corre en esta máquina, es
+    decir si el deployment no necesita pasos en otro servidor.
+    """
+    if values.get('environment') == 'local':
+        return True
+    return bool(values.get('server')) and values['server'] == server_name()
+
+
+def is_local_db(values):
+    """True si ``values`` apunta al PostgreSQL de la máquina donde corre el host."""
+    return (values.get('db_host') or '') in LOCAL_DB_HOSTS
+
+
+def select_hosts(repo_root, pattern=None, environment=None):
+    """
+    Hosts que coinciden con ``pattern`` (glob, o regex con prefijo 're:') y
+    con ``environment`` (valor de 'environment' en su configuración).
+    """
+    hosts = list_hosts(repo_root)
+    if pattern:
+        if pattern.startswith('re:'):
+            regex = re.compile(pattern[3:])
+            hosts = [h for h in hosts if regex.search(h)]
+        else:
+            hosts = [h for h in hosts if fnmatch.fnmatch(h, pattern)]
+    if environment:
+        selected = []
+        for host in hosts:
+            config = configparser.ConfigParser()
+            config.read(repo_root / "config" / "hosts" / f"{host}.conf")
+            if config.get('options', 'environment', fallback=None) == environment:
+                selected.append(host)
+        hosts = selected
+    return hosts
+
+
+class FleetDeployment:
+    """
+    Deployment de varios hosts en paralelo con un pool acotado de workers.
+
+    Git (verificación y checkout) se hace una sola vez al principio, ya que
+    todos los hosts comparten el repositorio local. Cada host escribe su
+    salida en su propio log; en pantalla queda una tabla de estado en vivo
+    y al final un resumen con el tiempo de cada host.
+    """
+
+    STATUS_PENDING = 'pendiente'
+    STATUS_RUNNING = 'en curso'
+    STATUS_OK = 'ok'
+    STATUS_FAILED = 'falló'
+    STATUS_CANCELLED = 'cancelado'
+
+    def __init__(self, hosts, branch, options, parallel=4, fail_fast=False, log_dir=None):
+        self.hosts = hosts
+        self.branch = branch
+        self.options = options
+        self.parallel = max(1, parallel)
+        self.fail_fast = fail_fast
+        self.repo_root = Path(__file__).parent.parent
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.log_dir = Path(log_dir) if log_dir else self.repo_root / "deployment" / "logs" / timestamp
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.deployments = {}
+        self.status = {host: self.STATUS_PENDING for host in hosts}
+        self.started = {}
+        self.durations = {}
+        self._table_lines = 0
+
+    def log_file(self, host):
+        return self.log_dir / f"{host}.log"
+
+    def remote_hosts(self):
+        """Hosts de la selección que corren en otro servidor (sin deployment automático)."""
+        compiler = config_compiler.ConfigCompiler(self.repo_root)
+        remote = []
+        for host in self.hosts:
+            try:
+                values = compiler.compile_values(host)
+            except config_compiler.ConfigError:
+                # El error se informa en la validación del host
+                continue
+            if not is_local_host(values):
+                remote.append(host)
+        return remote
+
+    def prepare_repository(self):
+        """Verificación de git y checkout de la rama, una vez para toda la flota."""
+        shared = OdooDeployment(None, self.branch, self.options)
+        return shared.check_git_status() and shared.checkout_branch()
+
+    def deploy_host(self, host, stream):
+        """Deployment completo de un host; la salida va a su archivo de log."""
+        if self.stop_event.is_set():
+            with self.lock:
+                self.status[host] = self.STATUS_CANCELLED
+            return False
+
+        options = dict(self.options, auto=True, skip_git=True, stop_event=self.stop_event)
+        deployment = OdooDeployment(host, self.branch, options)
+        with self.lock:
+            self.deployments[host] = deployment
+            self.status[host] = self.STATUS_RUNNING
+            self.started[host] = time.monotonic()
+
+        with open(self.log_file(host), 'w', encoding='utf-8') as log:
+            stream.route_to(log)
+            try:
+                success = deployment.run()
+            except Exception as e:
+                print_error(f"Error inesperado: {e}")
+                success = False
+            finally:
+                stream.route_to(None)
+
+        with self.lock:
+            self.durations[host] = time.monotonic() - self.started[host]
+            if success:
+                self.status[host] = self.STATUS_OK
+            elif self.stop_event.is_set() and deployment.current_step is None:
+                self.status[host] = self.STATUS_CANCELLED
+            else:
+                self.status[host] = self.STATUS_FAILED
+        if not success and self.fail_fast:
+            self.stop_event.set()
+        return success
+
+    def render_table(self, out):
+        """Tabla de estado; en una terminal se redibuja en el mismo lugar."""
+        with self.lock:
+            rows = []
+            for host in self.hosts:
+                status = self.status[host]
+                step = ''
+                if status in (self.STATUS_RUNNING, self.STATUS_FAILED) and host in self.deployments:
+                    step = self.deployments[host].current_step or ''
+                if host in self.durations:
+                    elapsed = self.durations[host]
+                elif host in self.started:
+                    elapsed = time.monotonic() - self.started[host]
+                else:
+                    elapsed = None
+                rows.append((host, status, step, elapsed))
+
+        lines = [f"{'HOST':<40} {'ESTADO':<10} {'PASO':<24} {'TIEMPO':>8}"]
+        for host, status, step, elapsed in rows:
+            elapsed_str = f"{elapsed:7.1f}s" if elapsed is not None else ''
+            color = {
+                self.STATUS_OK: Colors.OKGREEN,
+                self.STATUS_FAILED: Colors.FAIL,
+                self.STATUS_CANCELLED: Colors.WARNING,
+                self.STATUS_RUNNING: Colors.OKCYAN,
+            }.get(status, '')
+            lines.append(f"{host:<40} {color}{status:<10}{Colors.ENDC} {step[:24]:<24} {elapsed_str:>8}")
+
+        if out.isatty():
+            if self._table_lines:
+                out.write(f"\033[{self._table_lines}F")
+            out.write(''.join(f"\033[2K{line}\n" for line in lines))
+            self._table_lines = len(lines)
+        else:
+            out.write('\n'.join(lines) + '\n\n')
+        out.flush()
+
+    def print_summary(self):
+        print_header("RESUMEN DEL DEPLOYMENT DE FLOTA")
+        for host in self.hosts:
+            status = self.status[host]
+            duration = self.durations.get(host)
+            duration_str = f"{duration:.1f}s" if duration is not None else '-'
+            message = f"{host}: {status} en {duration_str} (log: {self.log_file(host)})"
+            if status == self.STATUS_OK:
+                print_success(message)
+            elif status == self.STATUS_FAILED:
+                print_error(message)
+            else:
+                print_warning(message)
+        ok = sum(1 for status in self.status.values() if status == self.STATUS_OK)
+        print_info(f"{ok}/{len(self.hosts)} hosts desplegados correctamente")
+
+    def run(self):
+        print_header(f"DEPLOYMENT DE FLOTA: {len(self.hosts)} HOSTS")
+        print_info(f"Rama: {self.branch}")
+        print_info(f"Hosts: {', '.join(self.hosts)}")
+        print_info(f"Workers en paralelo: {self.parallel}")
+        print_info(f"Logs por host en: {self.log_dir}")
+
+        remote = self.remote_hosts()
+        if remote:
+            print_error(f"Hosts de otro servidor, sin deployment remoto automático: {', '.join(remote)}")
+            print_info(f"Este servidor es '{server_name()}' (BLINK_SERVER o hostname): correr el modo flota "
+                       "en el servidor de esos hosts (clave server de su configuración), "
+                       "o desplegarlos uno por uno con --host")
+            return False
+
+        if not self.prepare_repository():
+            print_error("Fallo verificando o actualizando el repositorio")
+            return False
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+
+        original_stdout = sys.stdout
+        stream = ThreadRoutedStream(original_stdout)
+        sys.stdout = stream
+        # Modo no interactivo: el refresco periódico solo tiene sentido en terminal
+        refresh = 1.0 if original_stdout.isatty() else None
+        try:
+            with ThreadPoolExecutor(max_workers=self.parallel) as executor:
+                futures = {executor.submit(self.deploy_host, host, stream): host for host in self.hosts}
+                pending = set(futures)
+                self.render_table(original_stdout)
+                while pending:
+                    done = {future for future in pending if future.done()}
+                    if not done:
+                        time.sleep(0.2)
+                        if refresh:
+                            self.render_table(original_stdout)
+                        continue
+                    pending -= done
+                    if self.stop_event.is_set():
+                        for future in pending:
+                            if future.cancel():
+                                self.status[futures[future]] = self.STATUS_CANCELLED
+                    pending = {future for future in pending if not future.cancelled()}
+                    self.render_table(original_stdout)
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            sys.stdout = original_stdout
+            print_error("\nDeployment de flota cancelado por usuario")
+            return False
+        finally:
+            sys.stdout = original_stdout
+
+        self.print_summary()
+        return all(status == self.STATUS_OK for status in self.status.values())
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Deployment de Odoo by Blink basado en configuración por HOST",
@@ -367,19 +948,42 @@ Ejemplos:
   %(prog)s --host corteperfecto-test.somosblink.com --branch test --auto
   %(prog)s --host demo.somosblink.com --branch demo --reset-db
   %(prog)s --host blink.somosblink.com --branch blink --skip-validations
+  %(prog)s --all --branch main --parallel 4
+  %(prog)s --environment production --branch main --fail-fast
         """
     )
 
-    parser.add_argument('--host', required=True, help='Hostname/dominio del entorno (ej. corteperfecto.somosblink.com)')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--host', help='Hostname/dominio del entorno (ej. corteperfecto.somosblink.com)')
+    target.add_argument('--hosts', help="Modo flota: hosts de config/hosts/ por glob (ej. 'corte*') o regex con prefijo 're:'")
+    target.add_argument('--all', action='store_true', help='Modo flota: todos los hosts de config/hosts/')
+    parser.add_argument('--environment', help='Modo flota: hosts de un entorno (ej. production); combinable con --hosts')
     parser.add_argument('--branch', required=True, help='Rama de Git para hacer deployment (ej. main, test, dev)')
     parser.add_argument('--auto', action='store_true', help='Modo automático sin confirmaciones')
     parser.add_argument('--force', action='store_true', help='Forzar deployment aunque haya cambios sin commitear')
     parser.add_argument('--skip-validations', action='store_true', help='Omitir validaciones y health checks')
     parser.add_argument('--update-modules', action='store_true', help='Actualizar módulos de Odoo después del deployment')
+    parser.add_argument('--odoo-bin', help='Ruta de odoo-bin: si se indica, --update-modules ejecuta la actualización (en el servidor)')
+    parser.add_argument('--upgrade-plan', action='store_true',
+                        help='Dry-run: mostrar qué módulos se actualizarían y el costo estimado, sin desplegar')
     parser.add_argument('--reset-db', action='store_true', help='Reset base de datos (CUIDADO: elimina datos)')
     parser.add_argument('--notify', action='store_true', help='Enviar notificaciones de deployment')
+    parser.add_argument('--restart-mode', choices=['restart', 'bluegreen'], default='restart',
+                        help='restart: reinicio del servicio; bluegreen: nueva instancia en el puerto alternativo y cambio de upstream sin cortes')
+    parser.add_argument('--health-url', help='URL base para los health checks (default: http_interface:http_port '
+                        'del host, o https://<hostname> si corre en otro servidor)')
+    parser.add_argument('--health-samples', type=int, default=healthcheck.DEFAULT_SAMPLES, help='Requests por endpoint en los health checks')
+    parser.add_argument('--latency-threshold', type=float, default=healthcheck.DEFAULT_LATENCY_THRESHOLD,
+                        help='Empeoramiento de p95 tolerado respecto del deployment anterior (0.5 = 50%%)')
+    parser.add_argument('--parallel', type=int, default=4, help='Modo flota: hosts desplegados a la vez (default: 4)')
+    parser.add_argument('--fail-fast', action='store_true', help='Modo flota: no empezar más hosts tras el primer fallo')
+    parser.add_argument('--log-dir', help='Modo flota: directorio de logs por host (default: deployment/logs/<fecha>)')
 
     args = parser.parse_args()
+    if not (args.host or args.hosts or args.all or args.environment):
+        parser.error('indicar --host, --hosts, --all o --environment')
+    if args.host and args.environment:
+        parser.error('--environment es un filtro del modo flota, no se combina con --host')
 
     options = {
         'auto': args.auto,
@@ -388,10 +992,38 @@ Ejemplos:
         'update_modules': args.update_modules,
         'reset_db': args.reset_db,
         'notify': args.notify,
+        'odoo_bin': args.odoo_bin,
+        'restart_mode': args.restart_mode,
+        'health_url': args.health_url,
+        'health_samples': args.health_samples,
+        'latency_threshold': args.latency_threshold,
     }
 
-    deployment = OdooDeployment(args.host, args.branch, options)
-    success = deployment.run()
+    if args.host and args.upgrade_plan:
+        deployment = OdooDeployment(args.host, args.branch, options)
+        success = deployment.validate_config() and deployment.print_upgrade_plan()
+    elif args.host:
+        deployment = OdooDeployment(args.host, args.branch, options)
+        success = deployment.run()
+    else:
+        repo_root = Path(__file__).parent.parent
+        hosts = select_hosts(repo_root, pattern=args.hosts, environment=args.environment)
+        if not hosts:
+            print_error("Ningún host de config/hosts/ coincide con la selección")
+            sys.exit(1)
+        if args.upgrade_plan:
+            # Dry-run de la flota: un plan por host, sin desplegar nada
+            target = OdooDeployment(None, args.branch, options).fetch_branch()
+            success = True
+            for host in hosts:
+                deployment = OdooDeployment(host, args.branch, options)
+                success = deployment.validate_config() and deployment.print_upgrade_plan(target) and success
+            sys.exit(0 if success else 1)
+        if not args.auto:
+            print_warning("Modo flota: sin confirmaciones interactivas (equivale a --auto)")
+        fleet = FleetDeployment(hosts, args.branch, options, parallel=args.parallel,
+                                fail_fast=args.fail_fast, log_dir=args.log_dir)
+        success = fleet.run()
 
     sys.exit(0 if success else 1)
 
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Odoo by Blink - Actualización de módulos en todas las bases
+===========================================================
+
+Cada cliente tiene su propia base (producción, clones de test, demo). Cuando
+cambia un addon compartido hay que actualizarlo en todas: este script lee
+config/hosts/*.conf y corre ``odoo-bin --stop-after-init -u <módulos>`` por
+base en un pool acotado de procesos.
+
+- Tamaño del pool: el menor entre CPUs disponibles y la capacidad libre de
+  PostgreSQL (max_connections menos las conexiones en uso, dividido las
+  conexiones que usa una actualización). La capacidad se calcula por
+  servidor de base (db_host/db_port) y cada servidor queda limitado a la
+  suya.
+- Las bases con db_host local (localhost, 127.0.0.1 o vacío) solo se
+  actualizan desde la máquina donde corre el host (clave ``server``, ver
+  config/README.md); el resto se omite con un aviso.
+- Un log por base en deployment/logs/upgrade-<fecha>/<base>.log.
+- Las bases que fallan pasan a una cola de reintentos que se procesa al
+  final (--retries veces).
+- Reporte de tiempos en pantalla y en report.json junto a los logs.
+
+Uso:
+    ./deployment/fleet_upgrade.py --modules l10n_ar_invoice_thermal_qr,blink_invoice_layout
+    ./deployment/fleet_upgrade.py --from <commit> --to main --environment production
+    ./deployment/fleet_upgrade.py --modules blink_invoice_layout --dry-run
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import config_compiler
+import module_upgrade
+from deploy import (is_local_db, is_local_host, print_error, print_header, print_info, print_success, print_warning,
+                    select_hosts)
+
+DEFAULT_ODOO_BIN = '/opt/odoo/odoo18/odoo-bin'
+# Conexiones que abre una actualización con --stop-after-init (cursor de
+# carga, cron deshabilitado, margen)
+CONNECTIONS_PER_UPGRADE = 4
+# Conexiones de PostgreSQL que se dejan libres para las instancias en servicio
+RESERVED_CONNECTIONS = 20
+DEFAULT_MAX_CONNECTIONS = 100
+
+
+class Tenant:
+    """Una base a actualizar, con la configuración del host al que pertenece."""
+
+    def __init__(self, host, config_file, options):
+        self.host = host
+        self.config_file = config_file
+        self.options = options
+        self.db_name = options.get('db_name')
+        self.db_server = db_server(options)
+        self.attempts = 0
+        self.durations = []
+        self.status = 'pendiente'
+        self.log_file = None
+
+
+def db_server(options):
+    """(db_host, db_port) del servidor PostgreSQL de ``options``."""
+    return options.get('db_host') or 'localhost', int(options.get('db_port') or 5432)
+
+
+def load_tenants(repo_root, pattern=None, environment=None, include_local=False):
+    tenants = []
+    seen = set()
+    compiler = config_compiler.ConfigCompiler(repo_root)
+    for host in select_hosts(repo_root, pattern=pattern, environment=environment):
+        # odoo.conf compilado: con los valores de base.conf que el host hereda
+        try:
+            options = compiler.compile_values(host)
+        except config_compiler.ConfigError as e:
+            print_warning(f"{host}: configuración inválida, se omite ({e})")
+            continue
+        config_file = compiler.output_file(host)
+        if options.get('environment') == 'local' and not include_local:
+            continue
+        if is_local_db(options) and not is_local_host(options):
+            print_warning(f"{host}: la base está en el PostgreSQL local de otro servidor "
+                          f"({options.get('server') or 'sin clave server'}), se omite")
+            continue
+        if options['db_name'] in seen:
+            print_warning(f"{host}: la base {options['db_name']} ya está en la lista, se omite")
+            continue
+        seen.add(options['db_name'])
+        tenants.append(Tenant(host, config_file, options))
+    return tenants
+
+
+def postgres_connections(options):
+    """
+    (max_connections, conexiones en uso) del PostgreSQL de ``options`` (valores
+    del odoo.conf), consultado con psql; None si no se puede consultar.
+    """
+    env = dict(os.environ, PGPASSWORD=options.get('db_password') or '')
+    cmd = [
+        'psql', '-h', options.get('db_host') or 'localhost', '-p', str(options.get('db_port') or 5432),
+        '-U', options.get('db_user') or 'odoo', '-d', 'postgres', '-At', '-c',
+        "SELECT current_setting('max_connections'), count(*) FROM pg_stat_activity",
+    ]
+    try:
+        result = subprocess.run(cmd, env=env, capture_output=True, text=True, timeout=10, check=True)
+        max_connections, in_use = (int(value) for value in result.stdout.strip().split('|'))
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+    return max_connections, in_use
+
+
+def postgres_capacity(options):
+    """(actualizaciones simultáneas que soporta PostgreSQL, detalle)."""
+    max_connections, in_use = postgres_connections(options) or (DEFAULT_MAX_CONNECTIONS, 0)
+    free = max_connections - in_use - RESERVED_CONNECTIONS
+    capacity = max(1, free // CONNECTIONS_PER_UPGRADE)
+    return capacity, f"max_connections={max_connections}, en uso={in_use}, reservadas={RESERVED_CONNECTIONS}"
+
+
+class FleetUpgrade:
+
+    def __init__(self, tenants, modules, odoo_bin=DEFAULT_ODOO_BIN, workers=None,
+                 retries=1, log_dir=None, dry_run=False):
+        self.tenants = tenants
+        self.modules = modules
+        self.odoo_bin = odoo_bin
+        self.workers = workers
+        self.retries = retries
+        self.dry_run = dry_run
+        # Un semáforo por servidor PostgreSQL con su capacidad (ver pool_size)
+        self.server_slots = {}
+        repo_root = Path(__file__).parent.parent
+        timestamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.log_dir = Path(log_dir) if log_dir else repo_root / "deployment" / "logs" / f"upgrade-{timestamp}"
+
+    def command(self, tenant):
+        # --no-http: la instancia en servicio ya ocupa el puerto del host
+        return [
+            self.odoo_bin, '-c', str(tenant.config_file), '-d', tenant.db_name,
+            '-u', ','.join(self.modules), '--stop-after-init', '--no-http',
+            f'--logfile={tenant.log_file}',
+        ]
+
+    def upgrade(self, tenant):
+        """Actualiza una base; la salida de odoo-bin queda en su log."""
+        tenant.attempts += 1
+        tenant.status = 'en curso'
+        start = time.monotonic()
+        with self.server_slots.get(tenant.db_server) or nullcontext():
+            with open(tenant.log_file, 'a', encoding='utf-8') as log:
+                log.write(f"\n=== Intento {tenant.attempts}: {' '.join(self.command(tenant))}\n")
+                log.flush()
+                result = subprocess.run(self.command(tenant), stdout=log, stderr=subprocess.STDOUT)
+        tenant.durations.append(time.monotonic() - start)
+        tenant.status = 'ok' if result.returncode == 0 else 'falló'
+        return tenant
+
+    def run_pass(self, tenants, workers):
+        failed = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.upgrade, tenant) for tenant in self.interleave(tenants)]
+            for future in as_completed(futures):
+                tenant = future.result()
+                message = f"{tenant.db_name}: {tenant.status} en {tenant.durations[-1]:.0f} s (intento {tenant.attempts})"
+                if tenant.status == 'ok':
+                    print_success(message)
+                else:
+                    print_error(f"{message}, log: {tenant.log_file}")
+                    failed.append(tenant)
+        return failed
+
+    def servers(self, tenants):
+        """Bases agrupadas por servidor PostgreSQL."""
+        servers = {}
+        for tenant in tenants:
+            servers.setdefault(tenant.db_server, []).append(tenant)
+        return servers
+
+    def interleave(self, tenants):
+        """
+        Alterna las bases de cada servidor, para que los procesos del pool no
+        queden esperando el semáforo de un servidor mientras otro está libre.
+        """
+        groups = list(self.servers(tenants).values())
+        ordered = []
+        for index in range(max((len(group) for group in groups), default=0)):
+            ordered.extend(group[index] for group in groups if index < len(group))
+        return ordered
+
+    def pool_size(self):
+        """
+        Procesos en paralelo: el menor entre CPUs y la suma de lo que admite
+        cada servidor PostgreSQL; además cada servidor queda limitado a su
+        propia capacidad. Con --workers solo se limita el total.
+        """
+        if self.workers:
+            return min(self.workers, len(self.tenants))
+        cpus = os.cpu_count() or 1
+        total = 0
+        for (db_host, db_port), tenants in self.servers(self.tenants).items():
+            capacity, detail = postgres_capacity(tenants[0].options)
+            capacity = min(capacity, len(tenants))
+            self.server_slots[(db_host, db_port)] = threading.Semaphore(capacity)
+            total += capacity
+            print_info(f"PostgreSQL {db_host}:{db_port}: {capacity} a la vez para {len(tenants)} base(s) ({detail})")
+        size = min(cpus, total)
+        print_info(f"Pool: {size} procesos (CPUs={cpus}; PostgreSQL admite {total} en total)")
+        return size
+
+    def run(self):
+        print_header(f"ACTUALIZACIÓN DE {len(self.tenants)} BASES")
+        print_info(f"Módulos: {','.join(self.modules)}")
+        for tenant in self.tenants:
+            tenant.log_file = self.log_dir / f"{tenant.db_name}.log"
+
+        if self.dry_run:
+            for tenant in self.tenants:
+                print_info(' '.join(self.command(tenant)))
+            return True
+
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        print_info(f"Logs por base en: {self.log_dir}")
+        workers = self.pool_size()
+        start = time.monotonic()
+        queue = self.run_pass(self.tenants, workers)
+        for retry in range(self.retries):
+            if not queue:
+                break
+            # Reintentos con menos paralelismo: los fallos por carga (locks,
+            # conexiones, memoria) suelen pasar con la base sola
+            retry_workers = max(1, min(workers, len(queue)) // 2)
+            print_warning(f"Reintento {retry + 1}: {len(queue)} base(s), {retry_workers} en paralelo")
+            queue = self.run_pass(queue, retry_workers)
+        wall = time.monotonic() - start
+
+        self.print_report(wall)
+        return not queue
+
+    def print_report(self, wall):
+        print_header("REPORTE DE TIEMPOS")
+        print(f"{'BASE':<32} {'HOST':<36} {'ESTADO':<8} {'INTENTOS':>8} {'TIEMPO':>9}")
+        for tenant in sorted(self.tenants, key=lambda t: -sum(t.durations)):
+            print(f"{tenant.db_name:<32} {tenant.host:<36} {tenant.status:<8} "
+                  f"{tenant.attempts:>8} {sum(tenant.durations):>8.0f}s")
+        total = sum(sum(tenant.durations) for tenant in self.tenants)
+        print_info(f"Tiempo total: {wall:.0f} s (secuencial hubiera sido ~{total:.0f} s)")
+
+        report = {
+            'modules': self.modules,
+            'wall_seconds': round(wall, 1),
+            'tenants': [{
+                'db_name': tenant.db_name,
+                'host': tenant.host,
+                'status': tenant.status,
+                'attempts': tenant.attempts,
+                'seconds': [round(duration, 1) for duration in tenant.durations],
+                'log': str(tenant.log_file),
+            } for tenant in self.tenants],
+        }
+        (self.log_dir / "report.json").write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Actualizar módulos en todas las bases de config/hosts/")
+    modules_group = parser.add_mutually_exclusive_group(required=True)
+    modules_group.add_argument('--modules', help='Módulos separados por coma')
+    modules_group.add_argument('--from', dest='from_ref', help='Commit desplegado: los módulos salen del diff con --to')
+    parser.add_argument('--to', dest='to_ref', default='HEAD', help='Commit o rama destino para --from (default: HEAD)')
+    parser.add_argument('--hosts', help="Hosts por glob o regex con prefijo 're:' (default: todos)")
+    parser.add_argument('--environment', help='Solo hosts de un entorno (ej. production)')
+    parser.add_argument('--include-local', action='store_true', help='Incluir hosts con environment = local')
+    parser.add_argument('--odoo-bin', default=DEFAULT_ODOO_BIN, help=f'Ruta de odoo-bin (default: {DEFAULT_ODOO_BIN})')
+    parser.add_argument('--workers', type=int, help='Procesos en paralelo (default: según CPUs y PostgreSQL)')
+    parser.add_argument('--retries', type=int, default=1, help='Pasadas de reintento para las bases que fallan (default: 1)')
+    parser.add_argument('--log-dir', help='Directorio de logs (default: deployment/logs/upgrade-<fecha>)')
+    parser.add_argument('--dry-run', action='store_true', help='Mostrar los comandos sin ejecutarlos')
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).parent.parent
+    if args.modules:
+        modules = [module.strip() for module in args.modules.split(',') if module.strip()]
+    else:
+        plan = module_upgrade.build_plan(repo_root, args.from_ref, args.to_ref)
+        print(module_upgrade.format_plan(plan))
+        modules = [module['name'] for module in plan['modules']]
+    if not modules:
+        print_success("Ningún módulo para actualizar")
+        sys.exit(0)
+
+    tenants = load_tenants(repo_root, pattern=args.hosts, environment=args.environment,
+                           include_local=args.include_local)
+    if not tenants:
+        print_error("Ninguna base para actualizar con esa selección")
+        sys.exit(1)
+
+    upgrade = FleetUpgrade(tenants, modules, odoo_bin=args.odoo_bin, workers=args.workers,
+                           retries=args.retries, log_dir=args.log_dir, dry_run=args.dry_run)
+    sys.exit(0 if upgrade.run() else 1)
+
+
+if __name__ == '__main__':
+    main()
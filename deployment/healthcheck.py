@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Odoo by Blink - Health checks
+=============================
+
+Chequeos de salud de un host de Odoo, usados por deploy.py antes y después
+del deployment:
+
+- TCP: el http_port acepta conexiones.
+- HTTP: /web/health y /web/login responden 200; se toman N muestras de
+  latencia concurrentes por endpoint y se calculan p50/p95.
+- Base de datos: db_host:db_port acepta conexiones (y, si psycopg2 está
+  instalado y hay credenciales, un SELECT 1 sobre db_name).
+- Baseline: las latencias del último deployment exitoso quedan guardadas en
+  deployment/state/<host>.health.json; si el p95 empeora más que el umbral,
+  el chequeo falla.
+
+Solo usa la librería estándar. Para probarlo sin Odoo trae un servidor stub
+que responde 200 en los health paths (y 404 en el resto), el mismo que usan
+los tests y el reinicio blue/green de prueba:
+
+    ./deployment/healthcheck.py --serve 8099 &
+    ./deployment/healthcheck.py --url http://127.0.0.1:8099 --samples 10
+"""
+
+import argparse
+import json
+import socket
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+HEALTH_PATHS = ('/web/health', '/web/login')
+DEFAULT_SAMPLES = 20
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 10.0
+# Regresión: p95 más de un 50% peor que el baseline...
+DEFAULT_LATENCY_THRESHOLD = 0.5
+# ...y al menos 50 ms peor (por debajo de eso es ruido de red)
+MIN_REGRESSION_MS = 50.0
+
+
+def percentile(values, pct):
+    """Percentil ``pct`` (0-100) con interpolación lineal entre muestras."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def check_tcp(host, port, timeout=DEFAULT_TIMEOUT):
+    """(ok, latencia en ms o mensaje de error) de abrir una conexión TCP."""
+    start = time.monotonic()
+    try:
+        with socket.create_connection((host, int(port)), timeout=timeout):
+            return True, (time.monotonic() - start) * 1000
+    except OSError as e:
+        return False, str(e)
+
+
+def _request(url, timeout):
+    """(status, latencia en ms) de un GET; status None si no hubo respuesta."""
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return status, (time.monotonic() - start) * 1000
+
+
+def sample_http(url, samples=DEFAULT_SAMPLES, concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT):
+    """
+    ``samples`` GET a ``url`` con hasta ``concurrency`` en vuelo. Devuelve un
+    dict con ok, errores, p50/p95/max en ms (solo respuestas 200).
+    """
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        results = list(executor.map(lambda _i: _request(url, timeout), range(samples)))
+    latencies = [latency for status, latency in results if status == 200]
+    errors = [status for status, _latency in results if status != 200]
+    return {
+        'url': url,
+        'ok': not errors,
+        'samples': samples,
+        'errors': len(errors),
+        'statuses': sorted({str(status) for status in errors}),
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'max': max(latencies) if latencies else None,
+    }
+
+
+def check_database(db_host, db_port, db_name=None, db_user=None, db_password=None, timeout=DEFAULT_TIMEOUT):
+    """
+    (ok, detalle) de la base de datos: conexión TCP a PostgreSQL y, si hay
+    psycopg2 y credenciales, un SELECT 1 sobre ``db_name``.
+    """
+    ok, detail = check_tcp(db_host, db_port, timeout)
+    if not ok:
+        return False, f"PostgreSQL {db_host}:{db_port} no acepta conexiones: {detail}"
+    if psycopg2 is None or not (db_name and db_user and db_password):
+        return True, f"PostgreSQL {db_host}:{db_port} accesible ({detail:.1f} ms)"
+    try:
+        connection = psycopg2.connect(host=db_host, port=db_port, dbname=db_name, user=db_user,
+                                      password=db_password, connect_timeout=int(timeout))
+        try:
+            with connection.cursor() as cr:
+                cr.execute("SELECT 1")
+        finally:
+            connection.close()
+    except psycopg2.Error as e:
+        return False, f"Base {db_name} no accesible: {str(e).strip()}"
+    return True, f"Base {db_name} accesible en {db_host}:{db_port}"
+
+
+def baseline_file(state_dir, host):
+    return Path(state_dir) / f"{host}.health.json"
+
+
+def load_baseline(state_dir, host):
+    path = baseline_file(state_dir, host)
+    if not path.exists():
+        return None
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(state_dir, host, report):
+    """Guarda las latencias de ``report`` como baseline del próximo deployment."""
+    path = baseline_file(state_dir, host)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'endpoints': {
+            path_: {'p50': result['p50'], 'p95': result['p95']}
+            for path_, result in report['endpoints'].items()
+        },
+    }
+    path.write_text(json.dumps(data, indent=2), encoding='utf-8')
+
+
+def compare_with_baseline(report, baseline, threshold=DEFAULT_LATENCY_THRESHOLD):
+    """Lista de regresiones de p95 respecto del baseline (vacía si no hay)."""
+    regressions = []
+    if not baseline:
+        return regressions
+    for path, result in report['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(path, {}).get('p95')
+        current = result['p95']
+        if previous is None or current is None:
+            continue
+        if current > previous * (1 + threshold) and current - previous > MIN_REGRESSION_MS:
+            regressions.append(
+                f"{path}: p95 {current:.0f} ms vs {previous:.0f} ms del deployment anterior "
+                f"(+{(current / previous - 1) * 100:.0f}%)")
+    return regressions
+
+
+def run_checks(base_url, http_host, http_port, paths=HEALTH_PATHS, samples=DEFAULT_SAMPLES,
+               concurrency=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, database=None):
+    """
+    Todos los chequeos de un host, en paralelo entre sí. ``database`` es un
+    dict con los argumentos de check_database, o None para omitirlo.
+    Devuelve un reporte: tcp, endpoints (por path), database y ok.
+    """
+    with ThreadPoolExecutor(max_workers=len(paths) + 2) as executor:
+        tcp_future = executor.submit(check_tcp, http_host, http_port, timeout)
+        db_future = executor.submit(check_database, timeout=timeout, **database) if database else None
+        endpoint_futures = {
+            path: executor.submit(sample_http, base_url.rstrip('/') + path, samples, concurrency, timeout)
+            for path in paths
+        }
+        report = {
+            'tcp': tcp_future.result(),
+            'database': db_future.result() if db_future else None,
+            'endpoints': {path: future.result() for path, future in endpoint_futures.items()},
+        }
+    report['ok'] = (
+        report['tcp'][0]
+        and (report['database'] is None or report['database'][0])
+        and all(result['ok'] for result in report['endpoints'].values())
+    )
+    return report
+
+
+def format_endpoint(path, result):
+    if result['p50'] is None:
+        return f"{path}: sin respuestas 200 ({result['errors']}/{result['samples']} errores: {', '.join(result['statuses'])})"
+    line = f"{path}: p50 {result['p50']:.0f} ms, p95 {result['p95']:.0f} ms, máx {result['max']:.0f} ms"
+    if result['errors']:
+        line += f" ({result['errors']}/{result['samples']} errores: {', '.join(result['statuses'])})"
+    return line
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """200 en los paths del servidor (con su demora), 404 en el resto."""
+
+    def do_GET(self):
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        found = urllib.parse.urlparse(self.path).path in self.server.paths
+        body = b'ok' if found else b'not found'
+        self.send_response(200 if found else 404)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def stub_server(port=0, paths=HEALTH_PATHS, delay=0.0, host='127.0.0.1'):
+    """
+    Servidor HTTP stub que imita los health paths de Odoo, corriendo en un
+    thread. ``port`` 0 elige uno libre (server.server_port); se detiene con
+    server.shutdown() y server.server_close().
+    """
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.paths = set(paths)
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Health checks HTTP con latencias p50/p95")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='URL base (ej. http://127.0.0.1:8069)')
+    target.add_argument('--serve', type=int, metavar='PORT', help='Levantar el servidor stub en PORT (hasta Ctrl+C)')
+    parser.add_argument('--delay', type=float, default=0.0, help='Con --serve: demora de cada respuesta (s)')
+    parser.add_argument('--paths', nargs='+', default=list(HEALTH_PATHS), help='Paths a probar')
+    parser.add_argument('--samples', type=int, default=DEFAULT_SAMPLES, help='Requests por path')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Requests en vuelo por path')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='Timeout por request (s)')
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        server = stub_server(args.serve, paths=args.paths, delay=args.delay)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.shutdown()
+            server.server_close()
+        return
+
+    parsed = urllib.parse.urlparse(args.url)
+    port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+    report = run_checks(args.url, parsed.hostname, port, paths=args.paths, samples=args.samples,
+                        concurrency=args.concurrency, timeout=args.timeout)
+    ok, detail = report['tcp']
+    print(f"TCP {parsed.hostname}:{port}: " + (f"ok ({detail:.1f} ms)" if ok else f"error ({detail})"))
+    for path, result in report['endpoints'].items():
+        print(format_endpoint(path, result))
+    sys.exit(0 if report['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
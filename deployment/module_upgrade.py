@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Odoo by Blink - Actualización incremental de módulos
+====================================================
+
+En lugar de ``-u all`` se actualizan solo los addons de custom-addons/ que
+cambiaron entre el último commit con módulos actualizados en el host
+(deployment/state/<host>.upgraded.json) y el commit destino, más
+los addons propios que dependen de ellos (``depends`` de __manifest__.py).
+
+- Cambios solo en static/, doc/, README o descripción: no hace falta -u
+  (los assets se regeneran al reiniciar), el addon queda como "solo
+  reinicio".
+- Cualquier otro archivo (Python, XML, CSV, manifest, migraciones): -u.
+
+El costo estimado sale del historial de actualizaciones del host
+(deployment/state/<host>.upgrade.json) o, si un módulo nunca se actualizó
+allí, de una estimación por cantidad de archivos de datos y de Python.
+
+Uso:
+    ./deployment/module_upgrade.py --from <commit actualizado> --to main
+"""
+
+import argparse
+import ast
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ADDONS_DIR = 'custom-addons'
+# Archivos que no requieren -u: assets, documentación
+RESTART_ONLY_PREFIXES = ('static/', 'doc/', 'docs/')
+RESTART_ONLY_SUFFIXES = ('.md', '.rst', '.txt', '.png', '.jpg', '.svg', '.gif')
+# Estimación sin historial: base + por archivo de datos + por archivo Python
+ESTIMATE_BASE_SECONDS = 5.0
+ESTIMATE_DATA_FILE_SECONDS = 1.5
+ESTIMATE_PYTHON_FILE_SECONDS = 0.3
+# Carga del registry al arrancar odoo-bin --stop-after-init
+ESTIMATE_REGISTRY_SECONDS = 20.0
+
+
+def load_manifests(repo_root):
+    """{addon: manifest} de los addons directos de custom-addons/."""
+    manifests = {}
+    for manifest_file in sorted((Path(repo_root) / ADDONS_DIR).glob('*/__manifest__.py')):
+        try:
+            manifests[manifest_file.parent.name] = ast.literal_eval(manifest_file.read_text(encoding='utf-8'))
+        except (OSError, ValueError, SyntaxError):
+            continue
+    return manifests
+
+
+def changed_files(repo_root, from_ref, to_ref):
+    """Archivos que cambian entre ``from_ref`` y ``to_ref`` (incluye renombrados)."""
+    result = subprocess.run(
+        ['git', 'diff', '--name-only', '--no-renames', f'{from_ref}..{to_ref}'],
+        cwd=repo_root, check=True, capture_output=True, text=True)
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def classify_changes(files, manifests):
+    """
+    ({addon: archivos que requieren -u}, {addon: archivos solo de reinicio})
+    para los archivos de ``files`` dentro de addons conocidos.
+    """
+    upgrade, restart = {}, {}
+    prefix = ADDONS_DIR + '/'
+    for path in files:
+        if not path.startswith(prefix):
+            continue
+        addon, _sep, inner = path[len(prefix):].partition('/')
+        if addon not in manifests or not inner:
+            continue
+        if inner.startswith(RESTART_ONLY_PREFIXES) or inner.endswith(RESTART_ONLY_SUFFIXES):
+            restart.setdefault(addon, []).append(inner)
+        else:
+            upgrade.setdefault(addon, []).append(inner)
+    return upgrade, restart
+
+
+def dependents_closure(addons, manifests):
+    """``addons`` más todos los addons propios que dependen de ellos, directa o indirectamente."""
+    reverse = {}
+    for name, manifest in manifests.items():
+        for dependency in manifest.get('depends', []):
+            reverse.setdefault(dependency, set()).add(name)
+    result = set(addons)
+    pending = list(addons)
+    while pending:
+        for dependent in reverse.get(pending.pop(), ()):
+            if dependent not in result:
+                result.add(dependent)
+                pending.append(dependent)
+    return result
+
+
+def topological_order(addons, manifests):
+    """``addons`` ordenados de modo que cada uno va después de sus dependencias."""
+    ordered, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in done or name in visiting:
+            return
+        visiting.add(name)
+        for dependency in manifests.get(name, {}).get('depends', []):
+            if dependency in addons:
+                visit(dependency)
+        visiting.discard(name)
+        done.add(name)
+        ordered.append(name)
+
+    for name in sorted(addons):
+        visit(name)
+    return ordered
+
+
+def load_history(state_dir, host):
+    path = Path(state_dir) / f"{host}.upgrade.json"
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
+def record_timing(repo_root, state_dir, host, modules, seconds):
+    """
+    Guarda en el historial del host la duración de una actualización real,
+    repartida entre ``modules`` en proporción a su estimación (se conservan
+    las últimas 5 muestras por módulo).
+    """
+    history = load_history(state_dir, host)
+    manifests = load_manifests(repo_root)
+    work = {module: max(_heuristic_seconds(repo_root, module, manifests.get(module, {})) - ESTIMATE_BASE_SECONDS, 1.0)
+            for module in modules}
+    total_work = sum(work.values()) or 1.0
+    module_seconds = max(seconds - ESTIMATE_REGISTRY_SECONDS, 0.0)
+    for module in modules:
+        samples = history.setdefault(module, [])
+        samples.append(round(module_seconds * work[module] / total_work + ESTIMATE_BASE_SECONDS, 1))
+        del samples[:-5]
+    path = Path(state_dir) / f"{host}.upgrade.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(history, indent=2, sort_keys=True), encoding='utf-8')
+
+
+def _heuristic_seconds(repo_root, addon, manifest):
+    python_files = len(list((Path(repo_root) / ADDONS_DIR / addon).rglob('*.py')))
+    return (ESTIMATE_BASE_SECONDS
+            + ESTIMATE_DATA_FILE_SECONDS * len(manifest.get('data', []))
+            + ESTIMATE_PYTHON_FILE_SECONDS * python_files)
+
+
+def estimate_seconds(repo_root, addon, manifest, history):
+    """(segundos, origen) estimados para actualizar ``addon``."""
+    samples = history.get(addon)
+    if samples:
+        return sum(samples) / len(samples), 'historial'
+    return _heuristic_seconds(repo_root, addon, manifest), 'estimado'
+
+
+def build_plan(repo_root, from_ref, to_ref, state_dir=None, host=None):
+    """
+    Plan de actualización entre dos commits: módulos a actualizar (en orden
+    de dependencias, con el motivo y el costo estimado de cada uno) y
+    módulos que solo necesitan reinicio.
+    """
+    manifests = load_manifests(repo_root)
+    files = changed_files(repo_root, from_ref, to_ref)
+    upgrade, restart = classify_changes(files, manifests)
+    to_upgrade = dependents_closure(upgrade, manifests)
+    history = load_history(state_dir, host) if state_dir and host else {}
+
+    modules = []
+    for addon in topological_order(to_upgrade, manifests):
+        seconds, source = estimate_seconds(repo_root, addon, manifests[addon], history)
+        if addon in upgrade:
+            reason = f"{len(upgrade[addon])} archivo(s) modificado(s)"
+        else:
+            reason = "depende de: " + ', '.join(
+                sorted(set(manifests[addon].get('depends', [])) & to_upgrade))
+        modules.append({'name': addon, 'reason': reason, 'seconds': seconds, 'source': source})
+
+    return {
+        'from': from_ref,
+        'to': to_ref,
+        'changed_files': len(files),
+        'modules': modules,
+        'restart_only': sorted(set(restart) - to_upgrade),
+        'estimated_seconds': (ESTIMATE_REGISTRY_SECONDS + sum(m['seconds'] for m in modules)) if modules else 0.0,
+    }
+
+
+def format_plan(plan):
+    lines = [f"Cambios {plan['from'][:10]}..{plan['to'][:10]}: {plan['changed_files']} archivo(s)"]
+    if plan['modules']:
+        lines.append("Módulos a actualizar (-u), en orden:")
+        for module in plan['modules']:
+            lines.append(f"  - {module['name']}: {module['reason']} (~{module['seconds']:.0f} s, {module['source']})")
+        lines.append(f"Costo estimado: ~{plan['estimated_seconds']:.0f} s "
+                     f"(incluye ~{ESTIMATE_REGISTRY_SECONDS:.0f} s de carga del registry)")
+    else:
+        lines.append("Ningún módulo requiere actualización")
+    if plan['restart_only']:
+        lines.append("Solo reinicio (assets/documentación): " + ', '.join(plan['restart_only']))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan de actualización incremental de módulos entre dos commits")
+    parser.add_argument('--from', dest='from_ref', required=True, help='Último commit con módulos actualizados')
+    parser.add_argument('--to', dest='to_ref', default='HEAD', help='Commit o rama destino (default: HEAD)')
+    parser.add_argument('--host', help='Host, para estimar con su historial de actualizaciones')
+    parser.add_argument('--json', action='store_true', help='Salida en JSON')
+    args = parser.parse_args()
+
+    repo_root = Path(__file__).parent.parent
+    plan = build_plan(repo_root, args.from_ref, args.to_ref,
+                      state_dir=repo_root / 'deployment' / 'state', host=args.host)
+    print(json.dumps(plan, indent=2) if args.json else format_plan(plan))
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+import sys
+from pathlib import Path
+
+# Los scripts de deployment/ se importan entre sí como módulos sueltos
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
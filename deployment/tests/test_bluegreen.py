@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+import bluegreen
+import healthcheck
+
+HEALTHCHECK = Path(healthcheck.__file__).resolve()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def ports():
+    blue, green = free_port(), free_port()
+    yield blue, green
+    for port in (blue, green):
+        subprocess.run(['pkill', '-f', f'healthcheck[.]py --serve {port}'], check=False)
+
+
+def make_restart(tmp_path, ports, **opts):
+    """BlueGreenRestart con el servidor stub de healthcheck.py como instancia de Odoo."""
+    blue, green = ports
+    values = {
+        'http_port': str(blue),
+        'bluegreen_port': str(green),
+        'bluegreen_start_cmd': f'{sys.executable} {HEALTHCHECK} --serve {{port}}',
+        'bluegreen_stop_cmd': 'pkill -f "healthcheck[.]py --serve {port}"',
+        'bluegreen_upstream_file': str(tmp_path / 'nginx' / '{service}-upstream.conf'),
+        'bluegreen_reload_cmd': 'true',
+        'bluegreen_ready_timeout': '10',
+        'bluegreen_drain_seconds': '0',
+    }
+    values.update(opts)
+    return bluegreen.BlueGreenRestart('cliente.somosblink.com', values, 'odoo-cliente', tmp_path / 'state',
+                                      log=lambda message: None)
+
+
+def responds(port):
+    return healthcheck.check_tcp('127.0.0.1', port, timeout=1)[0]
+
+
+def wait_stopped(port):
+    for _i in range(50):
+        if not responds(port):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def test_switch_to_green_and_back(tmp_path, ports):
+    blue, green = ports
+    restart = make_restart(tmp_path, ports)
+    restart.start(blue)
+    restart.wait_ready(blue)
+    assert restart.active_port() == blue
+
+    assert restart.run() == green
+    assert restart.active_port() == green
+    assert f'server 127.0.0.1:{green};' in restart.upstream_file.read_text(encoding='utf-8')
+    assert responds(green)
+    assert wait_stopped(blue)
+
+    # El estado persiste: un nuevo reinicio vuelve a blue
+    restart = make_restart(tmp_path, ports)
+    assert restart.run() == blue
+    assert f'server 127.0.0.1:{blue};' in restart.upstream_file.read_text(encoding='utf-8')
+    assert wait_stopped(green)
+
+
+def test_failed_reload_keeps_old_instance(tmp_path, ports):
+    blue, green = ports
+    restart = make_restart(tmp_path, ports)
+    restart.start(blue)
+    restart.switch(blue)
+    previous = restart.upstream_file.read_text(encoding='utf-8')
+
+    restart = make_restart(tmp_path, ports, bluegreen_reload_cmd='false')
+    with pytest.raises(bluegreen.BlueGreenError):
+        restart.run()
+    assert restart.upstream_file.read_text(encoding='utf-8') == previous
+    assert restart.active_port() == blue
+    assert responds(blue)
+    assert wait_stopped(green)
+
+
+def test_instance_that_never_gets_ready(tmp_path, ports):
+    blue, green = ports
+    restart = make_restart(tmp_path, ports, bluegreen_start_cmd='true', bluegreen_ready_timeout='1')
+    with pytest.raises(bluegreen.BlueGreenError):
+        restart.run()
+    assert restart.active_port() == blue
+    assert not restart.upstream_file.exists()
+
+
+def test_failing_start_command(tmp_path, ports):
+    restart = make_restart(tmp_path, ports, bluegreen_start_cmd='exit 3')
+    with pytest.raises(bluegreen.BlueGreenError, match='código 3'):
+        restart.start(ports[1])
+
+
+def test_busy_target_port_is_rejected(tmp_path, ports):
+    blue, green = ports
+    restart = make_restart(tmp_path, ports)
+    restart.start(blue)
+    restart.switch(blue)
+    previous = restart.upstream_file.read_text(encoding='utf-8')
+    # Instancia vieja que quedó escuchando en el puerto alternativo
+    stale = healthcheck.stub_server(green)
+    try:
+        with pytest.raises(bluegreen.BlueGreenError, match='ya está en uso'):
+            restart.run()
+    finally:
+        stale.shutdown()
+        stale.server_close()
+    assert restart.upstream_file.read_text(encoding='utf-8') == previous
+    assert restart.active_port() == blue
+    assert responds(blue)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+
+import config_compiler
+
+HOST_CONF = """[options]
+hostname = {host}
+environment = production
+db_name = {host}_db
+http_port = {port}
+"""
+
+
+def make_repo(tmp_path, hosts):
+    hosts_dir = tmp_path / "config" / "hosts"
+    hosts_dir.mkdir(parents=True)
+    for port, host in enumerate(hosts, start=8069):
+        (hosts_dir / f"{host}.conf").write_text(HOST_CONF.format(host=host, port=port), encoding='utf-8')
+    return tmp_path
+
+
+def test_parallel_compiles_never_expose_partial_files(tmp_path):
+    hosts = [f"host{index}" for index in range(4)]
+    repo = make_repo(tmp_path, hosts)
+
+    def compile_all(_):
+        # Lo que hace cada hilo del modo flota: compilar todos los hosts y releer su salida
+        compiler = config_compiler.ConfigCompiler(repo)
+        for host in hosts:
+            compiler.compile(host)
+            assert compiler.compile_values(host)['db_name'] == f"{host}_db"
+            assert config_compiler._read(compiler.output_file(host))['db_name'] == f"{host}_db"
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(compile_all, range(32)))
+
+    compiler = config_compiler.ConfigCompiler(repo)
+    leftovers = [path.name for path in list(compiler.build_dir.rglob('.*')) + list(compiler.cache_dir.glob('.*'))]
+    assert leftovers == []
+    assert oct(compiler.output_file(hosts[0]).stat().st_mode & 0o777) == oct(0o640)
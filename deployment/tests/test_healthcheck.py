@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+import configparser
+
+import pytest
+
+import deploy
+import healthcheck
+
+
+@pytest.fixture
+def stub():
+    server = healthcheck.stub_server()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def base_url(server):
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def test_percentile():
+    assert healthcheck.percentile([], 50) is None
+    assert healthcheck.percentile([10.0], 95) == 10.0
+    assert healthcheck.percentile([10.0, 20.0, 30.0, 40.0], 50) == 25.0
+
+
+def test_run_checks_against_stub(stub):
+    report = healthcheck.run_checks(base_url(stub), '127.0.0.1', stub.server_port, samples=5)
+    assert report['ok']
+    assert report['tcp'][0]
+    assert report['database'] is None
+    for result in report['endpoints'].values():
+        assert result['errors'] == 0
+        assert result['p50'] <= result['p95'] <= result['max']
+
+
+def test_run_checks_reports_failing_path(stub):
+    report = healthcheck.run_checks(base_url(stub), '127.0.0.1', stub.server_port,
+                                    paths=('/web/health', '/missing'), samples=3)
+    assert not report['ok']
+    assert report['endpoints']['/web/health']['ok']
+    missing = report['endpoints']['/missing']
+    assert missing['errors'] == 3 and missing['statuses'] == ['404'] and missing['p50'] is None
+
+
+def test_check_tcp_closed_port(stub):
+    port = stub.server_port
+    stub.shutdown()
+    stub.server_close()
+    ok, detail = healthcheck.check_tcp('127.0.0.1', port, timeout=1)
+    assert not ok and isinstance(detail, str)
+
+
+def test_baseline_regression(stub, tmp_path):
+    report = healthcheck.run_checks(base_url(stub), '127.0.0.1', stub.server_port, samples=3)
+    healthcheck.save_baseline(tmp_path, 'host', report)
+    baseline = healthcheck.load_baseline(tmp_path, 'host')
+    assert healthcheck.compare_with_baseline(report, baseline) == []
+
+    stub.delay = 0.2
+    slow = healthcheck.run_checks(base_url(stub), '127.0.0.1', stub.server_port, samples=3)
+    regressions = healthcheck.compare_with_baseline(slow, baseline)
+    assert [regression.split(':')[0] for regression in regressions] == list(healthcheck.HEALTH_PATHS)
+
+
+def make_deployment(tmp_path, monkeypatch, **values):
+    monkeypatch.setenv('BLINK_SERVER', 'blink-1')
+    deployment = deploy.OdooDeployment('cliente.somosblink.com', 'main', {})
+    deployment.repo_root = tmp_path
+    deployment.config = configparser.RawConfigParser()
+    deployment.config['options'] = dict({
+        'hostname': 'cliente.somosblink.com',
+        'environment': 'production',
+        'http_port': '8070',
+        'db_host': 'localhost',
+        'db_name': 'cliente-prod',
+    }, **values)
+    return deployment
+
+
+def test_health_target_on_this_server(tmp_path, monkeypatch):
+    deployment = make_deployment(tmp_path, monkeypatch, server='blink-1')
+    assert deployment.get_health_target() == ('http://127.0.0.1:8070', '127.0.0.1', 8070)
+    assert deployment.get_database_check_args()['db_host'] == 'localhost'
+
+
+def test_health_target_on_remote_server(tmp_path, monkeypatch):
+    deployment = make_deployment(tmp_path, monkeypatch, server='blink-2')
+    assert deployment.get_health_target() == (
+        'https://cliente.somosblink.com', 'cliente.somosblink.com', 443)
+    # PostgreSQL local del otro servidor: no se prueba desde esta máquina
+    assert deployment.get_database_check_args() is None
+
+    deployment.config['options']['db_host'] = 'db.somosblink.com'
+    assert deployment.get_database_check_args()['db_host'] == 'db.somosblink.com'
+
+
+def test_health_url_override(tmp_path, monkeypatch, stub):
+    deployment = make_deployment(tmp_path, monkeypatch, server='blink-2')
+    deployment.options['health_url'] = base_url(stub)
+    url, host, port = deployment.get_health_target()
+    assert (url, host, port) == (base_url(stub), '127.0.0.1', stub.server_port)
+    assert healthcheck.run_checks(url, host, port, samples=2)['ok']